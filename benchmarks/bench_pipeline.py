@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Sentiment pipeline benchmark
+Runs the classifier against the offline fake backend across concurrency levels and
+pack sizes, with injected latency, 429/529 errors and malformed answers, then checks
+that results are deterministic, that the result cache answers a rerun without API
+calls and that a Message Batches rerun, after an interrupted collect or over
+reordered comments, submits nothing new. Exits non-zero if any check fails.
+
+Usage: python benchmarks/bench_pipeline.py [engagements.csv | comment_count]
+           [--concurrency 8,32] [--pack 1,10] [--latency 0.2] [--error-rate 0.05]
+           [--malformed-rate 0.02] [--seed 0]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engagement_data import load_engagements
+from fake_anthropic import FakeBackend
+from sentiment_cache import SentimentCache
+from sentiment_client import FAILED, AsyncSentimentClassifier, BatchSentimentJob, RetryPolicy, parse_sentiment
+
+WORDS = ['love', 'this', 'scrub', 'smells', 'amazing', 'need', 'price', 'too', 'high', 'where', 'buy',
+         'entered', 'giveaway', 'skin', 'soft', 'broke', 'out', 'jar', 'leaked', 'restock', 'please', '😍', '🔥']
+
+
+def synthetic_comments(n_comments: int, seed: int = 42) -> list:
+    """Short comments drawn from a small vocabulary, so some repeat as in real exports"""
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(2, 9, n_comments)
+    return [' '.join(rng.choice(WORDS, length)) for length in lengths]
+
+
+def make_backend(options: dict) -> FakeBackend:
+    return FakeBackend(seed=options['seed'], latency_median=options['latency'],
+                       rate_limit_rate=options['error_rate'] / 2, overloaded_rate=options['error_rate'] / 2,
+                       malformed_rate=options['malformed_rate'], retry_after=options['latency'])
+
+
+def make_classifier(backend: FakeBackend, concurrency: int, pack: int, options: dict, cache=None):
+    # Rate limits are left wide open so the run measures the pipeline, not the limiter
+    return AsyncSentimentClassifier(backend=backend, concurrency=concurrency, pack_size=pack, cache=cache,
+                                    requests_per_minute=1e9, tokens_per_minute=1e12,
+                                    retry_policy=RetryPolicy(base_delay=options['latency'], seed=options['seed']))
+
+
+def run_once(comments: list, concurrency: int, pack: int, options: dict) -> tuple:
+    classifier = make_classifier(make_backend(options), concurrency, pack, options)
+    start = time.perf_counter()
+    results = classifier.classify(comments)
+    return results, time.perf_counter() - start, classifier
+
+
+def bench_cache(comments: list, options: dict) -> bool:
+    """A rerun over the same comments should be served entirely by the result cache"""
+    with tempfile.TemporaryDirectory() as state_dir:
+        cache = SentimentCache(os.path.join(state_dir, 'cache.sqlite'))
+        backend = make_backend(options)
+        first = make_classifier(backend, 32, 1, options, cache=cache)
+        classified = sum(result['sentiment'] != FAILED for result in first.classify(comments))
+        hits_before = cache.hits
+        second = make_classifier(backend, 32, 1, options, cache=cache)
+        start = time.perf_counter()
+        second.classify(comments)
+        elapsed = time.perf_counter() - start
+        served = cache.hits - hits_before
+        print(f"• Result cache rerun: {served:,} of {len(comments):,} comments from cache, "
+              f"{len(second.calls):,} API calls (first run: {len(first.calls):,}), {elapsed:.2f}s")
+        # Failed comments are never cached, so only they may reach the API again
+        return served >= classified
+
+
+def bench_batch(comments: list, options: dict) -> bool:
+    """A batch run resumed after a crash while collecting, or rerun over the same comments
+    in another order, should collect from the recorded batches and results.jsonl instead of
+    submitting again"""
+    with tempfile.TemporaryDirectory() as state_dir:
+        backend = make_backend(options)
+        custom_ids = {f"comment-{i}": text for i, text in enumerate(comments)}
+
+        # First run dies halfway through reading the batch results
+        parsed = []
+
+        def parse_then_crash(message):
+            if len(parsed) == len(set(comments)) // 2:
+                raise KeyboardInterrupt
+            parsed.append(message)
+            return parse_sentiment(message)
+
+        try:
+            BatchSentimentJob(backend=backend, state_dir=state_dir, poll_interval=0,
+                              parse_result=parse_then_crash).run(custom_ids)
+        except KeyboardInterrupt:
+            pass
+        submitted = len(backend._batches)
+
+        job = BatchSentimentJob(backend=backend, state_dir=state_dir, poll_interval=0)
+        start = time.perf_counter()
+        results = job.run(custom_ids)
+        elapsed = time.perf_counter() - start
+        failed = sum(result['sentiment'] == FAILED for result in results.values())
+        resubmitted = len(backend._batches) - submitted
+
+        # Rerun over the classified comments, reversed and under new ids as in a fresh export
+        classified = [text for custom_id, text in custom_ids.items() if results[custom_id]['sentiment'] != FAILED]
+        labels = {text: results[custom_id]['sentiment'] for custom_id, text in custom_ids.items()}
+        rerun = BatchSentimentJob(backend=backend, state_dir=state_dir, poll_interval=0)
+        reordered = rerun.run({f"row-{i}": text for i, text in enumerate(reversed(classified))})
+        mismatched = sum(result['sentiment'] != labels[text]
+                         for result, text in zip(reordered.values(), reversed(classified)))
+        print(f"• Batch: {len(comments):,} comments in {elapsed:.2f}s after an interrupted collect, {failed:,} failed, "
+              f"{resubmitted} batches resubmitted; reordered rerun submitted "
+              f"{len(backend._batches) - submitted - resubmitted} new batches, {mismatched:,} labels changed")
+        return resubmitted == 0 and len(backend._batches) == submitted and mismatched == 0
+
+
+if __name__ == "__main__":
+    def flag_value(flag, default, cast=float):
+        return cast(sys.argv[sys.argv.index(flag) + 1]) if flag in sys.argv else default
+
+    def int_list(value):
+        return [int(part) for part in value.split(',')]
+
+    options = {
+        'latency': flag_value('--latency', 0.2),
+        'error_rate': flag_value('--error-rate', 0.05),
+        'malformed_rate': flag_value('--malformed-rate', 0.02),
+        'seed': flag_value('--seed', 0, int)
+    }
+    concurrency_levels = flag_value('--concurrency', [8, 32], int_list)
+    pack_sizes = flag_value('--pack', [1, 10], int_list)
+
+    arg = sys.argv[1] if len(sys.argv) > 1 and not sys.argv[1].startswith('--') else '500'
+    if os.path.exists(arg):
+        _, df = load_engagements(arg)
+        comments = df['comment_text'].drop_duplicates().head(2000).tolist()
+        print(f"⏱️ Benchmarking {len(comments):,} distinct comments from '{arg}'")
+    else:
+        comments = synthetic_comments(int(arg))
+        print(f"⏱️ Benchmarking {len(comments):,} synthetic comments")
+    print(f"   Fake backend: {options['latency']:.2f}s median latency, {options['error_rate']:.0%} 429/529, "
+          f"{options['malformed_rate']:.0%} malformed, seed {options['seed']}")
+
+    rows, ok = [], True
+    for pack in pack_sizes:
+        for concurrency in concurrency_levels:
+            results, elapsed, classifier = run_once(comments, concurrency, pack, options)
+            repeat, _, _ = run_once(comments, concurrency, pack, options)
+            deterministic = repeat == results
+            ok &= deterministic
+            summary = classifier.calls.summary(classifier.model)
+            rows.append({
+                'pack': pack, 'concurrency': concurrency, 'seconds': elapsed,
+                'comments/s': len(comments) / elapsed, 'calls': summary['calls'],
+                'p50 s': summary['latency_seconds']['p50'], 'p95 s': summary['latency_seconds']['p95'],
+                'retries': sum(classifier.retries.values()), 'failed': sum(classifier.failures.values()),
+                'tokens/comment': summary['tokens_per_comment'], 'deterministic': deterministic
+            })
+
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda value: f"{value:,.2f}"))
+    ok &= bench_cache(comments, options)
+    ok &= bench_batch(comments, options)
+
+    print("✅ Pipeline checks passed" if ok else "❌ Pipeline regression")
+    sys.exit(0 if ok else 1)
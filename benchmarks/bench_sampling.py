@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Adaptive sampling benchmark
+Runs SequentialSampler against simulated labels with a known per-post sentiment mix and
+compares the comments it spends with a proportional stratified sample of the same size.
+Checks that every Wilson interval contains its observed share, that a census collapses
+onto it, and that the adaptive intervals cover the true shares at about the nominal
+rate. Exits non-zero if any check fails.
+
+Usage: python benchmarks/bench_sampling.py [post_count] [--comments-per-post 60]
+           [--budget 10000] [--precision 0.2] [--seed 0]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comment_sampling import SequentialSampler, stratified_sample, wilson_interval
+
+
+def synthetic_corpus(n_posts: int, comments_per_post: int, seed: int = 0) -> tuple:
+    """(comments, true labels): posts of varying size, each with its own positive/negative mix"""
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(1, 2 * comments_per_post, n_posts)
+    media_ids = np.repeat(np.arange(n_posts), sizes)
+    positive_share = rng.beta(2, 2, n_posts)[media_ids]
+    negative_share = (1 - positive_share) * rng.uniform(0, 0.6, n_posts)[media_ids]
+    draw = rng.random(len(media_ids))
+    labels = np.where(draw < positive_share, 'positive',
+                      np.where(draw < positive_share + negative_share, 'negative', 'neutral'))
+    start = pd.Timestamp('2025-03-01')
+    comments = pd.DataFrame({'media_id': media_ids,
+                             'timestamp': start + pd.to_timedelta(rng.integers(0, 31 * 86400, len(media_ids)), unit='s')})
+    return comments, pd.Series(labels, index=comments.index)
+
+
+def label(rows: pd.DataFrame, labels: pd.Series) -> pd.DataFrame:
+    return pd.DataFrame({'media_id': rows['media_id'].to_numpy(), 'sentiment': labels[rows.index].to_numpy()})
+
+
+def settled_posts(sample: pd.DataFrame, posts: pd.Index, sizes: np.ndarray, precision: float) -> int:
+    """Posts of a labelled sample whose positive and negative share intervals are both within precision"""
+    codes = posts.get_indexer(sample['media_id'])
+    sentiment = sample['sentiment'].to_numpy()
+    labelled = np.bincount(codes, minlength=len(posts))
+    widths = []
+    for name in ('positive', 'negative'):
+        low, high = wilson_interval(np.bincount(codes[sentiment == name], minlength=len(posts)), labelled,
+                                    population=sizes)
+        widths.append(high - low)
+    return int((np.maximum(*widths) <= precision).sum())
+
+
+def check_intervals(seed: int) -> bool:
+    """Every interval contains its observed share, and a census has zero width"""
+    rng = np.random.default_rng(seed)
+    population = rng.integers(1, 500, 200_000)
+    trials = np.minimum((rng.random(len(population)) * population).astype(int) + 1, population)
+    successes = (rng.random(len(trials)) * (trials + 1)).astype(int)
+    share = successes / trials
+    low, high = wilson_interval(successes, trials, population=population)
+    outside = int(((low > share + 1e-12) | (high < share - 1e-12)).sum())
+    census = trials == population
+    census_width = float((high - low)[census].max())
+    print(f"• Wilson intervals: {outside:,} of {len(share):,} exclude their observed share, "
+          f"widest census interval {census_width:.2g}")
+    return outside == 0 and census_width < 1e-9
+
+
+if __name__ == "__main__":
+    def flag_value(flag, default, cast=int):
+        return cast(sys.argv[sys.argv.index(flag) + 1]) if flag in sys.argv else default
+
+    n_posts = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 300
+    seed = flag_value('--seed', 0)
+    precision = flag_value('--precision', 0.2, float)
+    comments, labels = synthetic_corpus(n_posts, flag_value('--comments-per-post', 60), seed)
+    budget = flag_value('--budget', len(comments) // 2)
+    print(f"⏱️ Benchmarking adaptive sampling over {len(comments):,} synthetic comments on {n_posts:,} posts, "
+          f"budget {budget:,}, target interval width {precision:.0%}")
+
+    ok = check_intervals(seed)
+
+    start = time.perf_counter()
+    sampler = SequentialSampler(comments, budget, precision=precision, seed=seed)
+    while not sampler.done():
+        sampler.update(label(sampler.next_round(), labels))
+    elapsed = time.perf_counter() - start
+    summary = sampler.summary()
+    print(f"• Adaptive: {summary['spent']:,} comments in {summary['rounds']} rounds ({elapsed:.2f}s), "
+          f"{summary['posts_settled']:,}/{summary['posts']:,} posts settled, widest interval {summary['max_width']:.0%}")
+
+    # Coverage of the true (population) positive share by the adaptive intervals
+    truth = pd.DataFrame({'media_id': comments['media_id'], 'positive': labels == 'positive'})
+    true_share = truth.groupby('media_id')['positive'].mean().reindex(sampler.posts).to_numpy()
+    low, high = wilson_interval(sampler.positive, sampler.labelled, population=sampler.sizes)
+    coverage = float(((low <= true_share + 1e-12) & (true_share <= high + 1e-12))[sampler.labelled > 0].mean())
+    print(f"• Adaptive intervals cover the true positive share for {coverage:.1%} of posts (nominal 95%)")
+    ok &= coverage >= 0.9
+
+    # The same number of comments drawn proportionally, for comparison
+    stratified = label(stratified_sample(comments, summary['spent'], seed=seed, by_date=False), labels)
+    settled = settled_posts(stratified, sampler.posts, sampler.sizes, precision)
+    print(f"• Stratified sample of the same size: {settled:,}/{len(sampler.posts):,} posts settled")
+
+    print("✅ Sampling checks passed" if ok else "❌ Sampling regression")
+    sys.exit(0 if ok else 1)
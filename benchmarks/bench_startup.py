@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Startup time check
+Imports each analysis script in a fresh interpreter, reports wall time and fails if
+plotting or API libraries are loaded eagerly or the import exceeds the time budget
+
+Usage: python benchmarks/bench_startup.py [--max-seconds 1.0] [--repeat 3]
+"""
+
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ['treehut_analysis', 'sentiment_analysis']
+# Only pulled in once charts are drawn or the API client is created
+LAZY_MODULES = ['matplotlib', 'seaborn', 'anthropic', 'concurrent.futures.process']
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed)
+print(','.join(name for name in {lazy!r} if name in sys.modules))
+"""
+
+
+def time_import(module: str) -> tuple:
+    """Seconds to import module in a fresh interpreter and the lazy modules it loaded"""
+    result = subprocess.run([sys.executable, '-c', PROBE.format(module=module, lazy=LAZY_MODULES)],
+                            cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    elapsed, _, loaded = result.stdout.strip().partition('\n')
+    return float(elapsed), [name for name in loaded.split(',') if name]
+
+
+if __name__ == "__main__":
+    max_seconds = float(sys.argv[sys.argv.index('--max-seconds') + 1]) if '--max-seconds' in sys.argv else 1.0
+    repeat = int(sys.argv[sys.argv.index('--repeat') + 1]) if '--repeat' in sys.argv else 3
+
+    failed = False
+    for module in MODULES:
+        runs = [time_import(module) for _ in range(repeat)]
+        best = min(elapsed for elapsed, _ in runs)
+        eager = sorted(set(name for _, loaded in runs for name in loaded))
+        print(f"{module:<20} import {best:.3f}s (best of {repeat})")
+        if eager:
+            print(f"   ❌ eagerly imports {', '.join(eager)}")
+            failed = True
+        if best > max_seconds:
+            print(f"   ❌ over the {max_seconds:.2f}s budget")
+            failed = True
+
+    print("❌ Startup regression" if failed else "✅ Startup within budget")
+    sys.exit(1 if failed else 0)
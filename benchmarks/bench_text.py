@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Comment text benchmark
+Times the lexicon scorer and the duplicate collapser over synthetic comments. Checks
+the labels of a set of pinned comments, and that near-duplicates reading opposite
+ways are never clustered together while tag strings for different friends are.
+Exits non-zero if any check fails.
+
+Usage: python benchmarks/bench_text.py [engagements.csv | comment_count]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comment_text import DuplicateCollapser, LexiconScorer
+
+WORDS = ['love', 'loved', 'this', 'scrub', 'smells', 'amazing', 'need', 'price', 'too', 'high', 'where', 'buy',
+         'hated', 'giveaway', 'skin', 'soft', 'broke', 'out', 'jar', 'leaked', 'goodbye', 'please', '😍', '@friend']
+
+# Comment -> lexicon label it must get
+PINNED_LABELS = {
+    'loved it': 'positive',
+    'I love this scrub': 'positive',
+    'so lovely': 'positive',
+    'loving the new scent': 'positive',
+    'she loves it': 'positive',
+    'I hated it': 'negative',
+    'terribly made jar': 'negative',
+    'the worst': 'negative',
+    'goodbye forever': 'neutral',
+    'where can I buy this': 'neutral',
+}
+
+# Near-duplicate pairs that must stay in separate clusters
+OPPOSITE_PAIRS = [
+    ("This is the best scrub I have ever used, my skin feels so soft and smooth",
+     "This is the worst scrub I have ever used, my skin feels so soft and smooth"),
+    ("Please bring back the coconut lime scrub it was my favorite",
+     "Please never bring back the coconut lime scrub it was my favorite"),
+]
+
+# Near-duplicates that must share a cluster
+SAME_CLUSTER = ["love this!! @amy.smith", "love this!! @bob_k", "love this!! @carla"]
+
+
+def synthetic_comments(n_comments: int, seed: int = 42) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(2, 12, n_comments)
+    return pd.Series([' '.join(rng.choice(WORDS, length)) for length in lengths])
+
+
+def check_lexicon(scorer: LexiconScorer) -> bool:
+    texts = pd.Series(list(PINNED_LABELS))
+    labels = scorer.score(texts)['lexicon_sentiment'].astype(str)
+    wrong = [(text, label) for text, label in zip(texts, labels) if PINNED_LABELS[text] != label]
+    for text, label in wrong:
+        print(f"  - {text!r}: expected {PINNED_LABELS[text]}, got {label}")
+    print(f"• Lexicon: {len(PINNED_LABELS) - len(wrong)}/{len(PINNED_LABELS)} pinned comments labelled as expected")
+    return not wrong
+
+
+def check_collapse(collapser: DuplicateCollapser) -> bool:
+    texts = pd.Series([text for pair in OPPOSITE_PAIRS for text in pair] + SAME_CLUSTER)
+    clusters = collapser.collapse(texts)['cluster'].to_numpy()
+    merged = [pair for i, pair in enumerate(OPPOSITE_PAIRS) if clusters[2 * i] == clusters[2 * i + 1]]
+    for first, second in merged:
+        print(f"  - merged opposite comments: {first!r} / {second!r}")
+    tags_together = len(set(clusters[2 * len(OPPOSITE_PAIRS):])) == 1
+    print(f"• Collapse: {len(merged)}/{len(OPPOSITE_PAIRS)} opposite pairs merged, "
+          f"tag strings {'share' if tags_together else 'do not share'} a cluster")
+    return not merged and tags_together
+
+
+if __name__ == "__main__":
+    arg = sys.argv[1] if len(sys.argv) > 1 else '500000'
+    if os.path.exists(arg):
+        texts = pd.read_csv(arg, usecols=['comment_text'])['comment_text']
+        print(f"⏱️ Benchmarking {len(texts):,} comments from '{arg}'")
+    else:
+        texts = synthetic_comments(int(arg))
+        print(f"⏱️ Benchmarking {len(texts):,} synthetic comments")
+
+    scorer = LexiconScorer()
+    start = time.perf_counter()
+    scorer.score(texts)
+    elapsed = time.perf_counter() - start
+    print(f"• LexiconScorer.score: {len(texts) / elapsed:,.0f} comments/sec ({elapsed:.2f}s)")
+
+    collapser = DuplicateCollapser(scorer=scorer)
+    start = time.perf_counter()
+    clusters = collapser.collapse(texts)
+    elapsed = time.perf_counter() - start
+    print(f"• DuplicateCollapser.collapse: {len(texts) / elapsed:,.0f} comments/sec ({elapsed:.2f}s), "
+          f"{clusters['cluster'].nunique():,} clusters")
+
+    ok = check_lexicon(scorer)
+    ok &= check_collapse(collapser)
+    print("✅ Text checks passed" if ok else "❌ Text regression")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Timestamp parsing benchmark
+Compares parse_timestamps() against pd.to_datetime(format='mixed') in rows/sec
+
+Usage: python benchmarks/bench_timestamps.py [engagements.csv | row_count]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engagement_data import parse_timestamps
+
+
+def synthetic_timestamps(n_rows: int, seed: int = 42) -> pd.Series:
+    """Timestamps in the layouts seen in engagement exports, shuffled together"""
+    rng = np.random.default_rng(seed)
+    base = pd.Timestamp('2025-03-01') + pd.to_timedelta(rng.integers(0, 31 * 86400 * 10**6, n_rows), unit='us')
+    layout = rng.random(n_rows)
+    values = np.where(layout < 0.6, base.strftime('%Y-%m-%d %H:%M:%S.%f'),
+                      np.where(layout < 0.95, base.strftime('%Y-%m-%d %H:%M:%S'), base.strftime('%Y-%m-%dT%H:%M:%S')))
+    return pd.Series(values)
+
+
+def time_rows_per_sec(parse, values: pd.Series) -> tuple:
+    start = time.perf_counter()
+    result = parse(values)
+    elapsed = time.perf_counter() - start
+    return result, len(values) / elapsed, elapsed
+
+
+if __name__ == "__main__":
+    arg = sys.argv[1] if len(sys.argv) > 1 else '200000'
+    if os.path.exists(arg):
+        values = pd.read_csv(arg, usecols=['timestamp'])['timestamp']
+        print(f"⏱️ Benchmarking {len(values):,} timestamps from '{arg}'")
+    else:
+        values = synthetic_timestamps(int(arg))
+        print(f"⏱️ Benchmarking {len(values):,} synthetic timestamps")
+
+    mixed, mixed_rate, mixed_secs = time_rows_per_sec(lambda v: pd.to_datetime(v, format='mixed'), values)
+    (fast, report), fast_rate, fast_secs = time_rows_per_sec(parse_timestamps, values)
+
+    print(f"• format='mixed':    {mixed_rate:>12,.0f} rows/sec ({mixed_secs:.2f}s)")
+    print(f"• parse_timestamps: {fast_rate:>12,.0f} rows/sec ({fast_secs:.2f}s)")
+    print(f"• Speedup: {fast_rate / mixed_rate:.1f}x")
+    for fmt, count in report['format_counts'].items():
+        print(f"  - {fmt}: {count:,} rows")
+    print(f"• Unmatched rows: {len(report['unmatched']):,}")
+
+    mismatches = (fast != mixed.astype(fast.dtype)) & mixed.notna()
+    print(f"• Rows differing from format='mixed': {int(mismatches.sum()):,}")
@@ -0,0 +1,65 @@
+"""
+@treehut chart rendering
+Runs chart render functions sequentially or across a process pool on the Agg backend
+"""
+
+import os
+from collections import namedtuple
+
+# render(data, path) draws one chart from precomputed plot data and saves it to path;
+# message is printed once the file is written
+ChartTask = namedtuple('ChartTask', ['render', 'data', 'path', 'message'])
+
+_pools = {}
+
+
+def default_jobs() -> int:
+    """Worker count used when charts are rendered with jobs=0"""
+    return os.cpu_count() or 1
+
+
+def _init_worker():
+    """Render headless in workers regardless of the parent's backend"""
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+
+
+def _render(task: ChartTask, style: str, palette):
+    """Apply the plot style and render one chart"""
+    import matplotlib.pyplot as plt
+    plt.style.use(style)
+    if palette:
+        import seaborn as sns
+        sns.set_palette(palette)
+    task.render(task.data, task.path)
+    plt.close('all')
+    return task.path
+
+
+def _pool(jobs: int):
+    """Reuse one pool per worker count so consecutive chart batches share warm workers"""
+    from concurrent.futures import ProcessPoolExecutor
+    if jobs not in _pools:
+        _pools[jobs] = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker)
+    return _pools[jobs]
+
+
+def render_charts(tasks, jobs: int = 1, style: str = 'default', palette=None):
+    """Render chart tasks, in-process when jobs == 1 or concurrently in a process pool
+
+    Workers only receive each task's plot data, never the analyzer's DataFrames.
+    Messages are printed in task order either way. jobs=0 uses every CPU.
+    """
+    tasks = [task for task in tasks if task is not None]
+    jobs = default_jobs() if jobs == 0 else jobs
+    if jobs <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            _render(task, style, palette)
+            print(task.message)
+        return
+
+    pool = _pool(jobs)
+    futures = [pool.submit(_render, task, style, palette) for task in tasks]
+    for task, future in zip(tasks, futures):
+        future.result()
+        print(task.message)
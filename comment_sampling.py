@@ -0,0 +1,196 @@
+"""
+@treehut comment sampling
+Seeded, vectorized sampling of comments for LLM classification, and the sequential
+sampler that spends a budget in rounds on the posts whose sentiment is least certain
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from comment_text import SENTIMENT_LABELS
+
+
+def strata_codes(comments: pd.DataFrame, by_post: bool = True, by_date: bool = True) -> np.ndarray:
+    """Integer stratum per comment: its post, its calendar day, or both"""
+    keys = []
+    if by_post:
+        keys.append(comments['media_id'])
+    if by_date:
+        keys.append(pd.Series(comments['timestamp'].to_numpy().astype('datetime64[D]'), index=comments.index))
+    if not keys:
+        return np.zeros(len(comments), dtype=np.int64)
+    return comments.groupby(keys, observed=True, sort=False, dropna=False).ngroup().to_numpy()
+
+
+def within_stratum_rank(codes: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Random 0-based position of each row within its stratum"""
+    order = np.lexsort((rng.random(len(codes)), codes))
+    sizes = np.bincount(codes)
+    starts = np.cumsum(sizes) - sizes
+    rank = np.empty(len(codes), dtype=np.int64)
+    rank[order] = np.arange(len(codes)) - np.repeat(starts, sizes)
+    return rank
+
+
+def systematic_round(exact: np.ndarray, total: int, rng: np.random.Generator) -> np.ndarray:
+    """Integer counts summing to total that round the fractional shares exact without bias
+
+    Each share is rounded down, and the rows left over are handed out by
+    systematic sampling over the fractional parts in random order, so every
+    share is met exactly in expectation and never exceeded by more than one.
+    """
+    quota = np.floor(exact).astype(np.int64)
+    short = total - quota.sum()
+    if short > 0:
+        order = rng.permutation(len(exact))
+        cumulative = np.cumsum((exact - quota)[order])
+        points = rng.random() + np.arange(short)
+        # Clip guards against float round-off pushing the last point past the end
+        picked = np.minimum(np.searchsorted(cumulative, points, side='right'), len(order) - 1)
+        quota[order[picked]] += 1
+    return quota
+
+
+def stratified_sample(comments: pd.DataFrame, n: int, seed: int = 42,
+                      by_post: bool = True, by_date: bool = True) -> pd.DataFrame:
+    """Proportional stratified sample of n comments, shuffled
+
+    Each stratum (post x day by default) gets its share of n rounded down. The
+    rows left over are handed out by systematic sampling over the fractional
+    shares in random stratum order, so every stratum gets its exact share in
+    expectation and small strata are not starved by the big ones. Everything is
+    array operations over stratum codes, so the cost is a couple of sorts however
+    many strata there are. The same seed and input always give the same sample.
+    """
+    n = min(n, len(comments))
+    rng = np.random.default_rng(seed)
+    codes = strata_codes(comments, by_post=by_post, by_date=by_date)
+    sizes = np.bincount(codes)
+
+    quota = systematic_round(sizes * (n / max(len(comments), 1)), n, rng)
+    chosen = np.flatnonzero(within_stratum_rank(codes, rng) < quota[codes])
+    return comments.iloc[chosen[rng.permutation(len(chosen))]]
+
+
+def wilson_interval(successes, trials, z: float = 1.96, population=None) -> Tuple[np.ndarray, np.ndarray]:
+    """Wilson score interval of binomial proportions, elementwise; (0, 1) where there are no trials
+
+    With population (the number of comments each sample was drawn from), the
+    finite-population correction enters through the effective sample size
+    n / fpc^2, so the interval still always contains the observed share and
+    collapses onto it once a post's sample is all of its comments.
+    """
+    successes = np.asarray(successes, dtype=np.float64)
+    trials = np.asarray(trials, dtype=np.float64)
+    n = np.maximum(trials, 1)
+    p = successes / n
+    # 1 / effective n, which is 0 for a census
+    inverse_n = 1 / n
+    if population is not None:
+        population = np.asarray(population, dtype=np.float64)
+        inverse_n = inverse_n * np.clip((population - trials) / np.maximum(population - 1, 1), 0.0, 1.0)
+    denominator = 1 + z ** 2 * inverse_n
+    center = (p + z ** 2 * inverse_n / 2) / denominator
+    margin = z * np.sqrt(p * (1 - p) * inverse_n + z ** 2 * inverse_n ** 2 / 4) / denominator
+    empty = trials == 0
+    return (np.where(empty, 0.0, np.clip(center - margin, 0.0, 1.0)),
+            np.where(empty, 1.0, np.clip(center + margin, 0.0, 1.0)))
+
+
+class SequentialSampler:
+    """Adaptive sample of comments, drawn in rounds until every post's sentiment shares are precise
+
+    Each post keeps Wilson intervals on its positive and negative shares,
+    corrected for the post's finite number of comments. A post is settled once
+    both intervals are at most precision wide, or once all of its comments have
+    been drawn. Each round of up to round_size comments (a fifth of
+    the budget by default) goes to the unsettled posts, in proportion to how many
+    more labels each needs to reach the target at its current share estimate, so
+    clear-cut posts stop early and contested ones keep drawing. Within a post,
+    comments are drawn in a seeded random order. Sampling ends when every post is
+    settled or budget comments have been drawn.
+
+        sampler = SequentialSampler(comments, budget=2000, precision=0.2)
+        while not sampler.done():
+            sampler.update(classify(sampler.next_round()))
+    """
+
+    def __init__(self, comments: pd.DataFrame, budget: int, precision: float = 0.2,
+                 round_size: Optional[int] = None, z: float = 1.96, seed: int = 42):
+        self.comments = comments
+        self.budget = min(budget, len(comments))
+        self.precision = precision
+        self.round_size = round_size or max(self.budget // 5, 1)
+        self.z = z
+        self.rng = np.random.default_rng(seed)
+        codes, self.posts = pd.factorize(comments['media_id'])
+        self.codes = codes
+        self.sizes = np.bincount(codes, minlength=len(self.posts))
+        self.rank = within_stratum_rank(codes, self.rng)
+        self.drawn = np.zeros(len(self.posts), dtype=np.int64)
+        self.labelled = np.zeros(len(self.posts), dtype=np.int64)
+        self.positive = np.zeros(len(self.posts), dtype=np.int64)
+        self.negative = np.zeros(len(self.posts), dtype=np.int64)
+        self.rounds = 0
+
+    @property
+    def spent(self) -> int:
+        return int(self.drawn.sum())
+
+    def widths(self) -> np.ndarray:
+        """Width of the wider of each post's positive and negative share intervals"""
+        positive_low, positive_high = wilson_interval(self.positive, self.labelled, self.z, self.sizes)
+        negative_low, negative_high = wilson_interval(self.negative, self.labelled, self.z, self.sizes)
+        return np.maximum(positive_high - positive_low, negative_high - negative_low)
+
+    def settled(self) -> np.ndarray:
+        return (self.widths() <= self.precision) | (self.drawn >= self.sizes)
+
+    def done(self) -> bool:
+        return self.spent >= self.budget or bool(self.settled().all())
+
+    def next_round(self) -> pd.DataFrame:
+        """The next round's comments, drawn from the posts that are not settled yet"""
+        # Labels needed for the wider interval to shrink to the target, from a smoothed share
+        # estimate and the post's size; at least one more for every unsettled post, never
+        # more than it has left
+        shares = np.stack([(self.positive + 1) / (self.labelled + 2), (self.negative + 1) / (self.labelled + 2)])
+        unlimited = 4 * self.z ** 2 * (shares * (1 - shares)).max(axis=0) / self.precision ** 2
+        required = np.ceil(unlimited / (1 + (unlimited - 1) / self.sizes))
+        need = np.where(self.settled(), 0, np.maximum(required - self.labelled, 1))
+        need = np.minimum(need, self.sizes - self.drawn).astype(np.int64)
+
+        total = int(min(self.round_size, self.budget - self.spent, need.sum()))
+        allocation = need if need.sum() <= total else systematic_round(need * (total / need.sum()), total, self.rng)
+        chosen = np.flatnonzero((self.rank >= self.drawn[self.codes]) & (self.rank < (self.drawn + allocation)[self.codes]))
+        self.drawn += allocation
+        self.rounds += 1
+        return self.comments.iloc[chosen]
+
+    def update(self, sentiment_df: pd.DataFrame):
+        """Count a round's labels; rows without a sentiment label (failed) only use up budget"""
+        labelled = sentiment_df[sentiment_df['sentiment'].isin(SENTIMENT_LABELS)]
+        codes = self.posts.get_indexer(labelled['media_id'])
+        sentiment = labelled['sentiment'].to_numpy()
+        n_posts = len(self.posts)
+        self.labelled += np.bincount(codes, minlength=n_posts)
+        self.positive += np.bincount(codes[sentiment == 'positive'], minlength=n_posts)
+        self.negative += np.bincount(codes[sentiment == 'negative'], minlength=n_posts)
+
+    def summary(self) -> Dict:
+        """Rounds, budget used and how many posts reached the target precision"""
+        widths = self.widths()
+        sampled = self.labelled > 0
+        return {
+            'rounds': self.rounds,
+            'budget': self.budget,
+            'spent': self.spent,
+            'precision': self.precision,
+            'posts': len(self.posts),
+            'posts_sampled': int(sampled.sum()),
+            'posts_settled': int(self.settled().sum()),
+            'median_width': float(np.median(widths[sampled])) if sampled.any() else None,
+            'max_width': float(widths[sampled].max()) if sampled.any() else None
+        }
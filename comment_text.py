@@ -0,0 +1,297 @@
+"""
+@treehut comment text scanning
+Vectorized keyword, lexicon and near-duplicate passes over the comment_text column
+"""
+
+import itertools
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+
+def normalize_comment(text: str) -> str:
+    """Canonical form for exact-duplicate matching: NFKC, case-folded, whitespace collapsed"""
+    return ' '.join(unicodedata.normalize('NFKC', text).casefold().split())
+
+
+class KeywordScanner:
+    """Many labelled keywords matched in a single regex pass per comment
+
+    Keywords only match as whole tokens (an optional plural 's' is allowed), so short
+    keywords like 'uk' or 'oz' no longer fire inside unrelated words.
+    """
+
+    def __init__(self, keywords_by_label: dict):
+        self.labels = list(keywords_by_label)
+        self.label_for_keyword = {keyword.lower(): label
+                                  for label, keywords in keywords_by_label.items() for keyword in keywords}
+        # Longest keywords first so multi-word keywords win over their prefixes
+        alternation = '|'.join(re.escape(keyword)
+                               for keyword in sorted(self.label_for_keyword, key=len, reverse=True))
+        self.pattern = re.compile(rf"(?<!\w)({alternation})s?(?!\w)", re.IGNORECASE)
+
+    def scan(self, texts: pd.Series) -> pd.Series:
+        """Per-comment list of distinct labels mentioned, in order of first mention"""
+        matches = texts.fillna('').str.findall(self.pattern)
+        return matches.map(lambda found: list(dict.fromkeys(self.label_for_keyword[m.lower()] for m in found)))
+
+    def hits(self, texts: pd.Series) -> pd.DataFrame:
+        """Long-form (comment index, label) table with one row per comment and label mentioned"""
+        labels = self.scan(texts).explode().dropna()
+        return pd.DataFrame({'label': pd.Categorical(labels, categories=self.labels)}, index=labels.index)
+
+
+# Word lists behind the lexicon baseline sentiment
+POSITIVE_WORDS = ['love', 'amazing', 'great', 'awesome', 'perfect', 'best', 'good', 'nice', 'beautiful']
+NEGATIVE_WORDS = ['hate', 'bad', 'terrible', 'awful', 'worst', 'disappointed', 'sucks']
+
+# Endings a lexicon word may carry and still count ("loves", "loved", "lovely", "nicer");
+# stem endings replace a trailing 'e' ("loving", "terribly")
+LEXICON_SUFFIXES = ['s', 'es', 'd', 'ed', 'ing', 'ly', 'r', 'er', 'st', 'est']
+LEXICON_STEM_SUFFIXES = ['ing', 'ed', 'er', 'est', 'y']
+
+TOKEN_PATTERN = re.compile(r"\w+")
+MENTION_PATTERN = re.compile(r"@[\w.]+")
+SENTIMENT_LABELS = ['positive', 'negative', 'neutral']
+
+# Extra evidence used only by the cascade's confidence estimate. Contraction stems
+# ("don" from "don't") count as negators; a false hit only sends a comment to the LLM.
+NEGATION_WORDS = ['not', 'no', 'never', 'nothing', 'nobody', 'don', 'didn', 'doesn', 'isn', 'wasn', 'aren',
+                  'won', 'cant', 'dont', 'didnt', 'doesnt', 'isnt', 'wasnt', 'wont']
+POSITIVE_EMOJI = '❤😍🥰😊🙌👏🔥💯✨💕💖😘🤩👍'
+NEGATIVE_EMOJI = '😡😠👎😞😢💔🤮😤'
+
+
+def inflected_forms(words) -> set:
+    """Lexicon words together with their common inflections"""
+    forms = set()
+    for word in words:
+        stem = word[:-1] if word.endswith('e') else word
+        forms.add(word)
+        forms.update(word + suffix for suffix in LEXICON_SUFFIXES)
+        forms.update(stem + suffix for suffix in LEXICON_STEM_SUFFIXES)
+    return forms
+
+
+class LexiconScorer:
+    """Bulk positive/negative/neutral labels from word lists, tokenizing each comment once
+
+    A comment with any positive word is positive, otherwise any negative word makes
+    it negative, otherwise it is neutral. Words match whole tokens in any of their
+    inflected forms, so "loved" counts but "goodbye" does not.
+    """
+
+    def __init__(self, positive_words=None, negative_words=None):
+        self.positive_words = inflected_forms(POSITIVE_WORDS if positive_words is None else positive_words)
+        self.negative_words = inflected_forms(NEGATIVE_WORDS if negative_words is None else negative_words)
+
+    def score(self, texts: pd.Series) -> pd.DataFrame:
+        """Hit counts and a categorical label per comment, aligned to texts.index"""
+        # Repeated comments (tag strings, "Entered!") are tokenized once
+        codes, unique_texts = pd.factorize(texts.fillna(''))
+        tokens = pd.Series(unique_texts).str.lower().str.findall(TOKEN_PATTERN)
+        token_counts = tokens.str.len().to_numpy(dtype='int64')
+
+        # One flat token array with the position of the unique text each token came from
+        flat_tokens = pd.Series(np.fromiter(itertools.chain.from_iterable(tokens), dtype=object,
+                                            count=int(token_counts.sum())))
+        owners = np.repeat(np.arange(len(unique_texts)), token_counts)
+        positive_hits = np.bincount(owners[flat_tokens.isin(self.positive_words).to_numpy()],
+                                    minlength=len(unique_texts))[codes]
+        negative_hits = np.bincount(owners[flat_tokens.isin(self.negative_words).to_numpy()],
+                                    minlength=len(unique_texts))[codes]
+
+        labels = np.where(positive_hits > 0, 'positive', np.where(negative_hits > 0, 'negative', 'neutral'))
+        return pd.DataFrame({
+            'positive_hits': positive_hits,
+            'negative_hits': negative_hits,
+            'token_count': token_counts[codes],
+            'lexicon_sentiment': pd.Categorical(labels, categories=SENTIMENT_LABELS)
+        }, index=texts.index)
+
+    def classify(self, texts: pd.Series) -> pd.DataFrame:
+        """Local label and a confidence in [0, 1] per comment, for deciding which need the LLM
+
+        Word and emoji hits both count as evidence. Confidence is 0.95 for comments
+        with nothing but @mentions/emoji and no sentiment emoji. It is 0.9 for
+        one-sided evidence that is repeated or in a short comment (<= 4 words), and
+        0.75 for other one-sided evidence. Mixed or negated evidence gets 0.3, and
+        comments with no evidence get 0.5.
+        """
+        codes, unique_texts = pd.factorize(texts.fillna(''))
+        unique = pd.Series(unique_texts, dtype=object)
+        scores = self.score(unique)
+
+        words = unique.str.replace(MENTION_PATTERN, ' ', regex=True).str.lower().str.findall(TOKEN_PATTERN)
+        content_tokens = words.str.len().to_numpy()
+        exploded = words.explode()
+        negations = (exploded.isin(NEGATION_WORDS).groupby(level=0).sum()
+                     .reindex(unique.index, fill_value=0).to_numpy())
+        positive = scores['positive_hits'].to_numpy() + unique.str.count(f"[{POSITIVE_EMOJI}]").to_numpy()
+        negative = scores['negative_hits'].to_numpy() + unique.str.count(f"[{NEGATIVE_EMOJI}]").to_numpy()
+        evidence = positive + negative
+
+        confidence = np.select(
+            [((positive > 0) & (negative > 0)) | ((negations > 0) & (evidence > 0)),
+             (evidence > 0) & ((evidence >= 2) | (content_tokens <= 4)),
+             evidence > 0,
+             content_tokens == 0],
+            [0.3, 0.9, 0.75, 0.95],
+            default=0.5
+        )
+        labels = np.where(positive > negative, 'positive', np.where(negative > positive, 'negative', 'neutral'))
+        return pd.DataFrame({
+            'local_sentiment': pd.Categorical(labels[codes], categories=SENTIMENT_LABELS),
+            'local_confidence': confidence[codes]
+        }, index=texts.index)
+
+    def polarity(self, texts: pd.Series) -> pd.Series:
+        """Polarity signature per comment: the kinds of sentiment evidence it has and the negators it uses
+
+        Comments with different signatures ("best" vs "worst", "bring back" vs "never
+        bring back") can read opposite ways however similar their text is. The
+        signature is a bitmask: positive/negative words and emoji in the low four
+        bits, one bit per negation word above them.
+        """
+        codes, unique_texts = pd.factorize(texts.fillna(''))
+        unique = pd.Series(unique_texts, dtype=object)
+        scores = self.score(unique)
+        signatures = ((scores['positive_hits'].to_numpy() > 0) * 1
+                      | (scores['negative_hits'].to_numpy() > 0) * 2
+                      | unique.str.contains(f"[{POSITIVE_EMOJI}]").to_numpy() * 4
+                      | unique.str.contains(f"[{NEGATIVE_EMOJI}]").to_numpy() * 8).astype(np.int64)
+
+        words = unique.str.replace(MENTION_PATTERN, ' ', regex=True).str.lower().str.findall(TOKEN_PATTERN)
+        word_counts = words.str.len().to_numpy(dtype='int64')
+        flat_words = pd.Series(np.fromiter(itertools.chain.from_iterable(words), dtype=object,
+                                           count=int(word_counts.sum())))
+        negator_bits = flat_words.map({word: 1 << (4 + bit) for bit, word in enumerate(NEGATION_WORDS)})
+        found = negator_bits.notna().to_numpy()
+        owners = np.repeat(np.arange(len(unique)), word_counts)
+        np.bitwise_or.at(signatures, owners[found], negator_bits[found].to_numpy(dtype=np.int64))
+        return pd.Series(signatures[codes], index=texts.index)
+
+
+# Prime just above 2**32 for the MinHash permutations; with multipliers below 2**31
+# and 32-bit shingles every product fits in uint64
+_MINHASH_PRIME = np.uint64((1 << 32) + 15)
+
+
+class DuplicateCollapser:
+    """Groups comments into exact and near-duplicate clusters so each is classified once
+
+    Comments first collapse by normalized text. Those texts are then compared by
+    MinHash signatures over byte 4-gram shingles, with @mentions masked so tag
+    strings for different friends match. LSH banding proposes candidates, and
+    pairs whose estimated Jaccard similarity reaches threshold join one cluster.
+    Only texts with the same LexiconScorer.polarity signature are compared, so
+    "best"/"worst" or negated variants of a comment never share a label, however
+    clusters chain.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 8,
+                 shingle_size: int = 4, seed: int = 1, scorer: LexiconScorer = None):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        if not 1 <= shingle_size <= 4:
+            raise ValueError("shingle_size must be between 1 and 4 bytes, shingles are packed into 32 bits")
+        self.threshold = threshold
+        self.scorer = scorer if scorer is not None else LexiconScorer()
+        self.bands = bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self.multipliers = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+        self.offsets = rng.integers(0, 1 << 32, num_perm, dtype=np.uint64)
+
+    def _signatures(self, skeletons: list) -> np.ndarray:
+        """MinHash signature matrix, one row per text"""
+        k = self.shingle_size
+        encoded = [text.encode('utf-8').ljust(k, b'\0') for text in skeletons]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        data = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.uint64)
+
+        # Every k-byte window that lies inside one text, packed into one 32-bit integer
+        shingle_counts = lengths - k + 1
+        segment_starts = np.cumsum(shingle_counts) - shingle_counts
+        text_starts = np.cumsum(lengths) - lengths
+        positions = (np.arange(shingle_counts.sum()) - np.repeat(segment_starts, shingle_counts)
+                     + np.repeat(text_starts, shingle_counts))
+        shingles = np.zeros(len(positions), dtype=np.uint64)
+        for offset in range(k):
+            shingles = (shingles << np.uint64(8)) | data[positions + offset]
+
+        signatures = np.empty((len(encoded), len(self.multipliers)), dtype=np.uint64)
+        for i, (a, b) in enumerate(zip(self.multipliers, self.offsets)):
+            hashed = (a * shingles + b) % _MINHASH_PRIME
+            signatures[:, i] = np.minimum.reduceat(hashed, segment_starts)
+        return signatures
+
+    def _near_duplicate_labels(self, signatures: np.ndarray, polarity: np.ndarray) -> np.ndarray:
+        """Connected-component label per text over the LSH candidate pairs that pass threshold
+
+        polarity holds an integer code per text; texts only share a bucket, and so
+        only ever join, with texts of the same code.
+        """
+        n_texts, num_perm = signatures.shape
+        rows = num_perm // self.bands
+        polarity = polarity.astype(np.uint64)[:, None]
+        left, right = [], []
+        for band in range(self.bands):
+            _, first, bucket = np.unique(np.hstack([polarity, signatures[:, band * rows:(band + 1) * rows]]), axis=0,
+                                         return_index=True, return_inverse=True)
+            anchors = first[bucket.ravel()]
+            candidates = np.flatnonzero(anchors != np.arange(n_texts))
+            similar = (signatures[candidates] == signatures[anchors[candidates]]).mean(axis=1) >= self.threshold
+            left.append(candidates[similar])
+            right.append(anchors[candidates[similar]])
+        left, right = np.concatenate(left), np.concatenate(right)
+
+        # Min-label propagation with pointer jumping until every component agrees
+        labels = np.arange(n_texts)
+        while True:
+            updated = labels.copy()
+            np.minimum.at(updated, left, labels[right])
+            np.minimum.at(updated, right, labels[left])
+            updated = updated[updated]
+            if np.array_equal(updated, labels):
+                return labels
+            labels = updated
+
+    def collapse(self, texts: pd.Series) -> pd.DataFrame:
+        """Cluster assignment per comment, aligned to texts.index
+
+        exact_group and cluster are dense ids; cluster_size counts comments in the
+        cluster; exactly one comment per cluster, the first occurrence of its most
+        common text, has is_representative set.
+        """
+        normalized = texts.fillna('').map(normalize_comment)
+        exact_codes, unique_texts = pd.factorize(normalized)
+        if len(unique_texts) == 0:
+            return pd.DataFrame({'exact_group': [], 'cluster': [], 'cluster_size': [], 'is_representative': []},
+                                index=texts.index)
+
+        skeletons = [MENTION_PATTERN.sub('@', text) for text in unique_texts]
+        polarity = pd.factorize(self.scorer.polarity(pd.Series(unique_texts, dtype=object)))[0]
+        labels = self._near_duplicate_labels(self._signatures(skeletons), polarity)
+        text_clusters = pd.factorize(labels)[0]
+
+        # Representative text: the most frequent exact text in each cluster
+        text_counts = np.bincount(exact_codes, minlength=len(unique_texts))
+        by_cluster = np.lexsort((-text_counts, text_clusters))
+        cluster_starts = np.flatnonzero(np.r_[True, np.diff(text_clusters[by_cluster]) != 0])
+        representative_texts = by_cluster[cluster_starts]
+
+        clusters = text_clusters[exact_codes]
+        first_comment = np.full(len(unique_texts), -1)
+        first_comment[exact_codes[::-1]] = np.arange(len(exact_codes))[::-1]
+        is_representative = np.zeros(len(texts), dtype=bool)
+        is_representative[first_comment[representative_texts]] = True
+
+        return pd.DataFrame({
+            'exact_group': exact_codes,
+            'cluster': clusters,
+            'cluster_size': np.bincount(clusters)[clusters],
+            'is_representative': is_representative
+        }, index=texts.index)
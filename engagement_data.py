@@ -0,0 +1,302 @@
+"""
+@treehut engagement data loading
+Shared CSV ingestion, preparation and on-disk caching for the analysis scripts
+"""
+
+import hashlib
+import os
+import re
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Bump whenever prepare_engagements() or normalize_engagements() change their output
+CACHE_VERSION = 3
+CACHE_DIR_NAME = '.treehut_cache'
+CACHED_TABLES = ('posts', 'comments')
+FINGERPRINT_SAMPLE_BYTES = 1 << 20
+
+# Timestamp layouts tried by parse_timestamps(). 'ISO8601' is pandas' vectorized ISO
+# parser and covers the date/time separator and fractional-second variants in one pass.
+TIMESTAMP_FORMATS = [
+    'ISO8601',
+    '%m/%d/%Y %H:%M:%S',
+    '%m/%d/%Y %H:%M',
+    '%m/%d/%Y',
+    '%d.%m.%Y %H:%M:%S'
+]
+FORMAT_DETECTION_SAMPLE = 1000
+
+# Caption regex marking giveaway/contest posts
+GIVEAWAY_PATTERN = 'giveaway|contest|win'
+
+
+def _parse_with_format(values: pd.Series, fmt: str) -> pd.Series:
+    """One vectorized pass; rows the format rejects come back as NaT"""
+    try:
+        parsed = pd.to_datetime(values, format=fmt, errors='coerce')
+    except ValueError:
+        # Naive and offset-bearing rows mixed in one pass: normalize everything to UTC
+        parsed = pd.to_datetime(values, format=fmt, errors='coerce', utc=True)
+    if getattr(parsed.dt, 'tz', None) is not None:
+        parsed = parsed.dt.tz_convert('UTC').dt.tz_localize(None)
+    return parsed
+
+
+def parse_timestamps(values: pd.Series, formats=None):
+    """Parse timestamps with vectorized fixed-format passes instead of per-element inference
+
+    Formats are ordered by how often they match a sample, and each pass only sees the
+    rows no earlier format accepted. Returns the parsed series and a report with the
+    row count per format and the index of rows no format matched; those rows fall back
+    to pandas' mixed-format inference so the result stays compatible.
+    """
+    formats = TIMESTAMP_FORMATS if formats is None else formats
+    present = values.notna()
+
+    # Rank formats by hits on a sample so the dominant layout is tried first
+    sample = values[present].head(FORMAT_DETECTION_SAMPLE)
+    sample_hits = {fmt: _parse_with_format(sample, fmt).notna().sum() for fmt in formats}
+    ordered_formats = sorted(formats, key=lambda fmt: -sample_hits[fmt])
+
+    parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    remaining = values[present]
+    format_counts = {}
+    for fmt in ordered_formats:
+        if remaining.empty:
+            break
+        group = _parse_with_format(remaining, fmt)
+        matched = group.notna()
+        if matched.all():
+            parsed[group.index] = group.astype('datetime64[ns]')
+            format_counts[fmt] = len(group)
+            remaining = remaining.iloc[:0]
+        elif matched.any():
+            parsed[group.index[matched]] = group[matched].astype('datetime64[ns]')
+            format_counts[fmt] = int(matched.sum())
+            remaining = remaining[~matched]
+
+    if not remaining.empty:
+        # Offsets in leftover rows are normalized to naive UTC to match the fixed-format rows
+        fallback = pd.to_datetime(remaining, format='mixed', errors='coerce', utc=True).dt.tz_localize(None)
+        parsed[remaining.index] = fallback.astype('datetime64[ns]')
+
+    return parsed, {'format_counts': format_counts, 'unmatched': remaining.index}
+
+
+def prepare_engagements(df: pd.DataFrame) -> pd.DataFrame:
+    """Parse timestamps and derive the columns shared by both analyzers"""
+    raw_timestamps = df['timestamp']
+    df['timestamp'], timestamp_report = parse_timestamps(raw_timestamps)
+    unmatched = timestamp_report['unmatched']
+    if len(unmatched) > 0:
+        examples = ', '.join(repr(v) for v in raw_timestamps[unmatched[:3]])
+        print(f"⚠️ {len(unmatched):,} timestamps matched no known format (parsed by inference): {examples}")
+    df['date'] = df['timestamp'].dt.date
+    df['hour'] = df['timestamp'].dt.hour
+    df['day_of_week'] = df['timestamp'].dt.day_name()
+
+    # Clean text data
+    df['comment_text'] = df['comment_text'].fillna('')
+    df['media_caption'] = df['media_caption'].fillna('')
+
+    # Calculate comment length
+    df['comment_length'] = df['comment_text'].str.len()
+    return df
+
+
+def caption_flags(captions: pd.Series) -> pd.DataFrame:
+    """Post-type flags derived from caption text"""
+    lowered = captions.str.lower()
+    return pd.DataFrame({
+        'is_giveaway': lowered.str.contains(GIVEAWAY_PATTERN, regex=True),
+        'is_pr_recruitment': lowered.str.contains('pr', regex=False)
+                             & lowered.str.contains('application|apply', regex=True)
+    }, index=captions.index)
+
+
+def normalize_engagements(df: pd.DataFrame):
+    """Split prepared rows into a post dimension and a slim comments fact table
+
+    posts is indexed by media_id and holds each caption once with its features and
+    first comment timestamp. comments keeps one row per comment with media_id as a
+    categorical whose categories are posts.index, so comment-to-post lookups are
+    integer indexing through the category codes.
+    """
+    grouped = df.groupby('media_id', sort=True)
+    posts = pd.DataFrame({
+        'media_caption': grouped['media_caption'].first(),
+        'first_timestamp': grouped['timestamp'].min()
+    })
+    posts['caption_length'] = posts['media_caption'].str.len()
+    posts = posts.join(caption_flags(posts['media_caption']))
+
+    comments = df.drop(columns=['media_caption'])
+    comments['media_id'] = pd.Categorical(comments['media_id'], categories=posts.index)
+    comments['day_of_week'] = comments['day_of_week'].astype('category')
+    return posts, comments.reset_index(drop=True)
+
+
+class CaptionTagger:
+    """Keyword taxonomy compiled once and evaluated once per unique caption"""
+
+    def __init__(self, taxonomy: dict):
+        # taxonomy maps group -> tag -> keywords; a tag matches when any keyword occurs (case-insensitive)
+        self.columns = pd.MultiIndex.from_tuples(
+            [(group, tag) for group, tags in taxonomy.items() for tag in tags], names=['group', 'tag'])
+        self.patterns = [re.compile('|'.join(re.escape(keyword) for keyword in keywords), re.IGNORECASE)
+                         for tags in taxonomy.values() for keywords in tags.values()]
+
+    def tag(self, captions: pd.Series) -> pd.DataFrame:
+        """Boolean tag matrix with one row per caption and one (group, tag) column per tag"""
+        codes, unique_captions = pd.factorize(captions.fillna(''))
+        matrix = np.array([[pattern.search(caption) is not None for pattern in self.patterns]
+                           for caption in unique_captions], dtype=bool).reshape(len(unique_captions), len(self.patterns))
+        return pd.DataFrame(matrix[codes], index=captions.index, columns=self.columns)
+
+
+def post_values(values: pd.Series, comments: pd.DataFrame) -> pd.Series:
+    """Broadcast a series aligned to posts.index onto comment rows via the media_id category codes"""
+    broadcast = values.to_numpy()[comments['media_id'].cat.codes.to_numpy()]
+    return pd.Series(broadcast, index=comments.index, name=values.name)
+
+
+def source_fingerprint(csv_path: str) -> str:
+    """Fingerprint a CSV by size, mtime and a hash of its first and last MiB"""
+    stat = os.stat(csv_path)
+    digest = hashlib.sha256(f"{CACHE_VERSION}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    with open(csv_path, 'rb') as f:
+        digest.update(f.read(FINGERPRINT_SAMPLE_BYTES))
+        if stat.st_size > FINGERPRINT_SAMPLE_BYTES:
+            f.seek(max(stat.st_size - FINGERPRINT_SAMPLE_BYTES, FINGERPRINT_SAMPLE_BYTES))
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def cache_dir_for(csv_path: str) -> str:
+    """Location of the prepared-dataset cache for a given CSV"""
+    csv_path = os.path.abspath(csv_path)
+    cache_root = os.path.join(os.path.dirname(csv_path), CACHE_DIR_NAME)
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(cache_root, f"{stem}.{source_fingerprint(csv_path)}")
+
+
+def _read_cache(cache_dir: str):
+    """Memory-map the cached posts/comments tables, or return None if unavailable"""
+    try:
+        from pyarrow import feather
+    except ImportError:
+        return None
+    paths = [os.path.join(cache_dir, f"{table}.feather") for table in CACHED_TABLES]
+    if not all(os.path.exists(path) for path in paths):
+        return None
+    try:
+        posts, comments = (feather.read_table(path, memory_map=True).to_pandas() for path in paths)
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable cache {cache_dir}: {str(e)[:100]}")
+        return None
+    return posts.set_index('media_id'), comments
+
+
+def _write_cache(posts: pd.DataFrame, comments: pd.DataFrame, cache_dir: str):
+    """Write both tables as uncompressed Feather and drop stale fingerprints"""
+    try:
+        from pyarrow import feather
+    except ImportError:
+        print("ℹ️ Install pyarrow to enable the prepared-dataset cache")
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # Write to temp files first so a crash never leaves a truncated cache behind
+    for table, df in zip(CACHED_TABLES, (posts.reset_index(), comments.reset_index(drop=True))):
+        path = os.path.join(cache_dir, f"{table}.feather")
+        feather.write_feather(df, path + '.tmp', compression='uncompressed')
+        os.replace(path + '.tmp', path)
+
+    # Older fingerprints of the same CSV can never be hit again
+    cache_root, cache_name = os.path.split(cache_dir)
+    stem = cache_name.rsplit('.', 1)[0]
+    for name in os.listdir(cache_root):
+        if name != cache_name and name.rsplit('.', 1)[0] == stem:
+            shutil.rmtree(os.path.join(cache_root, name), ignore_errors=True)
+
+
+def load_engagements(csv_path: str = 'engagements.csv', use_cache: bool = True):
+    """Load the (posts, comments) tables, reusing the columnar cache when the CSV is unchanged"""
+    cache_dir = cache_dir_for(csv_path) if use_cache else None
+    if cache_dir:
+        tables = _read_cache(cache_dir)
+        if tables is not None:
+            print(f"⚡ Loaded prepared data from cache '{cache_dir}'")
+            return tables
+
+    posts, comments = normalize_engagements(prepare_engagements(pd.read_csv(csv_path)))
+    if cache_dir:
+        _write_cache(posts, comments, cache_dir)
+    return posts, comments
+
+
+def stream_engagements(csv_path: str = 'engagements.csv', chunksize: int = 250_000):
+    """Yield prepared chunks of the CSV so peak memory is bounded by chunk size"""
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        yield prepare_engagements(chunk)
+
+
+class StreamingAggregates:
+    """Engagement aggregates maintained incrementally over streamed chunks"""
+
+    def __init__(self, tagger: CaptionTagger):
+        self.tagger = tagger
+        self.total_comments = 0
+        self.post_counts = pd.Series(dtype='int64')
+        self.daily_counts = pd.Series(dtype='int64')
+        self.hourly_counts = pd.Series(dtype='int64')
+        self.first_captions = {}
+        self.min_date = None
+        self.max_date = None
+        self.tag_comments = pd.Series(0, index=tagger.columns, dtype='int64')
+        self.tag_posts = {tag: set() for tag in tagger.columns}
+
+    @staticmethod
+    def _add_counts(running: pd.Series, counts: pd.Series) -> pd.Series:
+        return running.add(counts, fill_value=0).astype('int64')
+
+    def update(self, chunk: pd.DataFrame):
+        """Fold one prepared chunk into the running aggregates"""
+        if chunk.empty:
+            return
+        self.total_comments += len(chunk)
+        self.post_counts = self._add_counts(self.post_counts, chunk['media_id'].value_counts())
+        self.daily_counts = self._add_counts(self.daily_counts, chunk['date'].value_counts())
+        self.hourly_counts = self._add_counts(self.hourly_counts, chunk['hour'].value_counts())
+
+        chunk_min, chunk_max = chunk['date'].min(), chunk['date'].max()
+        self.min_date = chunk_min if self.min_date is None else min(self.min_date, chunk_min)
+        self.max_date = chunk_max if self.max_date is None else max(self.max_date, chunk_max)
+
+        # Each post's caption is stored once, from the first comment seen for it
+        posts = chunk.drop_duplicates('media_id')[['media_id', 'media_caption']]
+        for media_id, caption in zip(posts['media_id'], posts['media_caption']):
+            self.first_captions.setdefault(media_id, caption)
+
+        # Tags are evaluated per (post, caption) pair in the chunk, then weighted by comment count
+        pairs = chunk.groupby(['media_id', 'media_caption']).size().reset_index(name='comments')
+        tags = self.tagger.tag(pairs['media_caption'])
+        self.tag_comments += tags.mul(pairs['comments'], axis=0).sum().astype('int64')
+        for tag in tags.columns:
+            self.tag_posts[tag].update(pairs.loc[tags[tag].to_numpy(), 'media_id'])
+
+    def tag_stats(self, tag) -> tuple:
+        """(matching comments, matching posts) for a caption tag"""
+        return int(self.tag_comments[tag]), len(self.tag_posts[tag])
+
+
+def aggregate_stream(csv_path: str, tagger: CaptionTagger, chunksize: int = 250_000) -> StreamingAggregates:
+    """Stream the CSV once and return its incremental aggregates"""
+    aggregates = StreamingAggregates(tagger)
+    for i, chunk in enumerate(stream_engagements(csv_path, chunksize=chunksize)):
+        aggregates.update(chunk)
+        print(f"   Streamed chunk {i+1} ({aggregates.total_comments:,} rows so far)...", end='\r')
+    print()
+    return aggregates
@@ -0,0 +1,263 @@
+"""
+@treehut fake Anthropic backend
+Deterministic in-process stand-in for the Messages and Message Batches APIs, so the
+sentiment pipeline can be run, timed and regression-tested offline
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from comment_text import SENTIMENT_LABELS
+
+FAKE_THEMES = ['product_quality', 'scent', 'texture', 'price', 'availability',
+               'packaging', 'giveaway', 'brand_love', 'question', 'tag_friend']
+SINGLE_COMMENT_PREFIX = 'Comment: "'
+
+
+class FakeAPIError(Exception):
+    """Error response with the status code and headers the retry logic reads"""
+
+    def __init__(self, status_code: int, error_type: str, headers: Dict = None):
+        super().__init__(f"Error code: {status_code} - {error_type}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+def fake_sentiment(comment: str) -> Dict:
+    """Deterministic sentiment dict for a comment, derived from a hash of its text"""
+    digest = hashlib.sha256(comment.encode()).digest()
+    themes = [FAKE_THEMES[digest[2] % len(FAKE_THEMES)]]
+    if digest[3] % 2:
+        themes.append(FAKE_THEMES[digest[4] % len(FAKE_THEMES)])
+    return {
+        "sentiment": SENTIMENT_LABELS[digest[0] % len(SENTIMENT_LABELS)],
+        "confidence": round(0.5 + digest[1] / 510, 2),
+        "themes": list(dict.fromkeys(themes)),
+        "feedback": f"fake feedback {digest[5]:02x}"
+    }
+
+
+def _packed_items(content: str) -> List[Dict]:
+    """(id, comment) objects of a packed request, or [] for a single-comment request"""
+    items = []
+    for line in content.splitlines():
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError:
+            return []
+        if not isinstance(item, dict) or 'id' not in item or 'comment' not in item:
+            return []
+        items.append(item)
+    return items
+
+
+class FakeBackend:
+    """Offline backend answering sentiment requests with configurable latency, errors and bad output
+
+    Latency is lognormal with median latency_median seconds and log-spread
+    latency_sigma (0 makes it fixed). A request fails with 429 (sending a
+    retry-after of retry_after seconds) at rate_limit_rate and with 529 at
+    overloaded_rate. Otherwise the answer is malformed at malformed_rate: prose
+    around the JSON, truncated JSON or a refusal. Every draw is seeded by the
+    request itself and how often it has been sent, so a run produces the same
+    outcomes however its requests interleave.
+
+    Prompt caching is emulated: the first request with a cached system prompt
+    writes it and later ones read it. Responses and 429s carry rate-limit headers
+    reporting requests_per_minute and tokens_per_minute (None leaves a header
+    out); the limits are reported, not enforced. Batches end after batch_polls
+    retrieve() calls. outcomes counts what was served.
+    """
+
+    def __init__(self, seed: int = 0, latency_median: float = 0.3, latency_sigma: float = 0.5,
+                 rate_limit_rate: float = 0.0, overloaded_rate: float = 0.0, malformed_rate: float = 0.0,
+                 retry_after: float = 1.0, batch_polls: int = 1,
+                 requests_per_minute: Optional[int] = 4000, tokens_per_minute: Optional[int] = 400_000):
+        self.seed = seed
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.rate_limit_rate = rate_limit_rate
+        self.overloaded_rate = overloaded_rate
+        self.malformed_rate = malformed_rate
+        self.retry_after = retry_after
+        self.batch_polls = batch_polls
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.outcomes = Counter()
+        self._seen = Counter()
+        self._cached_prompts = set()
+        self._batches = {}
+        self._lock = threading.Lock()
+
+    def client(self):
+        return FakeClient(self)
+
+    def async_client(self):
+        return AsyncFakeClient(self)
+
+    def _limit_headers(self) -> Dict[str, str]:
+        limits = {'anthropic-ratelimit-requests-limit': self.requests_per_minute,
+                  'anthropic-ratelimit-tokens-limit': self.tokens_per_minute}
+        return {header: str(limit) for header, limit in limits.items() if limit is not None}
+
+    def _draw(self, params: Dict) -> random.Random:
+        """Random stream for this request, keyed by its content and repeat count"""
+        key = json.dumps(params, sort_keys=True)
+        with self._lock:
+            self._seen[key] += 1
+            repeat = self._seen[key]
+        return random.Random(f"{self.seed}:{repeat}:{key}")
+
+    def _count(self, outcome: str):
+        with self._lock:
+            self.outcomes[outcome] += 1
+
+    def _latency(self, rng: random.Random) -> float:
+        if self.latency_sigma <= 0:
+            return self.latency_median
+        return self.latency_median * math.exp(rng.gauss(0.0, self.latency_sigma))
+
+    def _usage(self, params: Dict, output: str) -> SimpleNamespace:
+        system = params.get('system') or []
+        system_text = system if isinstance(system, str) else ''.join(block['text'] for block in system)
+        cached = not isinstance(system, str) and any('cache_control' in block for block in system)
+        system_tokens = len(system_text) // 4
+        with self._lock:
+            hit = cached and system_text in self._cached_prompts
+            if cached:
+                self._cached_prompts.add(system_text)
+        return SimpleNamespace(
+            input_tokens=len(params['messages'][0]['content']) // 4 + (0 if cached else system_tokens),
+            output_tokens=len(output) // 4 + 1,
+            cache_creation_input_tokens=system_tokens if cached and not hit else 0,
+            cache_read_input_tokens=system_tokens if hit else 0
+        )
+
+    def _respond(self, params: Dict, rng: random.Random) -> SimpleNamespace:
+        """Message for params, or raises FakeAPIError"""
+        draw = rng.random()
+        if draw < self.rate_limit_rate:
+            self._count('rate_limit')
+            raise FakeAPIError(429, 'rate_limit_error', dict(self._limit_headers(), **{'retry-after': str(self.retry_after)}))
+        if draw < self.rate_limit_rate + self.overloaded_rate:
+            self._count('overloaded')
+            raise FakeAPIError(529, 'overloaded_error')
+
+        content = params['messages'][0]['content']
+        items = _packed_items(content)
+        if items:
+            text = json.dumps([dict(id=item['id'], **fake_sentiment(item['comment'])) for item in items])
+        else:
+            if content.startswith(SINGLE_COMMENT_PREFIX) and content.endswith('"'):
+                content = content[len(SINGLE_COMMENT_PREFIX):-1]
+            text = json.dumps(fake_sentiment(content))
+
+        if rng.random() < self.malformed_rate:
+            self._count('malformed')
+            text = rng.choice([f"Here is the analysis:\n{text}\nLet me know if you need more.",
+                               text[:len(text) // 2],
+                               "I'm not able to analyze this comment."])
+        else:
+            self._count('ok')
+        return SimpleNamespace(
+            id=f"msg_fake_{rng.getrandbits(32):08x}", type='message', role='assistant', model=params['model'],
+            content=[SimpleNamespace(type='text', text=text)], stop_reason='end_turn',
+            usage=self._usage(params, text)
+        )
+
+
+class _Messages:
+    def __init__(self, backend: FakeBackend):
+        self.backend = backend
+        self.batches = _Batches(backend)
+
+    def create(self, **params):
+        rng = self.backend._draw(params)
+        time.sleep(self.backend._latency(rng))
+        return self.backend._respond(params, rng)
+
+
+class _AsyncMessages:
+    def __init__(self, backend: FakeBackend):
+        self.backend = backend
+        self.with_raw_response = _AsyncRawMessages(self)
+
+    async def create(self, **params):
+        rng = self.backend._draw(params)
+        await asyncio.sleep(self.backend._latency(rng))
+        return self.backend._respond(params, rng)
+
+
+class _AsyncRawMessages:
+    """messages.with_raw_response: the message behind parse(), with rate-limit headers"""
+
+    def __init__(self, messages: _AsyncMessages):
+        self.messages = messages
+
+    async def create(self, **params):
+        message = await self.messages.create(**params)
+
+        async def parse():
+            return message
+        return SimpleNamespace(headers=self.messages.backend._limit_headers(), parse=parse)
+
+
+class _Batches:
+    """Message Batches with results decided at submission and no per-request latency"""
+
+    def __init__(self, backend: FakeBackend):
+        self.backend = backend
+
+    def create(self, requests: List[Dict]):
+        entries = []
+        for request in requests:
+            rng = self.backend._draw(request['params'])
+            try:
+                result = SimpleNamespace(type='succeeded', message=self.backend._respond(request['params'], rng))
+            except FakeAPIError as e:
+                result = SimpleNamespace(type='errored', error=SimpleNamespace(type=str(e)))
+            entries.append(SimpleNamespace(custom_id=request['custom_id'], result=result))
+        with self.backend._lock:
+            batch_id = f"msgbatch_fake_{len(self.backend._batches) + 1}"
+            self.backend._batches[batch_id] = {'entries': entries, 'polls': 0}
+        return self.retrieve(batch_id, poll=False)
+
+    def retrieve(self, batch_id: str, poll: bool = True):
+        batch = self.backend._batches[batch_id]
+        batch['polls'] += poll
+        ended = batch['polls'] >= self.backend.batch_polls
+        counts = Counter(entry.result.type for entry in batch['entries']) if ended else Counter()
+        return SimpleNamespace(
+            id=batch_id, processing_status='ended' if ended else 'in_progress',
+            request_counts=SimpleNamespace(processing=0 if ended else len(batch['entries']),
+                                           succeeded=counts['succeeded'], errored=counts['errored'],
+                                           canceled=0, expired=0)
+        )
+
+    def results(self, batch_id: str):
+        return iter(self.backend._batches[batch_id]['entries'])
+
+
+class FakeClient:
+    """Synchronous client: messages.create and messages.batches"""
+
+    def __init__(self, backend: FakeBackend):
+        self.messages = _Messages(backend)
+
+
+class AsyncFakeClient:
+    """Async client: messages.create, closed after each event loop like AsyncAnthropic"""
+
+    def __init__(self, backend: FakeBackend):
+        self.messages = _AsyncMessages(backend)
+
+    async def close(self):
+        pass
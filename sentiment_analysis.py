@@ -7,193 +7,483 @@ Analyzes customer sentiment in Instagram comments for brand reputation insights
 import pandas as pd
 import numpy as np
 import json
-import time
 import os
+import time
 from datetime import datetime
-import anthropic
 from typing import Dict, List, Optional
-import matplotlib.pyplot as plt
-import seaborn as sns
+
+from chart_rendering import ChartTask, render_charts
+from comment_sampling import SequentialSampler, stratified_sample, wilson_interval
+from comment_text import SENTIMENT_LABELS, DuplicateCollapser, LexiconScorer
+from engagement_data import load_engagements
+from sentiment_cache import SentimentCache
+from sentiment_checkpoint import SentimentCheckpoint
+from sentiment_client import (BATCH_STATE_DIR, DEFAULT_CONCURRENCY, DEFAULT_REQUESTS_PER_MINUTE,
+                              DEFAULT_TOKENS_PER_MINUTE, FAILED, AnthropicBackend, AsyncSentimentClassifier,
+                              BatchSentimentJob)
+from sentiment_metrics import DEFAULT_METRICS_PATH, write_metrics
+from sentiment_themes import ThemeTable, ThemeVocabulary
+
+# Result rows are written to the checkpoint in batches of this many rows, or this often
+CHECKPOINT_BATCH_ROWS = 1000
+CHECKPOINT_BATCH_SECONDS = 1.0
+
 
 class TreeHutSentimentAnalyzer:
-    def __init__(self, csv_path='engagements.csv', api_key=None):
-        """Initialize the sentiment analyzer"""
-        self.df = pd.read_csv(csv_path)
+    def __init__(self, csv_path='engagements.csv', api_key=None, use_cache=True,
+                 concurrency=DEFAULT_CONCURRENCY, requests_per_minute=None,
+                 tokens_per_minute=None, pack_size=1, result_cache=True,
+                 dedup_threshold=0.8, cascade_threshold=0.8, backend=None):
+        """Initialize the sentiment analyzer
+
+        backend supplies the API clients: AnthropicBackend (the default) or an
+        offline stand-in such as fake_anthropic.FakeBackend. Rate limits left as
+        None follow the limits the API reports for the account.
+        """
+        self.posts, self.df = load_engagements(csv_path, use_cache=use_cache)
         self.prepare_data()
         
-        # Initialize Claude API
-        if api_key:
-            self.client = anthropic.Anthropic(api_key=api_key)
-        else:
-            # Try to get from environment variable
-            try:
-                self.client = anthropic.Anthropic()
-            except Exception as e:
-                print("❌ Error: Please set ANTHROPIC_API_KEY environment variable or pass api_key parameter")
-                print("   export ANTHROPIC_API_KEY='your-api-key-here'")
-                raise e
+        # Initialize Claude API (the SDK is imported lazily so chart-only and error paths skip it)
+        self.backend = backend or AnthropicBackend(api_key=api_key)
+        try:
+            # Key from the api_key parameter or the environment variable
+            self.client = self.backend.client()
+        except Exception as e:
+            print("❌ Error: Please set ANTHROPIC_API_KEY environment variable or pass api_key parameter")
+            print("   export ANTHROPIC_API_KEY='your-api-key-here'")
+            raise e
+
+        # Comments the local scorer labels with at least this confidence never reach the
+        # LLM; None sends every comment to Claude
+        self.local_scorer = LexiconScorer()
+        self.cascade_threshold = cascade_threshold
+
+        # Near-identical comments (tag strings, "Entered!") are classified once per cluster
+        self.collapser = DuplicateCollapser(threshold=dedup_threshold, scorer=self.local_scorer)
+
+        # Results of earlier runs, so repeated comments skip the API entirely
+        self.cache = SentimentCache() if result_cache else None
+
+        # Concurrent, rate-limited engine used for sampled runs
+        self.classifier = AsyncSentimentClassifier(
+            backend=self.backend, concurrency=concurrency,
+            requests_per_minute=requests_per_minute, tokens_per_minute=tokens_per_minute,
+            pack_size=pack_size, cache=self.cache
+        )
+        # Retry and failure counts of the last classification run, for the report
+        self.run_health = {}
+        # Canonical theme names interned across runs, and the theme table of the last result frame
+        self.theme_vocabulary = ThemeVocabulary()
+        self._themes = None
         
         print(f"✅ Initialized sentiment analyzer with {len(self.df):,} comments")
     
     def prepare_data(self):
         """Clean and prepare the data"""
-        self.df['timestamp'] = pd.to_datetime(self.df['timestamp'], format='mixed')
-        self.df['comment_text'] = self.df['comment_text'].fillna('')
-        self.df['media_caption'] = self.df['media_caption'].fillna('')
+        # Timestamps and text columns arrive parsed and filled from load_engagements(),
+        # with captions held once per post in self.posts
         
         # Filter out very short comments (likely just emojis or tags)
         self.df = self.df[self.df['comment_text'].str.len() > 5]
         print(f"📊 Filtered to {len(self.df):,} substantive comments for analysis")
+        
+        # Free lexicon baseline for every comment, including those the LLM never sees
+        self.df = self.df.assign(lexicon_sentiment=LexiconScorer().score(self.df['comment_text'])['lexicon_sentiment'])
     
     def analyze_comment_sentiment(self, comment: str) -> Dict:
-        """Analyze sentiment of a single comment using Claude"""
-        prompt = f"""
-        Analyze the sentiment of this Instagram comment about TreeHut beauty products:
-        
-        Comment: "{comment}"
-        
-        Please provide:
-        1. Overall sentiment: positive, negative, or neutral
-        2. Confidence score: 0.0 to 1.0
-        3. Key themes: list of 1-3 themes (e.g., "product_quality", "scent", "texture", "price", "availability")
-        4. Specific feedback: any specific praise or complaints
-        
-        Respond in JSON format:
-        {{
-            "sentiment": "positive|negative|neutral",
-            "confidence": 0.85,
-            "themes": ["product_quality", "scent"],
-            "feedback": "brief summary of specific feedback"
-        }}
+        """Analyze sentiment of a single comment using Claude
+
+        Goes through the classifier, so it shares its cache, retries and rate limits;
+        a comment that still fails comes back with sentiment FAILED.
         """
-        
-        try:
-            response = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=200,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            
-            # Parse JSON response
-            result = json.loads(response.content[0].text)
-            return result
-            
-        except Exception as e:
-            print(f"⚠️ Error analyzing comment: {str(e)[:100]}...")
-            return {
-                "sentiment": "neutral",
-                "confidence": 0.0,
-                "themes": ["error"],
-                "feedback": "analysis_failed"
-            }
+        return self.classifier.classify([comment])[0]
     
-    def analyze_sample_comments(self, sample_size: int = 100, random_seed: int = 42) -> pd.DataFrame:
-        """Analyze sentiment for a sample of comments, ensuring diverse post coverage"""
-        print(f"\n🔍 Analyzing sentiment for {sample_size} sample comments...")
-
-        # Sample comments strategically to get diverse post coverage
-        np.random.seed(random_seed)
+    def analyze_sample_comments(self, sample_size: int = 100, random_seed: int = 42,
+                                checkpoint: Optional[SentimentCheckpoint] = None) -> pd.DataFrame:
+        """Analyze sentiment for a sample of comments, ensuring diverse post coverage
 
-        # Get top posts by comment count to ensure we analyze high-impact content
-        top_posts = self.df.groupby('media_id').size().sort_values(ascending=False).head(20)
-
-        # Sample from top posts (70%) and random posts (30%) for balanced coverage
-        top_post_sample_size = int(sample_size * 0.7)
-        random_sample_size = sample_size - top_post_sample_size
-
-        # Sample from top posts
-        top_posts_df = self.df[self.df['media_id'].isin(top_posts.index)]
-        top_sample = top_posts_df.sample(n=min(top_post_sample_size, len(top_posts_df)))
-
-        # Sample from remaining posts
-        remaining_df = self.df[~self.df['media_id'].isin(top_posts.index)]
-        random_sample = remaining_df.sample(n=min(random_sample_size, len(remaining_df)))
-
-        # Combine samples
-        sample_df = pd.concat([top_sample, random_sample]).sample(frac=1)  # Shuffle
-
-        results = []
-        for idx, row in sample_df.iterrows():
-            print(f"   Processing comment {len(results)+1}/{len(sample_df)}...", end='\r')
-
-            sentiment_result = self.analyze_comment_sentiment(row['comment_text'])
-
-            results.append({
-                'media_id': row['media_id'],
-                'comment_text': row['comment_text'],
-                'media_caption': row['media_caption'][:100] + "..." if len(row['media_caption']) > 100 else row['media_caption'],
-                'timestamp': row['timestamp'],
-                'sentiment': sentiment_result['sentiment'],
-                'confidence': sentiment_result['confidence'],
-                'themes': sentiment_result['themes'],
-                'feedback': sentiment_result['feedback']
-            })
-
-            # Rate limiting - be respectful to the API
-            time.sleep(0.5)
+        With a checkpoint, each result row is appended to it as it completes, and
+        comments a resumed checkpoint already holds are not classified again.
+        """
+        print(f"\n🔍 Analyzing sentiment for {sample_size} sample comments...")
 
+        # Proportional sample across posts and days, so busy posts get more comments
+        # without quiet posts or dates dropping out
+        sample_df = stratified_sample(self.df, sample_size, seed=random_seed)
+        start_time = time.perf_counter()
+
+        # Classify one comment per duplicate cluster concurrently; results come back in order
+        results = self._classify_with_checkpoint(sample_df, lambda representatives, on_result: self.classifier.classify(
+            representatives['comment_text'].tolist(),
+            progress=lambda done, total: print(f"   Processing comment {done}/{total}...", end='\r'),
+            on_result=on_result
+        ), checkpoint)
         print(f"\n✅ Completed sentiment analysis for {len(results)} comments across {sample_df['media_id'].nunique()} posts")
-        return pd.DataFrame(results)
+        self._report_cache()
+        self._report_run(results, self.classifier.stats(), time.perf_counter() - start_time)
+        return results
+
+    def analyze_adaptive_sample(self, budget: int, precision: float = 0.2, round_size: Optional[int] = None,
+                                random_seed: int = 42,
+                                checkpoint: Optional[SentimentCheckpoint] = None) -> pd.DataFrame:
+        """Classify comments in rounds until every post's sentiment shares are known to within precision
+
+        A SequentialSampler sends each round to the posts whose positive/negative
+        share intervals are still wider than precision, and stops when all posts
+        are settled or budget comments have been classified. Rounds go through the
+        usual collapse, cascade and checkpoint, so --resume replays finished rounds
+        from the checkpoint instead of the API.
+        """
+        print(f"\n🎯 Adaptive sampling: up to {budget:,} comments until each post's positive and negative "
+              f"shares are within a {precision:.0%} wide interval...")
+        sampler = SequentialSampler(self.df, budget, precision=precision, round_size=round_size, seed=random_seed)
+        start_time = time.perf_counter()
+
+        def classify(representatives, on_result):
+            return self.classifier.classify(representatives['comment_text'].tolist(), on_result=on_result)
+
+        rounds = []
+        while not sampler.done():
+            rows = self._classify_with_checkpoint(sampler.next_round(), classify, checkpoint)
+            sampler.update(rows)
+            rounds.append(rows)
+            settled = sampler.settled()
+            print(f"   🎯 Round {sampler.rounds}: {len(rows):,} comments, {sampler.spent:,}/{sampler.budget:,} of the "
+                  f"budget used, {settled.sum():,}/{len(settled):,} posts settled")
+
+        results = pd.concat(rounds, ignore_index=True)
+        summary = sampler.summary()
+        print(f"✅ Completed adaptive sentiment analysis for {len(results):,} comments across "
+              f"{summary['posts_sampled']} posts in {summary['rounds']} rounds; {summary['posts_settled']}/"
+              f"{summary['posts']} posts reached the target precision")
+        self._report_cache()
+        self._report_run(results, self.classifier.stats(), time.perf_counter() - start_time)
+        self.run_health['adaptive_sampling'] = summary
+        return results
+
+    def classify_corpus(self, checkpoint: SentimentCheckpoint, comments_df: Optional[pd.DataFrame] = None,
+                        chunk_size: int = 5000) -> pd.DataFrame:
+        """Stream every comment through the classifier chunk by chunk, printing throughput and ETA
+
+        Result rows go straight to the checkpoint, so memory stays bounded by one
+        chunk; the full result table is read back from it at the end. Duplicates
+        are collapsed within each chunk, and repeats across chunks are answered by
+        the result cache. With a resumed checkpoint, classified comments are skipped.
+        Failed comments are not checkpointed, so --resume retries them, but their
+        rows are added to the returned table so the run's failures are reported.
+        """
+        comments_df = self.df if comments_df is None else comments_df
+        done = checkpoint.processed_ids()
+        remaining = comments_df[~comments_df.index.isin(list(done))] if done else comments_df
+        print(f"\n🌊 Streaming {len(remaining):,} of {len(comments_df):,} comments in chunks of {chunk_size:,}...")
+
+        def classify(representatives, on_result):
+            return self.classifier.classify(representatives['comment_text'].tolist(), on_result=on_result)
+
+        chunks = (remaining.iloc[start:start + chunk_size] for start in range(0, len(remaining), chunk_size))
+        classified = (self._classify_collapsed(chunk, classify, on_rows=checkpoint.append) for chunk in chunks)
+
+        # The checkpoint only holds successes, so failed rows are kept for the run's health figures
+        start_time, processed, failed = time.perf_counter(), 0, []
+        for rows in classified:
+            processed += len(rows)
+            failed.append(rows[rows['sentiment'] == FAILED])
+            rate = processed / max(time.perf_counter() - start_time, 1e-9)
+            eta = (len(remaining) - processed) / rate
+            print(f"   📈 {processed:,}/{len(remaining):,} comments, {rate:,.1f} comments/s, ETA {eta / 60:,.1f} min")
+
+        sentiment_df = checkpoint.load()
+        sentiment_df = sentiment_df[sentiment_df['comment_id'].isin(comments_df.index)] if len(sentiment_df) else sentiment_df
+        failed = [rows for rows in failed if len(rows)]
+        if failed:
+            sentiment_df = pd.concat(([sentiment_df] if len(sentiment_df) else []) + failed, ignore_index=True)
+        print(f"✅ Completed streaming sentiment analysis: {len(sentiment_df):,} comments across "
+              f"{comments_df['media_id'].nunique()} posts")
+        self._report_cache()
+        self._report_run(sentiment_df, self.classifier.stats(), time.perf_counter() - start_time)
+        return sentiment_df
+
+    def classify_batch(self, comments_df: pd.DataFrame, state_dir: str = BATCH_STATE_DIR,
+                       poll_interval: float = 30.0, checkpoint: Optional[SentimentCheckpoint] = None) -> pd.DataFrame:
+        """Classify comments with one Message Batches job instead of per-comment requests
+
+        Batch results are stored by comment text and prompt version, so rerunning over
+        the same comments, in any order or from a new export, only submits those whose
+        results have not been collected yet.
+        """
+        print(f"\n📦 Classifying {len(comments_df):,} comments with the Message Batches API...")
+        start_time = time.perf_counter()
+        job = BatchSentimentJob(client=self.client, state_dir=state_dir, poll_interval=poll_interval, cache=self.cache)
+
+        def classify(representatives, on_result):
+            results = job.run(dict(enumerate(representatives['comment_text'])), on_result=on_result)
+            return [results[position] for position in range(len(representatives))]
+
+        sentiment_df = self._classify_with_checkpoint(comments_df, classify, checkpoint)
+        print(f"✅ Completed batch sentiment analysis for {len(sentiment_df):,} comments across {comments_df['media_id'].nunique()} posts")
+        self._report_cache()
+        self._report_run(sentiment_df, job.stats(), time.perf_counter() - start_time)
+        return sentiment_df
+
+    def _report_cache(self):
+        """Print result-cache hit/miss counters for this run"""
+        if self.cache:
+            stats = self.cache.stats()
+            print(f"💾 Result cache: {stats['hits']:,} hits, {stats['misses']:,} misses "
+                  f"({stats['hit_rate']:.0%} hit rate), {stats['entries']:,} entries, {stats['evictions']:,} evicted")
+
+    def _report_run(self, sentiment_df: pd.DataFrame, stats: Dict, elapsed: float):
+        """Print throughput, latency, cost, token usage and retry and failure counts
+
+        The same figures are kept in run_health for the report and run_metrics.json.
+        Failed comments are left out of every aggregate.
+        """
+        self.run_health = dict(stats, failed=int((sentiment_df['sentiment'] == FAILED).sum()),
+                               comments=len(sentiment_df), elapsed_seconds=elapsed,
+                               comments_per_second=len(sentiment_df) / elapsed if elapsed else None)
+        calls = stats.get('calls', {})
+        latency = calls.get('latency_seconds', {})
+        if latency.get('p50') is not None:
+            print(f"⏱️ {calls['calls']:,} API calls: latency p50 {latency['p50']:.2f}s, p95 {latency['p95']:.2f}s, "
+                  f"p99 {latency['p99']:.2f}s; queue wait p95 {calls['queue_wait_seconds']['p95']:.2f}s")
+        print(f"🚀 {len(sentiment_df):,} comments in {elapsed:.1f}s ({self.run_health['comments_per_second'] or 0:,.1f} comments/s)"
+              + (f", {calls['tokens_per_comment']:,.0f} tokens per LLM-classified comment"
+                 if calls.get('tokens_per_comment') else "")
+              + (f", estimated cost ${calls['estimated_cost_usd']:,.4f}" if calls.get('estimated_cost_usd') is not None else ""))
+        usage = stats.get('usage', {})
+        if usage:
+            cached = usage.get('cache_read_input_tokens', 0) + usage.get('cache_creation_input_tokens', 0)
+            print(f"🧾 Tokens: {usage.get('input_tokens', 0):,} input, {usage.get('output_tokens', 0):,} output"
+                  + (f", {usage.get('cache_read_input_tokens', 0):,} prompt-cache reads, "
+                     f"{usage.get('cache_creation_input_tokens', 0):,} prompt-cache writes "
+                     f"({_cached_share(usage):.0%} of prompt tokens from cache)" if cached else ""))
+            if not cached and stats.get('prompt_cache') and not stats['prompt_cache']['active']:
+                print(f"   ℹ️ Prompt caching {_prompt_cache_inactive(stats['prompt_cache'])}")
+        if stats['retries']:
+            by_class = ', '.join(f"{count:,} {error}" for error, count in sorted(stats['retries'].items()))
+            print(f"🔁 {sum(stats['retries'].values()):,} retries ({by_class}), "
+                  f"{stats['retry_seconds']:.1f}s spent backing off")
+        if self.run_health['failed']:
+            reasons = sentiment_df.loc[sentiment_df['sentiment'] == FAILED, 'feedback'].value_counts()
+            by_reason = ', '.join(f"{count:,} {reason}" for reason, count in reasons.items())
+            print(f"❌ {self.run_health['failed']:,} comments could not be classified ({by_reason}); "
+                  f"they are excluded from the analysis and retried on --resume")
+
+    def _classify_with_checkpoint(self, comments_df: pd.DataFrame, classify,
+                                  checkpoint: Optional[SentimentCheckpoint]) -> pd.DataFrame:
+        """Classify the comments a checkpoint does not hold yet, streaming new rows into it"""
+        if checkpoint is None:
+            return self._classify_collapsed(comments_df, classify)
+
+        previous = checkpoint.load()
+        if len(previous):
+            previous = previous[previous['comment_id'].isin(comments_df.index)]
+        if len(previous):
+            print(f"♻️ Resuming: {len(previous):,} of {len(comments_df):,} comments already in '{checkpoint.path}'")
+        remaining = comments_df[~comments_df.index.isin(previous['comment_id'])] if len(previous) else comments_df
+        if len(remaining) == 0:
+            fresh = pd.DataFrame(columns=previous.columns)
+        else:
+            fresh = self._classify_collapsed(remaining, classify, on_rows=checkpoint.append)
+        if not len(previous):
+            return fresh
+
+        # Back into sample order, mixing resumed and freshly classified rows
+        combined = pd.concat([previous, fresh], ignore_index=True).set_index('comment_id')
+        return combined.reindex(comments_df.index).rename_axis('comment_id').reset_index()
+
+    def _classify_collapsed(self, comments_df: pd.DataFrame, classify, on_rows=None) -> pd.DataFrame:
+        """Classify one representative per duplicate cluster and fan its label out to the members
+
+        classify(representatives, on_result) returns results for the representatives'
+        rows in order and calls on_result(position, result) as each succeeds; it only
+        sees the ones the cascade leaves for the LLM. on_rows receives the finished
+        result rows of a whole cluster at a time. Rows keep cluster_id (the
+        representative's comment_id) and cluster_size for weighting, and tier records
+        which stage labelled them. Rows for on_rows are buffered and handed over in
+        batches of up to CHECKPOINT_BATCH_ROWS, at least every CHECKPOINT_BATCH_SECONDS,
+        and when classification ends or is interrupted.
+        """
+        clusters = self.collapser.collapse(comments_df['comment_text'])
+        n_exact, n_clusters = clusters['exact_group'].nunique(), clusters['cluster'].nunique()
+        saved = len(comments_df) - n_clusters
+        print(f"🧬 {len(comments_df):,} comments collapse to {n_exact:,} distinct texts and {n_clusters:,} "
+              f"near-duplicate clusters: {saved:,} API calls saved ({saved / max(len(comments_df), 1):.0%})")
+
+        is_representative = clusters['is_representative'].to_numpy()
+        representatives = comments_df[is_representative]
+        representative_clusters = clusters['cluster'].to_numpy()[is_representative]
+        cluster_ids = pd.Series(representatives.index, index=representative_clusters)
+        clusters['cluster_id'] = cluster_ids.reindex(clusters['cluster']).to_numpy()
+
+        # Row positions of each cluster's members, computed once rather than per result
+        members_by_cluster = clusters.groupby('cluster', sort=False).indices
+        buffered = {'positions': [], 'results': [], 'tiers': [], 'flushed': time.monotonic()}
+
+        def flush():
+            if buffered['positions']:
+                positions = np.concatenate(buffered['positions'])
+                on_rows(self._sentiment_records(comments_df.iloc[positions], buffered['results'],
+                                                buffered['tiers'], clusters.iloc[positions]))
+                buffered.update(positions=[], results=[], tiers=[])
+            buffered['flushed'] = time.monotonic()
+
+        def on_result(position, result, tier):
+            if on_rows:
+                members = members_by_cluster[representative_clusters[position]]
+                buffered['positions'].append(members)
+                buffered['results'] += [result] * len(members)
+                buffered['tiers'] += [tier] * len(members)
+                if (len(buffered['results']) >= CHECKPOINT_BATCH_ROWS
+                        or time.monotonic() - buffered['flushed'] >= CHECKPOINT_BATCH_SECONDS):
+                    flush()
+
+        try:
+            representative_results, representative_tiers = self._classify_cascade(representatives, classify, on_result)
+        finally:
+            if on_rows:
+                flush()
+        by_cluster = dict(zip(representative_clusters, representative_results))
+        tier_by_cluster = dict(zip(representative_clusters, representative_tiers))
+        return self._sentiment_records(
+            comments_df, [by_cluster[cluster] for cluster in clusters['cluster']],
+            [tier_by_cluster[cluster] for cluster in clusters['cluster']], clusters
+        )
+
+    def _classify_cascade(self, comments_df: pd.DataFrame, classify, on_result) -> tuple:
+        """Label confident comments locally and send only the rest to classify; returns (results, tiers)
+
+        on_result(position, result, tier) fires as each comment's result is settled.
+        """
+        if self.cascade_threshold is None:
+            results = classify(comments_df, lambda position, result: on_result(position, result, 'llm'))
+            return results, ['llm'] * len(comments_df)
+
+        local = self.local_scorer.classify(comments_df['comment_text'])
+        confident = (local['local_confidence'] >= self.cascade_threshold).to_numpy()
+        print(f"🪜 Cascade at confidence {self.cascade_threshold:.2f}: {confident.sum():,} labelled locally, "
+              f"{(~confident).sum():,} sent to Claude")
+
+        results, tiers = [None] * len(comments_df), [None] * len(comments_df)
+        for position in np.flatnonzero(confident):
+            results[position] = {'sentiment': local['local_sentiment'].iloc[position],
+                                 'confidence': float(local['local_confidence'].iloc[position]),
+                                 'themes': [], 'feedback': ''}
+            tiers[position] = 'local'
+            on_result(position, results[position], 'local')
+
+        llm_positions = np.flatnonzero(~confident)
+        if len(llm_positions):
+            llm_results = classify(comments_df.iloc[llm_positions],
+                                   lambda j, result: on_result(llm_positions[j], result, 'llm'))
+            for position, result in zip(llm_positions, llm_results):
+                results[position], tiers[position] = result, 'llm'
+        return results, tiers
+
+    def _sentiment_records(self, comments_df: pd.DataFrame, sentiment_results: List[Dict], tiers: List[str],
+                           clusters: pd.DataFrame) -> pd.DataFrame:
+        """One result row per classified comment with its post caption, sentiment fields and provenance"""
+        captions = self.posts['media_caption']
+        previews = captions.where(captions.str.len() <= 100, captions.str[:100] + "...")
+        return pd.DataFrame({
+            'comment_id': comments_df.index.to_numpy(),
+            'media_id': comments_df['media_id'].to_numpy(),
+            'comment_text': comments_df['comment_text'].to_numpy(),
+            'media_caption': previews.reindex(comments_df['media_id'].to_numpy()).to_numpy(),
+            'timestamp': comments_df['timestamp'].array,
+            'sentiment': [result['sentiment'] for result in sentiment_results],
+            'confidence': [result['confidence'] for result in sentiment_results],
+            'themes': [result['themes'] for result in sentiment_results],
+            'feedback': [result['feedback'] for result in sentiment_results],
+            'cluster_id': clusters['cluster_id'].to_numpy(),
+            'cluster_size': clusters['cluster_size'].to_numpy(),
+            'tier': list(tiers)
+        })
+
+    def lexicon_baseline(self) -> Dict:
+        """Full-corpus sentiment distribution from the lexicon scorer"""
+        distribution = self.df['lexicon_sentiment'].value_counts(normalize=True)
+        return {
+            'count': len(self.df),
+            'sentiment_distribution': {label: distribution.get(label, 0.0) for label in SENTIMENT_LABELS}
+        }
     
     def analyze_by_individual_posts(self, sentiment_df: pd.DataFrame) -> pd.DataFrame:
-        """Analyze sentiment aggregated by individual posts"""
-        print("\n📊 Analyzing sentiment by individual posts...")
+        """Analyze sentiment aggregated by individual posts
+
+        One grouped pass instead of a loop over posts: sentiment shares come from a
+        media_id x sentiment crosstab, post-type flags from the post dimension and
+        top themes from the theme table. Ties (dominant sentiment, top
+        themes) go to whichever appeared first among the post's comments.
 
-        post_analysis = []
-
-        for media_id, post_comments in sentiment_df.groupby('media_id'):
-            # Get post info
-            post_caption = post_comments['media_caption'].iloc[0]
-            comment_count = len(post_comments)
-
-            # Calculate sentiment distribution
-            sentiment_counts = post_comments['sentiment'].value_counts()
-            total_comments = len(post_comments)
-
-            positive_pct = (sentiment_counts.get('positive', 0) / total_comments) * 100
-            negative_pct = (sentiment_counts.get('negative', 0) / total_comments) * 100
-            neutral_pct = (sentiment_counts.get('neutral', 0) / total_comments) * 100
-
-            # Calculate average confidence
-            avg_confidence = post_comments['confidence'].mean()
-
-            # Identify post type
-            is_giveaway = 'giveaway' in post_caption.lower() or 'contest' in post_caption.lower() or 'win' in post_caption.lower()
-            is_pr_recruitment = 'pr' in post_caption.lower() and ('application' in post_caption.lower() or 'apply' in post_caption.lower())
-
-            # Extract dominant themes
-            all_themes = []
-            for themes_list in post_comments['themes']:
-                if isinstance(themes_list, list):
-                    all_themes.extend(themes_list)
-            top_themes = pd.Series(all_themes).value_counts().head(3).index.tolist() if all_themes else []
-
-            # Calculate sentiment score (positive % - negative %)
-            sentiment_score = positive_pct - negative_pct
-
-            post_analysis.append({
-                'media_id': media_id,
-                'post_caption_preview': post_caption[:80] + "..." if len(post_caption) > 80 else post_caption,
-                'comment_count': comment_count,
-                'positive_pct': positive_pct,
-                'negative_pct': negative_pct,
-                'neutral_pct': neutral_pct,
-                'sentiment_score': sentiment_score,
-                'avg_confidence': avg_confidence,
-                'is_giveaway': is_giveaway,
-                'is_pr_recruitment': is_pr_recruitment,
-                'top_themes': top_themes,
-                'dominant_sentiment': sentiment_counts.index[0] if len(sentiment_counts) > 0 else 'neutral'
-            })
-
-        return pd.DataFrame(post_analysis).sort_values('sentiment_score', ascending=False)
+        The positive and negative shares come with 95% Wilson intervals, corrected
+        for the number of comments the post has, and sentiment_score_low/high are
+        the score's bounds implied by them.
+        """
+        print("\n📊 Analyzing sentiment by individual posts...")
+        themes, theme_counts = self.theme_table(sentiment_df)
+        sentiment_df = _classified(sentiment_df)
+        columns = ['media_id', 'post_caption_preview', 'comment_count', 'positive_pct', 'negative_pct',
+                   'neutral_pct', 'sentiment_score', 'avg_confidence', 'is_giveaway', 'is_pr_recruitment',
+                   'top_themes', 'dominant_sentiment', 'positive_pct_low', 'positive_pct_high',
+                   'negative_pct_low', 'negative_pct_high', 'sentiment_score_low', 'sentiment_score_high']
+        if sentiment_df.empty:
+            return pd.DataFrame(columns=columns)
+
+        media_ids = sentiment_df['media_id'].to_numpy()
+        keyed = pd.DataFrame({'media_id': media_ids, 'sentiment': sentiment_df['sentiment'].to_numpy(),
+                              'confidence': sentiment_df['confidence'].to_numpy(),
+                              'position': np.arange(len(sentiment_df))})
+
+        # Sentiment crosstab, with each label's first position for tie-breaking
+        by_label = keyed.groupby(['media_id', 'sentiment'], sort=True)['position']
+        counts = by_label.size().unstack(fill_value=0)
+        labels = SENTIMENT_LABELS + [label for label in counts.columns if label not in SENTIMENT_LABELS]
+        counts = counts.reindex(columns=labels, fill_value=0)
+        first_seen = by_label.min().unstack().reindex(columns=labels).fillna(len(keyed)).to_numpy()
+        total_comments = counts.sum(axis=1)
+        shares = counts.div(total_comments, axis=0) * 100
+        dominant = np.array(labels)[(counts.to_numpy() * (len(keyed) + 1) - first_seen).argmax(axis=1)]
+
+        posts = self.posts.reindex(counts.index)
+        population = self.df['media_id'].value_counts().reindex(counts.index).fillna(total_comments).to_numpy()
+        positive_low, positive_high = wilson_interval(counts['positive'], total_comments, population=population)
+        negative_low, negative_high = wilson_interval(counts['negative'], total_comments, population=population)
+        captions = posts['media_caption']
+        post_analysis = pd.DataFrame({
+            'media_id': counts.index,
+            'post_caption_preview': captions.where(captions.str.len() <= 80, captions.str[:80] + "...").to_numpy(),
+            'comment_count': total_comments.to_numpy(),
+            'positive_pct': shares['positive'].to_numpy(),
+            'negative_pct': shares['negative'].to_numpy(),
+            'neutral_pct': shares['neutral'].to_numpy(),
+            # Sentiment score is positive % - negative %
+            'sentiment_score': (shares['positive'] - shares['negative']).to_numpy(),
+            'avg_confidence': keyed.groupby('media_id', sort=True)['confidence'].mean().to_numpy(),
+            'is_giveaway': posts['is_giveaway'].to_numpy(),
+            'is_pr_recruitment': posts['is_pr_recruitment'].to_numpy(),
+            'top_themes': themes.lists(themes.rank(theme_counts, ['media_id'], n=3), 'media_id')
+                          .reindex(counts.index).to_numpy(),
+            'dominant_sentiment': dominant,
+            'positive_pct_low': positive_low * 100,
+            'positive_pct_high': positive_high * 100,
+            'negative_pct_low': negative_low * 100,
+            'negative_pct_high': negative_high * 100,
+            'sentiment_score_low': (positive_low - negative_high) * 100,
+            'sentiment_score_high': (positive_high - negative_low) * 100
+        })
+        post_analysis['top_themes'] = [names if isinstance(names, list) else []
+                                       for names in post_analysis['top_themes']]
+        return post_analysis.sort_values('sentiment_score', ascending=False)
 
     def analyze_by_post_type(self, sentiment_df: pd.DataFrame) -> Dict:
         """Analyze sentiment by post type (giveaway vs regular)"""
         print("\n📊 Analyzing sentiment by post type...")
+        sentiment_df = _classified(sentiment_df)
 
-        # Identify giveaway posts
-        giveaway_mask = sentiment_df['media_caption'].str.contains('giveaway|contest|win', case=False, na=False)
+        # Giveaway posts per the post dimension, matched on the full caption
+        is_giveaway = self.posts['is_giveaway'].reindex(sentiment_df['media_id'].to_numpy())
+        giveaway_mask = pd.Series(is_giveaway.fillna(False).to_numpy(dtype=bool), index=sentiment_df.index)
 
         giveaway_sentiment = sentiment_df[giveaway_mask]['sentiment'].value_counts(normalize=True)
         regular_sentiment = sentiment_df[~giveaway_mask]['sentiment'].value_counts(normalize=True)
@@ -209,33 +499,39 @@ class TreeHutSentimentAnalyzer:
             }
         }
     
+    def theme_table(self, sentiment_df: pd.DataFrame) -> tuple:
+        """Theme table of a result frame and its theme mentions per post and sentiment
+
+        Built once per result frame and shared by the per-post and theme analyses,
+        which re-aggregate the counts instead of flattening the theme lists again.
+        """
+        if self._themes is None or self._themes[0] is not sentiment_df:
+            table = ThemeTable.from_results(sentiment_df, self.theme_vocabulary)
+            counts = table.counts({'media_id': sentiment_df['media_id'].to_numpy(),
+                                   'sentiment': sentiment_df['sentiment'].to_numpy()})
+            self._themes = (sentiment_df, table, counts[counts['sentiment'] != FAILED])
+        return self._themes[1], self._themes[2]
+
     def extract_themes(self, sentiment_df: pd.DataFrame) -> Dict:
         """Extract and count common themes from sentiment analysis"""
         print("\n🏷️ Extracting common themes...")
-        
-        all_themes = []
-        for themes_list in sentiment_df['themes']:
-            if isinstance(themes_list, list):
-                all_themes.extend(themes_list)
-        
-        theme_counts = pd.Series(all_themes).value_counts()
-        
+        themes, counts = self.theme_table(sentiment_df)
+
+        overall = themes.rank(counts, n=10)
+
         # Group by sentiment
+        by_sentiment = themes.rank(counts, ['sentiment'], n=5)
         theme_by_sentiment = {}
         for sentiment in ['positive', 'negative', 'neutral']:
-            sentiment_themes = []
-            subset = sentiment_df[sentiment_df['sentiment'] == sentiment]
-            for themes_list in subset['themes']:
-                if isinstance(themes_list, list):
-                    sentiment_themes.extend(themes_list)
-            theme_by_sentiment[sentiment] = pd.Series(sentiment_themes).value_counts().head(5).to_dict()
-        
+            ranked = by_sentiment[by_sentiment['sentiment'] == sentiment]
+            theme_by_sentiment[sentiment] = dict(zip(ranked['theme'], ranked['mentions'].tolist()))
+
         return {
-            'overall_themes': theme_counts.head(10).to_dict(),
+            'overall_themes': dict(zip(overall['theme'], overall['mentions'].tolist())),
             'themes_by_sentiment': theme_by_sentiment
         }
-    
-    def create_sentiment_visualizations(self, sentiment_df: pd.DataFrame, analysis_results: Dict):
+
+    def create_sentiment_visualizations(self, sentiment_df: pd.DataFrame, analysis_results: Dict, jobs: int = 1):
         """Create visualizations for sentiment analysis"""
         print("\n📊 Creating sentiment visualizations...")
 
@@ -245,155 +541,39 @@ class TreeHutSentimentAnalyzer:
             os.makedirs(viz_dir)
             print(f"📁 Created directory: {viz_dir}/")
 
-        colors = {'positive': 'lightgreen', 'negative': 'lightcoral', 'neutral': 'lightgray'}
+        sentiment_dist_path = os.path.join(viz_dir, 'overall_sentiment_distribution.png')
+        post_sentiment_path = os.path.join(viz_dir, 'post_sentiment_scores.png')
+        top_bottom_path = os.path.join(viz_dir, 'top_bottom_posts_sentiment.png')
+        post_type_path = os.path.join(viz_dir, 'sentiment_by_post_type.png')
 
         # 1. Overall sentiment distribution
-        fig1, ax1 = plt.subplots(figsize=(10, 6))
-        sentiment_counts = sentiment_df['sentiment'].value_counts()
-        bar_colors = [colors.get(sentiment, 'lightblue') for sentiment in sentiment_counts.index]
+        tasks = [ChartTask(_plot_overall_sentiment, _classified(sentiment_df)['sentiment'].value_counts(), sentiment_dist_path,
+                           f"😊 Overall sentiment chart saved as '{sentiment_dist_path}'")]
 
-        bars = ax1.bar(sentiment_counts.index, sentiment_counts.values, color=bar_colors, alpha=0.8)
-        ax1.set_title('Overall Comment Sentiment Distribution', fontweight='bold', fontsize=14, pad=20)
-        ax1.set_ylabel('Number of Comments')
-
-        # Add percentage labels
-        total = sentiment_counts.sum()
-        for bar, count in zip(bars, sentiment_counts.values):
-            percentage = (count / total) * 100
-            ax1.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.5,
-                    f'{count}\n({percentage:.1f}%)', ha='center', va='bottom', fontweight='bold')
-
-        plt.tight_layout()
-        sentiment_dist_path = os.path.join(viz_dir, 'overall_sentiment_distribution.png')
-        plt.savefig(sentiment_dist_path, dpi=300, bbox_inches='tight')
-        print(f"😊 Overall sentiment chart saved as '{sentiment_dist_path}'")
-        plt.close()
-
-        # 2. Individual post sentiment scores
         if 'post_analysis' in analysis_results:
             post_df = analysis_results['post_analysis']
-
-            fig2, ax2 = plt.subplots(figsize=(14, 8))
-
-            # Create scatter plot of posts by sentiment score and comment count
-            scatter = ax2.scatter(post_df['comment_count'], post_df['sentiment_score'],
-                                 c=post_df['sentiment_score'], cmap='RdYlGn',
-                                 s=100, alpha=0.7, edgecolors='black', linewidth=0.5)
-
-            # Color code by post type
-            giveaway_posts = post_df[post_df['is_giveaway']]
-            pr_posts = post_df[post_df['is_pr_recruitment']]
-
-            if len(giveaway_posts) > 0:
-                ax2.scatter(giveaway_posts['comment_count'], giveaway_posts['sentiment_score'],
-                           marker='s', s=120, alpha=0.8, edgecolors='blue', linewidth=2,
-                           facecolors='none', label='Giveaway Posts')
-
-            if len(pr_posts) > 0:
-                ax2.scatter(pr_posts['comment_count'], pr_posts['sentiment_score'],
-                           marker='^', s=120, alpha=0.8, edgecolors='purple', linewidth=2,
-                           facecolors='none', label='PR Recruitment')
-
-            ax2.set_xlabel('Number of Comments Analyzed')
-            ax2.set_ylabel('Sentiment Score (Positive % - Negative %)')
-            ax2.set_title('Post Performance: Sentiment Score vs Engagement', fontweight='bold', fontsize=14, pad=20)
-            ax2.grid(True, alpha=0.3)
-            ax2.axhline(y=0, color='black', linestyle='--', alpha=0.5)
-
-            # Add colorbar
-            cbar = plt.colorbar(scatter)
-            cbar.set_label('Sentiment Score', rotation=270, labelpad=20)
-
-            if len(giveaway_posts) > 0 or len(pr_posts) > 0:
-                ax2.legend()
-
-            plt.tight_layout()
-            post_sentiment_path = os.path.join(viz_dir, 'post_sentiment_scores.png')
-            plt.savefig(post_sentiment_path, dpi=300, bbox_inches='tight')
-            print(f"📈 Post sentiment scores chart saved as '{post_sentiment_path}'")
-            plt.close()
-
-            # 3. Top and bottom performing posts
-            fig3, (ax3a, ax3b) = plt.subplots(2, 1, figsize=(14, 10))
-
-            # Top 5 posts by sentiment score
-            top_posts = post_df.head(5)
-            if len(top_posts) > 0:
-                bars_top = ax3a.barh(range(len(top_posts)), top_posts['sentiment_score'],
-                                    color='lightgreen', alpha=0.8)
-                ax3a.set_yticks(range(len(top_posts)))
-                ax3a.set_yticklabels([f"Post {i+1}: {caption[:40]}..."
-                                     for i, caption in enumerate(top_posts['post_caption_preview'])])
-                ax3a.set_xlabel('Sentiment Score')
-                ax3a.set_title('Top 5 Posts by Sentiment Score', fontweight='bold')
-                ax3a.grid(True, alpha=0.3, axis='x')
-
-                # Add score labels
-                for i, (bar, score) in enumerate(zip(bars_top, top_posts['sentiment_score'])):
-                    ax3a.text(bar.get_width() + 1, bar.get_y() + bar.get_height()/2,
-                             f'{score:.1f}%', va='center', fontweight='bold')
-
-            # Bottom 5 posts by sentiment score (if any negative)
-            bottom_posts = post_df.tail(5)
-            if len(bottom_posts) > 0 and bottom_posts['sentiment_score'].min() < 0:
-                bars_bottom = ax3b.barh(range(len(bottom_posts)), bottom_posts['sentiment_score'],
-                                       color='lightcoral', alpha=0.8)
-                ax3b.set_yticks(range(len(bottom_posts)))
-                ax3b.set_yticklabels([f"Post {i+1}: {caption[:40]}..."
-                                     for i, caption in enumerate(bottom_posts['post_caption_preview'])])
-                ax3b.set_xlabel('Sentiment Score')
-                ax3b.set_title('Posts Needing Attention (Negative Sentiment)', fontweight='bold')
-                ax3b.grid(True, alpha=0.3, axis='x')
-
-                # Add score labels
-                for i, (bar, score) in enumerate(zip(bars_bottom, bottom_posts['sentiment_score'])):
-                    ax3b.text(bar.get_width() - 1, bar.get_y() + bar.get_height()/2,
-                             f'{score:.1f}%', va='center', fontweight='bold')
-            else:
-                ax3b.text(0.5, 0.5, 'No posts with negative sentiment detected',
-                         ha='center', va='center', transform=ax3b.transAxes,
-                         fontsize=12, style='italic')
-                ax3b.set_xlim(0, 1)
-                ax3b.set_ylim(0, 1)
-                ax3b.set_title('Posts Needing Attention (None Found)', fontweight='bold')
-
-            plt.tight_layout()
-            top_bottom_path = os.path.join(viz_dir, 'top_bottom_posts_sentiment.png')
-            plt.savefig(top_bottom_path, dpi=300, bbox_inches='tight')
-            print(f"🏆 Top/bottom posts chart saved as '{top_bottom_path}'")
-            plt.close()
+            tasks += [
+                # 2. Individual post sentiment scores
+                ChartTask(_plot_post_sentiment_scores, post_df, post_sentiment_path,
+                          f"📈 Post sentiment scores chart saved as '{post_sentiment_path}'"),
+                # 3. Top and bottom performing posts
+                ChartTask(_plot_top_bottom_posts, post_df, top_bottom_path,
+                          f"🏆 Top/bottom posts chart saved as '{top_bottom_path}'")
+            ]
 
         # 4. Sentiment by post type comparison
-        fig4, (ax4a, ax4b) = plt.subplots(1, 2, figsize=(15, 6))
-
-        post_type_analysis = analysis_results['post_type_analysis']
-
-        # Giveaway posts
-        giveaway_data = post_type_analysis['giveaway_posts']['sentiment_distribution']
-        if giveaway_data:
-            ax4a.pie(giveaway_data.values(), labels=giveaway_data.keys(), autopct='%1.1f%%',
-                    colors=[colors.get(k, 'lightblue') for k in giveaway_data.keys()])
-            ax4a.set_title(f'Giveaway Posts Sentiment\n({post_type_analysis["giveaway_posts"]["count"]} comments)',
-                          fontweight='bold')
-
-        # Regular posts
-        regular_data = post_type_analysis['regular_posts']['sentiment_distribution']
-        if regular_data:
-            ax4b.pie(regular_data.values(), labels=regular_data.keys(), autopct='%1.1f%%',
-                    colors=[colors.get(k, 'lightblue') for k in regular_data.keys()])
-            ax4b.set_title(f'Regular Posts Sentiment\n({post_type_analysis["regular_posts"]["count"]} comments)',
-                          fontweight='bold')
-
-        plt.tight_layout()
-        post_type_path = os.path.join(viz_dir, 'sentiment_by_post_type.png')
-        plt.savefig(post_type_path, dpi=300, bbox_inches='tight')
-        print(f"🎁 Post type sentiment chart saved as '{post_type_path}'")
-        plt.close()
+        tasks.append(ChartTask(_plot_sentiment_by_post_type, analysis_results['post_type_analysis'], post_type_path,
+                               f"🎁 Post type sentiment chart saved as '{post_type_path}'"))
+
+        render_charts(tasks, jobs=jobs)
 
         return True
     
     def generate_reputation_report(self, sentiment_df: pd.DataFrame, analysis_results: Dict) -> str:
         """Generate a comprehensive reputation report"""
+        failure_reasons = sentiment_df.loc[sentiment_df['sentiment'] == FAILED, 'feedback'].value_counts()
+        failed_count = int(failure_reasons.sum())
+        sentiment_df = _classified(sentiment_df)
         total_comments = len(sentiment_df)
         sentiment_counts = sentiment_df['sentiment'].value_counts()
         
@@ -435,28 +615,305 @@ Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
             for theme, count in list(neg_themes.items())[:3]:
                 report += f"- **{theme.replace('_', ' ').title()}**: {count} mentions\n"
         
+        if 'tier' in sentiment_df:
+            tier_counts = sentiment_df['tier'].value_counts()
+            report += "\n### Classification Tiers\n"
+            report += "Comments labelled by the local scorer versus sent to Claude (duplicates count once per comment):\n"
+            for tier, description in [('local', 'Local scorer'), ('llm', 'Claude')]:
+                count = tier_counts.get(tier, 0)
+                report += f"- **{description}**: {count:,} comments ({count / total_comments * 100:.1f}%)\n"
+        
+        health = analysis_results.get('run_health', {})
+        if health.get('usage'):
+            usage = health['usage']
+            report += "\n### API Usage\n"
+            report += f"- **Input tokens**: {usage.get('input_tokens', 0):,} uncached\n"
+            if usage.get('cache_read_input_tokens', 0) or usage.get('cache_creation_input_tokens', 0):
+                report += f"- **Prompt cache**: {usage.get('cache_read_input_tokens', 0):,} tokens read, " \
+                          f"{usage.get('cache_creation_input_tokens', 0):,} written ({_cached_share(usage):.0%} of prompt tokens)\n"
+            elif health.get('prompt_cache') and not health['prompt_cache']['active']:
+                report += f"- **Prompt cache**: {_prompt_cache_inactive(health['prompt_cache'])}\n"
+            report += f"- **Output tokens**: {usage.get('output_tokens', 0):,}\n"
+        
+        if health.get('calls'):
+            calls = health['calls']
+            report += "\n### Run Metrics\n"
+            report += f"- **Throughput**: {health['comments']:,} comments in {health['elapsed_seconds']:.1f}s " \
+                      f"({health['comments_per_second'] or 0:,.1f} comments/s)\n"
+            latency = calls.get('latency_seconds', {})
+            if latency.get('p50') is not None:
+                report += f"- **API calls**: {calls['calls']:,} ({', '.join(f'{count:,} {outcome}' for outcome, count in calls['outcomes'].items())})\n"
+                report += f"- **Latency**: p50 {latency['p50']:.2f}s, p95 {latency['p95']:.2f}s, p99 {latency['p99']:.2f}s\n"
+                queue_wait = calls['queue_wait_seconds']
+                report += f"- **Queue wait**: p50 {queue_wait['p50']:.2f}s, p95 {queue_wait['p95']:.2f}s, p99 {queue_wait['p99']:.2f}s\n"
+            if calls.get('tokens_per_comment'):
+                report += f"- **Tokens per LLM-classified comment**: {calls['tokens_per_comment']:,.0f}\n"
+            if calls.get('estimated_cost_usd') is not None:
+                report += f"- **Estimated cost**: ${calls['estimated_cost_usd']:,.4f} " \
+                          f"(${calls['cost_per_1k_comments_usd'] or 0:,.4f} per 1,000 LLM-classified comments)\n"
+        
+        if health.get('adaptive_sampling'):
+            adaptive = health['adaptive_sampling']
+            report += "\n### Post Sentiment Precision\n"
+            report += f"- **Adaptive sample**: {adaptive['spent']:,} of a {adaptive['budget']:,}-comment budget " \
+                      f"in {adaptive['rounds']} rounds\n"
+            report += f"- **Posts settled**: {adaptive['posts_settled']:,} of {adaptive['posts']:,} have positive and " \
+                      f"negative share intervals at most {adaptive['precision']:.0%} wide\n"
+            if adaptive['max_width'] is not None:
+                report += f"- **Interval width**: median {adaptive['median_width']:.0%}, widest {adaptive['max_width']:.0%} " \
+                          f"(per-post bounds in post_sentiment_analysis.csv)\n"
+        
+        if failed_count or health.get('retries'):
+            report += "\n### Run Health\n"
+            report += f"- **Failed**: {failed_count:,} comments could not be classified and are excluded above\n"
+            for reason, count in failure_reasons.items():
+                report += f"  - {reason}: {count:,}\n"
+            retries = health.get('retries', {})
+            report += f"- **Retries**: {sum(retries.values()):,} ({health.get('retry_seconds', 0.0):.1f}s backing off)\n"
+            for error, count in sorted(retries.items()):
+                report += f"  - {error}: {count:,}\n"
+        
+        if 'lexicon_baseline' in analysis_results:
+            baseline = analysis_results['lexicon_baseline']
+            distribution = baseline['sentiment_distribution']
+            report += f"\n### Full-Corpus Lexicon Baseline ({baseline['count']:,} comments)\n"
+            report += "Word-list sentiment over every comment, for comparison with the sampled LLM results:\n"
+            for label in SENTIMENT_LABELS:
+                report += f"- **{label.title()}**: {distribution.get(label, 0.0) * 100:.1f}%\n"
+        
         return report
 
+def _classified(sentiment_df: pd.DataFrame) -> pd.DataFrame:
+    """Rows that have a real sentiment label, without the ones that failed classification"""
+    return sentiment_df[sentiment_df['sentiment'] != FAILED]
+
+def _prompt_cache_inactive(status: Dict) -> str:
+    """Why a run read nothing from the prompt cache"""
+    return (f"inactive, the system prompt is about {status['system_tokens']:,} tokens, "
+            f"below the {status['min_tokens']:,}-token minimum the API caches")
+
+def _cached_share(usage: Dict) -> float:
+    """Fraction of prompt tokens served from the prompt cache"""
+    prompt_tokens = sum(usage.get(field, 0) for field in
+                        ('input_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens'))
+    return usage.get('cache_read_input_tokens', 0) / prompt_tokens if prompt_tokens else 0.0
+
+# Chart renderers. They live at module level and take only precomputed plot data so
+# render_charts() can ship them to worker processes. matplotlib is imported inside
+# each one so it is only loaded when charts are drawn.
+
+SENTIMENT_COLORS = {'positive': 'lightgreen', 'negative': 'lightcoral', 'neutral': 'lightgray'}
+
+def _plot_overall_sentiment(sentiment_counts, path):
+    import matplotlib.pyplot as plt
+
+    fig1, ax1 = plt.subplots(figsize=(10, 6))
+    bar_colors = [SENTIMENT_COLORS.get(sentiment, 'lightblue') for sentiment in sentiment_counts.index]
+
+    bars = ax1.bar(sentiment_counts.index, sentiment_counts.values, color=bar_colors, alpha=0.8)
+    ax1.set_title('Overall Comment Sentiment Distribution', fontweight='bold', fontsize=14, pad=20)
+    ax1.set_ylabel('Number of Comments')
+
+    # Add percentage labels
+    total = sentiment_counts.sum()
+    for bar, count in zip(bars, sentiment_counts.values):
+        percentage = (count / total) * 100
+        ax1.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.5,
+                f'{count}\n({percentage:.1f}%)', ha='center', va='bottom', fontweight='bold')
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=300, bbox_inches='tight')
+    plt.close()
+
+def _plot_post_sentiment_scores(post_df, path):
+    import matplotlib.pyplot as plt
+
+    fig2, ax2 = plt.subplots(figsize=(14, 8))
+
+    # Create scatter plot of posts by sentiment score and comment count
+    scatter = ax2.scatter(post_df['comment_count'], post_df['sentiment_score'],
+                         c=post_df['sentiment_score'], cmap='RdYlGn',
+                         s=100, alpha=0.7, edgecolors='black', linewidth=0.5)
+
+    # Color code by post type
+    giveaway_posts = post_df[post_df['is_giveaway']]
+    pr_posts = post_df[post_df['is_pr_recruitment']]
+
+    if len(giveaway_posts) > 0:
+        ax2.scatter(giveaway_posts['comment_count'], giveaway_posts['sentiment_score'],
+                   marker='s', s=120, alpha=0.8, edgecolors='blue', linewidth=2,
+                   facecolors='none', label='Giveaway Posts')
+
+    if len(pr_posts) > 0:
+        ax2.scatter(pr_posts['comment_count'], pr_posts['sentiment_score'],
+                   marker='^', s=120, alpha=0.8, edgecolors='purple', linewidth=2,
+                   facecolors='none', label='PR Recruitment')
+
+    ax2.set_xlabel('Number of Comments Analyzed')
+    ax2.set_ylabel('Sentiment Score (Positive % - Negative %)')
+    ax2.set_title('Post Performance: Sentiment Score vs Engagement', fontweight='bold', fontsize=14, pad=20)
+    ax2.grid(True, alpha=0.3)
+    ax2.axhline(y=0, color='black', linestyle='--', alpha=0.5)
+
+    # Add colorbar
+    cbar = plt.colorbar(scatter)
+    cbar.set_label('Sentiment Score', rotation=270, labelpad=20)
+
+    if len(giveaway_posts) > 0 or len(pr_posts) > 0:
+        ax2.legend()
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=300, bbox_inches='tight')
+    plt.close()
+
+def _plot_top_bottom_posts(post_df, path):
+    import matplotlib.pyplot as plt
+
+    fig3, (ax3a, ax3b) = plt.subplots(2, 1, figsize=(14, 10))
+
+    # Top 5 posts by sentiment score
+    top_posts = post_df.head(5)
+    if len(top_posts) > 0:
+        bars_top = ax3a.barh(range(len(top_posts)), top_posts['sentiment_score'],
+                            color='lightgreen', alpha=0.8)
+        ax3a.set_yticks(range(len(top_posts)))
+        ax3a.set_yticklabels([f"Post {i+1}: {caption[:40]}..."
+                             for i, caption in enumerate(top_posts['post_caption_preview'])])
+        ax3a.set_xlabel('Sentiment Score')
+        ax3a.set_title('Top 5 Posts by Sentiment Score', fontweight='bold')
+        ax3a.grid(True, alpha=0.3, axis='x')
+
+        # Add score labels
+        for i, (bar, score) in enumerate(zip(bars_top, top_posts['sentiment_score'])):
+            ax3a.text(bar.get_width() + 1, bar.get_y() + bar.get_height()/2,
+                     f'{score:.1f}%', va='center', fontweight='bold')
+
+    # Bottom 5 posts by sentiment score (if any negative)
+    bottom_posts = post_df.tail(5)
+    if len(bottom_posts) > 0 and bottom_posts['sentiment_score'].min() < 0:
+        bars_bottom = ax3b.barh(range(len(bottom_posts)), bottom_posts['sentiment_score'],
+                               color='lightcoral', alpha=0.8)
+        ax3b.set_yticks(range(len(bottom_posts)))
+        ax3b.set_yticklabels([f"Post {i+1}: {caption[:40]}..."
+                             for i, caption in enumerate(bottom_posts['post_caption_preview'])])
+        ax3b.set_xlabel('Sentiment Score')
+        ax3b.set_title('Posts Needing Attention (Negative Sentiment)', fontweight='bold')
+        ax3b.grid(True, alpha=0.3, axis='x')
+
+        # Add score labels
+        for i, (bar, score) in enumerate(zip(bars_bottom, bottom_posts['sentiment_score'])):
+            ax3b.text(bar.get_width() - 1, bar.get_y() + bar.get_height()/2,
+                     f'{score:.1f}%', va='center', fontweight='bold')
+    else:
+        ax3b.text(0.5, 0.5, 'No posts with negative sentiment detected',
+                 ha='center', va='center', transform=ax3b.transAxes,
+                 fontsize=12, style='italic')
+        ax3b.set_xlim(0, 1)
+        ax3b.set_ylim(0, 1)
+        ax3b.set_title('Posts Needing Attention (None Found)', fontweight='bold')
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=300, bbox_inches='tight')
+    plt.close()
+
+def _plot_sentiment_by_post_type(post_type_analysis, path):
+    import matplotlib.pyplot as plt
+
+    fig4, (ax4a, ax4b) = plt.subplots(1, 2, figsize=(15, 6))
+
+    # Giveaway posts
+    giveaway_data = post_type_analysis['giveaway_posts']['sentiment_distribution']
+    if giveaway_data:
+        ax4a.pie(giveaway_data.values(), labels=giveaway_data.keys(), autopct='%1.1f%%',
+                colors=[SENTIMENT_COLORS.get(k, 'lightblue') for k in giveaway_data.keys()])
+        ax4a.set_title(f'Giveaway Posts Sentiment\n({post_type_analysis["giveaway_posts"]["count"]} comments)',
+                      fontweight='bold')
+
+    # Regular posts
+    regular_data = post_type_analysis['regular_posts']['sentiment_distribution']
+    if regular_data:
+        ax4b.pie(regular_data.values(), labels=regular_data.keys(), autopct='%1.1f%%',
+                colors=[SENTIMENT_COLORS.get(k, 'lightblue') for k in regular_data.keys()])
+        ax4b.set_title(f'Regular Posts Sentiment\n({post_type_analysis["regular_posts"]["count"]} comments)',
+                      fontweight='bold')
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=300, bbox_inches='tight')
+    plt.close()
+
 if __name__ == "__main__":
     import sys
     
+    # --fake-backend runs the whole pipeline offline against a deterministic local stand-in
+    backend = None
+    if '--fake-backend' in sys.argv:
+        from fake_anthropic import FakeBackend
+        backend = FakeBackend()
+        print("🧪 Using the offline fake backend; results are synthetic")
+
     # Check for API key
-    if not os.getenv('ANTHROPIC_API_KEY'):
+    if backend is None and not os.getenv('ANTHROPIC_API_KEY'):
         print("❌ Please set your Anthropic API key:")
         print("   export ANTHROPIC_API_KEY='your-api-key-here'")
         sys.exit(1)
     
-    # Initialize analyzer
-    analyzer = TreeHutSentimentAnalyzer()
-    
+    def flag_value(flag, default, cast=int):
+        return cast(sys.argv[sys.argv.index(flag) + 1]) if flag in sys.argv else default
+
     # Get sample size from command line or use default
-    sample_size = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    sample_size = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 50
+
+    # --jobs N renders the charts in N worker processes (0 = one per CPU)
+    jobs = flag_value('--jobs', 1)
+
+    # Initialize analyzer; rate limits follow the API's rate-limit headers unless --rpm/--tpm pin them
+    analyzer = TreeHutSentimentAnalyzer(
+        concurrency=flag_value('--concurrency', DEFAULT_CONCURRENCY),
+        requests_per_minute=flag_value('--rpm', None, float),
+        tokens_per_minute=flag_value('--tpm', None, float),
+        pack_size=flag_value('--pack', 1),
+        cascade_threshold=None if '--no-cascade' in sys.argv else flag_value('--cascade-threshold', 0.8, float),
+        result_cache='--no-result-cache' not in sys.argv,
+        backend=backend
+    )
     
-    print(f"🚀 Starting sentiment analysis with sample size: {sample_size}")
-    print("⚠️  Note: This will make API calls to Claude - costs may apply")
+    # Result rows are appended to the checkpoint as they complete; --resume keeps the
+    # rows of an interrupted run and only classifies the rest of the same sample
+    checkpoint = SentimentCheckpoint(resume='--resume' in sys.argv)
     
-    # Run sentiment analysis
-    sentiment_results = analyzer.analyze_sample_comments(sample_size=sample_size)
+    try:
+        if '--batch' in sys.argv:
+            # --batch classifies the full corpus (or a sample, if a size is given) as a Message Batches job
+            sample_given = len(sys.argv) > 1 and sys.argv[1].isdigit()
+            print(f"🚀 Starting batch sentiment analysis over {'a sample of ' + str(sample_size) if sample_given else 'all'} comments")
+            print("⚠️  Note: This will make API calls to Claude - costs may apply")
+            comments = analyzer.df.sample(n=min(sample_size, len(analyzer.df)), random_state=42) if sample_given else analyzer.df
+            sentiment_results = analyzer.classify_batch(comments, checkpoint=checkpoint)
+        elif '--all' in sys.argv:
+            # --all streams the full corpus through the real-time API, --chunk-size comments at a time
+            print(f"🚀 Starting streaming sentiment analysis over all {len(analyzer.df):,} comments")
+            print("⚠️  Note: This will make API calls to Claude - costs may apply")
+            sentiment_results = analyzer.classify_corpus(checkpoint, chunk_size=flag_value('--chunk-size', 5000))
+        elif '--adaptive' in sys.argv:
+            # --adaptive spends up to sample_size comments in rounds, stopping once every post's
+            # positive/negative shares are within --precision (interval width)
+            print(f"🚀 Starting adaptive sentiment analysis with a budget of {sample_size} comments")
+            print("⚠️  Note: This will make API calls to Claude - costs may apply")
+            sentiment_results = analyzer.analyze_adaptive_sample(
+                sample_size, precision=flag_value('--precision', 0.2, float),
+                round_size=flag_value('--round-size', None), checkpoint=checkpoint
+            )
+        else:
+            print(f"🚀 Starting sentiment analysis with sample size: {sample_size}")
+            print("⚠️  Note: This will make API calls to Claude - costs may apply")
+
+            # Run sentiment analysis
+            sentiment_results = analyzer.analyze_sample_comments(sample_size=sample_size, checkpoint=checkpoint)
+    except KeyboardInterrupt:
+        print(f"\n⏹️ Interrupted; results so far are in '{checkpoint.path}'. Rerun with --resume to continue.")
+        sys.exit(130)
+    finally:
+        checkpoint.close()
 
     # Analyze results
     post_analysis = analyzer.analyze_by_individual_posts(sentiment_results)
@@ -467,7 +924,9 @@ if __name__ == "__main__":
     analysis_results = {
         'post_analysis': post_analysis,
         'post_type_analysis': post_type_analysis,
-        'themes': theme_analysis
+        'themes': theme_analysis,
+        'lexicon_baseline': analyzer.lexicon_baseline(),
+        'run_health': analyzer.run_health
     }
 
     # Save detailed post analysis
@@ -475,16 +934,21 @@ if __name__ == "__main__":
     print(f"📊 Detailed post analysis saved to: post_sentiment_analysis.csv")
     
     # Create visualizations
-    analyzer.create_sentiment_visualizations(sentiment_results, analysis_results)
+    analyzer.create_sentiment_visualizations(sentiment_results, analysis_results, jobs=jobs)
     
     # Generate and save report
     report = analyzer.generate_reputation_report(sentiment_results, analysis_results)
     
     with open('sentiment_analysis/brand_reputation_report.md', 'w') as f:
         f.write(report)
+    write_metrics(analyzer.run_health)
     
     print(f"\n✅ Analysis complete!")
     print(f"📊 Visualizations saved to: visualizations/brand_reputation/")
     print(f"📄 Report saved to: brand_reputation_report.md")
-    print(f"\n💡 Usage: python sentiment_analysis.py [sample_size]")
+    print(f"⏱️ Run metrics saved to: {DEFAULT_METRICS_PATH}")
+    print(f"\n💡 Usage: python sentiment_analysis.py [sample_size] [--batch | --all [--chunk-size N] | --adaptive [--precision X] [--round-size N]] [--resume] [--pack N] [--cascade-threshold X | --no-cascade] [--no-result-cache] [--jobs N] [--concurrency N] [--rpm N] [--tpm N] [--fake-backend]")
+    print(f"   --concurrency caps requests in flight (default {DEFAULT_CONCURRENCY}); --rpm/--tpm pin the request and token "
+          f"rate limits, which otherwise start at {DEFAULT_REQUESTS_PER_MINUTE:,}/{DEFAULT_TOKENS_PER_MINUTE:,} per minute "
+          f"and follow the limits the API reports")
     print(f"   Default sample size: 50 comments")
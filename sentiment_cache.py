@@ -0,0 +1,99 @@
+"""
+@treehut sentiment result cache
+Content-addressed SQLite store of LLM sentiment results, shared across runs
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+from comment_text import normalize_comment
+
+DEFAULT_CACHE_PATH = 'sentiment_analysis/sentiment_cache.sqlite'
+DEFAULT_MAX_ENTRIES = 200_000
+
+# SQLite caps the number of bound parameters per statement
+_QUERY_CHUNK = 500
+
+
+class SentimentCache:
+    """Sentiment results keyed by normalized comment text, prompt version and model
+
+    Entries are evicted least-recently-used first once the cache holds more than
+    max_entries. hits/misses count lookups made through this instance. Writes are
+    meant to be batched: each put_many is one transaction, and the table is only
+    counted when the running entry bound says it may be over max_entries.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS sentiment '
+                          '(key TEXT PRIMARY KEY, result TEXT NOT NULL, last_used REAL NOT NULL)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS sentiment_last_used ON sentiment (last_used)')
+        self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Upper bound on the entry count: every put adds its rows, replacements included
+        self.entries = self.size()
+
+    @staticmethod
+    def key(text: str, model: str, prompt_version) -> str:
+        return hashlib.sha256(f"{model}\0{prompt_version}\0{normalize_comment(text)}".encode()).hexdigest()
+
+    def get_many(self, texts: List[str], model: str, prompt_version) -> List[Optional[Dict]]:
+        """Cached result per text, or None where the text has not been classified"""
+        keys = [self.key(text, model, prompt_version) for text in texts]
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        for start in range(0, len(unique_keys), _QUERY_CHUNK):
+            chunk = unique_keys[start:start + _QUERY_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            found.update(self.conn.execute(
+                f'SELECT key, result FROM sentiment WHERE key IN ({placeholders})', chunk).fetchall())
+
+        now = time.time()
+        self.conn.executemany('UPDATE sentiment SET last_used = ? WHERE key = ?', [(now, key) for key in found])
+        self.conn.commit()
+
+        results = [json.loads(found[key]) if key in found else None for key in keys]
+        hits = sum(result is not None for result in results)
+        self.hits += hits
+        self.misses += len(results) - hits
+        return results
+
+    def put_many(self, texts: List[str], results: List[Dict], model: str, prompt_version):
+        """Store results, then evict the least recently used entries over max_entries"""
+        now = time.time()
+        self.conn.executemany('INSERT OR REPLACE INTO sentiment (key, result, last_used) VALUES (?, ?, ?)',
+                              [(self.key(text, model, prompt_version), json.dumps(result), now)
+                               for text, result in zip(texts, results)])
+        self.entries += len(texts)
+        if self.entries > self.max_entries:
+            self.entries = self.size()
+            excess = self.entries - self.max_entries
+            if excess > 0:
+                self.conn.execute('DELETE FROM sentiment WHERE key IN '
+                                  '(SELECT key FROM sentiment ORDER BY last_used LIMIT ?)', (excess,))
+                self.evictions += excess
+                self.entries = self.max_entries
+        self.conn.commit()
+
+    def size(self) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM sentiment').fetchone()[0]
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': self.size()
+        }
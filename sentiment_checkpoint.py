@@ -0,0 +1,70 @@
+"""
+@treehut sentiment checkpoints
+Append-only JSONL of classified comments, readable while a run is still writing it
+"""
+
+import json
+import os
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHECKPOINT_PATH = 'sentiment_analysis/sentiment_checkpoint.jsonl'
+
+
+def _to_json(value):
+    """JSON fallback for the numpy and pandas scalars found in result rows"""
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def read_checkpoint(path: str = DEFAULT_CHECKPOINT_PATH) -> pd.DataFrame:
+    """Result rows written so far, in the shape analyze_sample_comments returns
+
+    A torn final line from a write in progress (or a crash) is skipped.
+    """
+    rows = []
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    frame = pd.DataFrame(rows)
+    if 'timestamp' in frame:
+        frame['timestamp'] = pd.to_datetime(frame['timestamp'], format='ISO8601')
+    return frame
+
+
+class SentimentCheckpoint:
+    """Appends result rows to a JSONL file as they are produced, one line per comment
+
+    Each append() writes and flushes a batch of rows in a single write.
+
+    Opening without resume starts a fresh file; with resume the rows already
+    written are kept and processed_ids() tells the run which comments to skip.
+    """
+
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_PATH, resume: bool = False):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self._file = open(path, 'a' if resume else 'w')
+
+    def load(self) -> pd.DataFrame:
+        return read_checkpoint(self.path)
+
+    def processed_ids(self) -> set:
+        frame = self.load()
+        return set(frame['comment_id']) if 'comment_id' in frame else set()
+
+    def append(self, rows: pd.DataFrame):
+        self._file.write(''.join(json.dumps(row, default=_to_json) + '\n' for row in rows.to_dict('records')))
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
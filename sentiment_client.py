@@ -0,0 +1,889 @@
+"""
+@treehut sentiment classification client
+Concurrent Claude requests under a token-bucket rate limiter, and resumable
+Message Batches jobs for full-corpus runs
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+from comment_text import SENTIMENT_LABELS
+from sentiment_cache import SentimentCache
+from sentiment_metrics import USAGE_FIELDS, CallLog, estimate_cost
+from sentiment_themes import canonical_themes
+
+SENTIMENT_MODEL = "claude-3-5-sonnet-20241022"
+MAX_TOKENS = 200
+# Bump whenever the prompt or result parsing changes so cached results are not reused
+PROMPT_VERSION = 3
+
+# Requests in flight at once; the rate limits, not this, are what normally throttle a run
+DEFAULT_CONCURRENCY = 32
+# Starting rate limits (the lowest tier's); unless set explicitly, the classifier follows the
+# limits the API reports in RATE_LIMIT_HEADERS from the first response on
+DEFAULT_REQUESTS_PER_MINUTE = 50
+DEFAULT_TOKENS_PER_MINUTE = 40_000
+RATE_LIMIT_HEADERS = {'requests': 'anthropic-ratelimit-requests-limit', 'tokens': 'anthropic-ratelimit-tokens-limit'}
+
+# Packed mode: several comments per request, answered as one JSON array
+PACKED_MAX_TOKENS = 4096
+ITEM_OUTPUT_TOKENS = 80  # generous per-comment budget for one result object
+PACK_ATTEMPTS = 3
+
+# Results written to the result cache per transaction during a run
+CACHE_FLUSH_RESULTS = 500
+
+# Message Batches accepts at most this many requests per batch
+MAX_BATCH_REQUESTS = 100_000
+BATCH_STATE_DIR = 'sentiment_analysis/batch_jobs'
+
+# Status of comments that could not be classified; they are kept out of every aggregate
+FAILED = 'failed'
+
+# HTTP statuses worth retrying, by error class; other 5xx are 'server_error', other 4xx fatal
+RETRYABLE_STATUS = {408: 'timeout', 409: 'conflict', 429: 'rate_limit', 529: 'overloaded'}
+
+FENCE_PATTERN = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+
+def failed_result(reason: str) -> Dict:
+    """Result for a comment that could not be classified, with the error class as feedback"""
+    return {"sentiment": FAILED, "confidence": 0.0, "themes": [], "feedback": reason}
+
+
+# Static instructions, sent as the system prompt so each request only adds the comment text
+SENTIMENT_SYSTEM = """Analyze the sentiment of Instagram comments about TreeHut beauty products.
+The user message is one comment.
+
+Please provide:
+1. Overall sentiment: positive, negative, or neutral
+2. Confidence score: 0.0 to 1.0
+3. Key themes: list of 1-3 themes (e.g., "product_quality", "scent", "texture", "price", "availability")
+4. Specific feedback: any specific praise or complaints
+
+Respond in JSON format:
+{
+    "sentiment": "positive|negative|neutral",
+    "confidence": 0.85,
+    "themes": ["product_quality", "scent"],
+    "feedback": "brief summary of specific feedback"
+}
+"""
+
+PACKED_SYSTEM = """Analyze the sentiment of each of these Instagram comments about TreeHut beauty products.
+The user message holds several comments, one JSON object per line with the comment's id.
+
+For every comment provide:
+1. Overall sentiment: positive, negative, or neutral
+2. Confidence score: 0.0 to 1.0
+3. Key themes: list of 1-3 themes (e.g., "product_quality", "scent", "texture", "price", "availability")
+4. Specific feedback: any specific praise or complaints
+
+Respond with only a JSON array holding one object per comment, using the comment's id:
+[
+    {
+        "id": "0",
+        "sentiment": "positive|negative|neutral",
+        "confidence": 0.85,
+        "themes": ["product_quality", "scent"],
+        "feedback": "brief summary of specific feedback"
+    }
+]
+"""
+
+# Shorter prefixes are never cached (the minimum on Sonnet), so marking them would only
+# add a cache-write attempt to every request
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+
+def system_prompt(text: str):
+    """System prompt, as a block marked for prompt caching when it is long enough to be cached"""
+    if estimate_tokens(text) < PROMPT_CACHE_MIN_TOKENS:
+        return text
+    return [{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}]
+
+
+def prompt_cached(params: Dict) -> bool:
+    """Whether a request's system prompt is marked for prompt caching"""
+    system = params.get("system")
+    return isinstance(system, list) and any("cache_control" in block for block in system)
+
+
+def prompt_cache_status(params: Dict) -> Dict:
+    """Whether a request's system prompt is cached, with its estimated size against the cache minimum
+
+    The shipped prompts are well under PROMPT_CACHE_MIN_TOKENS, so caching stays
+    off for them; runs report that instead of showing empty cache counters.
+    """
+    system = params.get("system") or ""
+    text = system if isinstance(system, str) else "".join(block["text"] for block in system)
+    return {'active': prompt_cached(params), 'system_tokens': estimate_tokens(text),
+            'min_tokens': PROMPT_CACHE_MIN_TOKENS}
+
+
+def sentiment_prompt(comment: str) -> str:
+    """User message for one comment; the instructions live in SENTIMENT_SYSTEM"""
+    return f'Comment: "{comment}"'
+
+
+def sentiment_request(comment: str, model: str = SENTIMENT_MODEL, max_tokens: int = MAX_TOKENS) -> Dict:
+    """messages.create parameters classifying one comment"""
+    return {
+        "model": model,
+        "max_tokens": max_tokens,
+        "system": system_prompt(SENTIMENT_SYSTEM),
+        "messages": [{"role": "user", "content": sentiment_prompt(comment)}]
+    }
+
+
+def extract_json(text: str, opener: str = '{'):
+    """First JSON value starting with opener, tolerating code fences and prose around it"""
+    fenced = FENCE_PATTERN.search(text)
+    decoder = json.JSONDecoder()
+    for candidate in ([fenced.group(1)] if fenced else []) + [text]:
+        start = candidate.find(opener)
+        while start != -1:
+            try:
+                return decoder.raw_decode(candidate, start)[0]
+            except json.JSONDecodeError:
+                start = candidate.find(opener, start + 1)
+    raise ValueError(f"no JSON value starting with {opener!r} in response")
+
+
+def normalize_result(entry: Dict) -> Dict:
+    """Validated sentiment dict; raises ValueError when the sentiment label is unusable"""
+    sentiment = str(entry.get('sentiment', '')).strip().lower()
+    if sentiment not in SENTIMENT_LABELS:
+        raise ValueError(f"unexpected sentiment {entry.get('sentiment')!r}")
+    try:
+        confidence = min(1.0, max(0.0, float(entry.get('confidence', 0.0))))
+    except (TypeError, ValueError):
+        confidence = 0.0
+    themes = entry.get('themes') or []
+    themes = canonical_themes([themes] if isinstance(themes, str) else themes)
+    return {"sentiment": sentiment, "confidence": confidence, "themes": themes,
+            "feedback": str(entry.get('feedback') or '')}
+
+
+def parse_sentiment(message) -> Dict:
+    """Sentiment dict from a Messages API response"""
+    return normalize_result(extract_json(message.content[0].text, '{'))
+
+
+def packed_prompt(items: List[tuple]) -> str:
+    """User message for several (id, comment) pairs; the instructions live in PACKED_SYSTEM"""
+    return "\n".join(json.dumps({"id": item_id, "comment": comment}, ensure_ascii=False)
+                     for item_id, comment in items)
+
+
+def packed_request(items: List[tuple], model: str = SENTIMENT_MODEL, max_tokens: int = PACKED_MAX_TOKENS) -> Dict:
+    """messages.create parameters classifying several comments at once"""
+    return {
+        "model": model,
+        "max_tokens": max_tokens,
+        "system": system_prompt(PACKED_SYSTEM),
+        "messages": [{"role": "user", "content": packed_prompt(items)}]
+    }
+
+
+def parse_packed(message, ids: List[str]) -> Dict[str, Dict]:
+    """Valid results by id from a packed response; ids missing or malformed are left out"""
+    entries = extract_json(message.content[0].text, '[')
+    wanted = set(ids)
+    results = {}
+    for entry in entries:
+        if not isinstance(entry, dict) or str(entry.get('id')) not in wanted:
+            continue
+        try:
+            results[str(entry['id'])] = normalize_result(entry)
+        except ValueError:
+            continue
+    return results
+
+
+def pack_size_for(requested: int, max_tokens: int = PACKED_MAX_TOKENS) -> int:
+    """Largest pack up to requested whose results fit in max_tokens of output"""
+    return max(1, min(requested, max_tokens // ITEM_OUTPUT_TOKENS))
+
+
+def error_class(exc: Exception) -> str:
+    """Retry class of an API exception: a RETRYABLE_STATUS value, server_error, connection or fatal"""
+    status = getattr(exc, 'status_code', None)
+    if status in RETRYABLE_STATUS:
+        return RETRYABLE_STATUS[status]
+    if status is not None:
+        return 'server_error' if status >= 500 else 'fatal'
+    if isinstance(exc, (ConnectionError, asyncio.TimeoutError)) or any(
+            cls.__name__ == 'APIConnectionError' for cls in type(exc).__mro__):
+        return 'connection'
+    return 'fatal'
+
+
+def retry_after(exc: Exception) -> Optional[float]:
+    """Seconds the server asked us to wait (retry-after-ms / retry-after headers), if any"""
+    headers = getattr(getattr(exc, 'response', None), 'headers', None) or {}
+    try:
+        if 'retry-after-ms' in headers:
+            return float(headers['retry-after-ms']) / 1000
+        if 'retry-after' in headers:
+            return float(headers['retry-after'])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for every error class except fatal
+
+    A server-sent retry-after wins over the computed delay. Unparseable answers
+    are re-requested up to parse_attempts times in total.
+    """
+
+    def __init__(self, max_attempts: int = 6, base_delay: float = 1.0, max_delay: float = 60.0,
+                 parse_attempts: int = 2, seed: Optional[int] = None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.parse_attempts = parse_attempts
+        self.random = random.Random(seed)
+
+    def should_retry(self, error: str, attempt: int) -> bool:
+        return error != 'fatal' and attempt + 1 < self.max_attempts
+
+    def delay(self, attempt: int, exc: Exception) -> float:
+        requested = retry_after(exc)
+        if requested is not None:
+            return requested
+        return self.random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class RequestFailed(Exception):
+    """A request that failed for good; reason is its error class"""
+
+    def __init__(self, reason: str, message: str = ''):
+        super().__init__(message)
+        self.reason = reason
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough input token count (~4 characters per token) for rate budgeting"""
+    return len(text) // 4 + 1
+
+
+def request_tokens(params: Dict) -> int:
+    """Upper-bound token budget of a request: uncached system prompt, messages and max_tokens
+
+    A system prompt marked for caching is read from the cache, which does not count
+    against the input-tokens-per-minute limit, so it is left out of the reservation.
+    """
+    system = params.get("system", "")
+    system_tokens = 0 if prompt_cached(params) else estimate_tokens(system) if system else 0
+    return system_tokens + estimate_tokens(params["messages"][0]["content"]) + params["max_tokens"]
+
+
+def usage_counts(usage) -> Dict[str, int]:
+    """USAGE_FIELDS of a response's usage, zero where absent"""
+    return {field: getattr(usage, field, None) or 0 for field in USAGE_FIELDS}
+
+
+class TokenBucket:
+    """Continuously refilling bucket holding up to per_minute units
+
+    acquire() waits until enough units have refilled. Waiters are served in
+    arrival order because the lock is held while sleeping. pause() holds every
+    waiter, which is how a rate-limit response slows the whole run down.
+
+    The level and pause outlive any one event loop, so a bucket kept across
+    classify() calls enforces the limit across them; only the lock, which
+    asyncio ties to a loop, is recreated for each new loop.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = None
+        self._loop = None
+
+    def _loop_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._lock, self._loop = asyncio.Lock(), loop
+        return self._lock
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        amount = min(amount, self.capacity)
+        async with self._loop_lock():
+            while self.paused_until > time.monotonic():
+                await asyncio.sleep(self.paused_until - time.monotonic())
+            self._refill()
+            while self.level < amount:
+                await asyncio.sleep((amount - self.level) / self.rate)
+                self._refill()
+            self.level -= amount
+
+    def refund(self, amount: float):
+        """Return units reserved up front but not actually used"""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+    def pause(self, seconds: float):
+        """Hold all acquirers for at least seconds from now"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def resize(self, per_minute: float):
+        """Change the limit, keeping the current level (capped at the new capacity)"""
+        self._refill()
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = min(self.level, self.capacity)
+
+
+class AnthropicBackend:
+    """Creates Anthropic SDK clients; the default backend
+
+    A backend is anything with client(), returning a synchronous Messages API
+    client (used for Message Batches), and async_client(), returning an async one
+    that is closed with close() at the end of each event loop. Any object that
+    provides both can stand in, e.g. fake_anthropic.FakeBackend for offline runs.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
+        self.api_key = api_key
+        self.base_url = base_url
+
+    def client(self):
+        import anthropic
+        return anthropic.Anthropic(api_key=self.api_key, base_url=self.base_url)
+
+    def async_client(self):
+        import anthropic
+        # Retries are handled by RetryPolicy, not the SDK
+        return anthropic.AsyncAnthropic(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+
+
+class AsyncSentimentClassifier:
+    """Classifies comments concurrently with the async Anthropic client
+
+    At most `concurrency` requests are in flight, and requests/tokens per minute
+    are held under the given limits, across every classify() call on the
+    instance. Limits left as None start at the DEFAULT_* values and then follow the
+    account's limits as reported in each response's rate-limit headers; limits
+    given explicitly are kept. Each request reserves its estimated input
+    tokens plus max_tokens, and the unused part is refunded from the reported
+    usage. Results come back in input order. Comments already in cache (a
+    SentimentCache) are answered without an API call. Requests go to backend
+    (AnthropicBackend by default); pass base_url (or set ANTHROPIC_BASE_URL) to
+    point the default one at a local stand-in server.
+
+    With pack_size > 1 each request carries up to that many comments (capped so
+    the results fit in PACKED_MAX_TOKENS). Comments missing from a packed answer
+    are re-packed in smaller packs and retried, up to PACK_ATTEMPTS times, and
+    comments whose request failed outright are re-packed once.
+
+    Failed requests are retried by retry_policy according to their error class;
+    a rate-limit response pauses the request bucket so every worker backs off.
+    Comments that still fail get a FAILED result. retries, retry_seconds,
+    failures, usage (tokens, including prompt-cache reads and writes), calls
+    (a CallLog with one record per request) and elapsed (seconds spent in
+    classify calls) accumulate over the classifier's lifetime.
+    """
+
+    def __init__(self, client=None, model: str = SENTIMENT_MODEL, max_tokens: int = MAX_TOKENS,
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None, pack_size: int = 1,
+                 cache=None, retry_policy: Optional[RetryPolicy] = None, backend=None,
+                 api_key: Optional[str] = None, base_url: Optional[str] = None):
+        # An injected client is reused as-is; otherwise each run opens (and closes) its
+        # own async client from the backend, since its connection pool is tied to one event loop
+        self.client = client
+        self.backend = backend or AnthropicBackend(api_key=api_key, base_url=base_url)
+        self.model = model
+        self.max_tokens = max_tokens
+        self.concurrency = max(1, concurrency)
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.pack_size = pack_size_for(pack_size) if pack_size > 1 else 1
+        # Packed answers come from a different prompt, so they are cached separately
+        self.prompt_version = PROMPT_VERSION if self.pack_size == 1 else f"{PROMPT_VERSION}-packed"
+        self.cache = cache
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.retries = Counter()
+        self.retry_seconds = 0.0
+        self.failures = Counter()
+        self.usage = Counter()
+        self.calls = CallLog()
+        self.elapsed = 0.0
+        # Kept across classify() calls, so chunked and repeated runs share one budget and a
+        # rate-limit pause carries over instead of every call starting with a full burst
+        self.request_bucket = TokenBucket(requests_per_minute or DEFAULT_REQUESTS_PER_MINUTE)
+        self.token_bucket = TokenBucket(tokens_per_minute or DEFAULT_TOKENS_PER_MINUTE)
+
+    def _open_client(self):
+        return self.backend.async_client()
+
+    def _follow_limits(self, headers):
+        """Resize the buckets not set explicitly to the limits in a response's rate-limit headers"""
+        changed = False
+        for name, bucket, pinned in (('requests', self.request_bucket, self.requests_per_minute),
+                                     ('tokens', self.token_bucket, self.tokens_per_minute)):
+            try:
+                limit = float(headers.get(RATE_LIMIT_HEADERS[name]))
+            except (AttributeError, TypeError, ValueError):
+                continue
+            if not pinned and limit > 0 and limit != bucket.capacity:
+                bucket.resize(limit)
+                changed = True
+        if changed:
+            print(f"   ⚙️ Following the API's rate limits: {self.request_bucket.capacity:,.0f} requests/min, "
+                  f"{self.token_bucket.capacity:,.0f} tokens/min")
+
+    async def _create(self, client, params: Dict):
+        """messages.create, reading the rate-limit headers when the client exposes raw responses"""
+        raw = getattr(client.messages, 'with_raw_response', None)
+        if raw is None:
+            return await client.messages.create(**params)
+        reply = await raw.create(**params)
+        self._follow_limits(reply.headers)
+        return await reply.parse()
+
+    async def _request(self, client, params: Dict, slots: asyncio.Semaphore,
+                       requests: TokenBucket, tokens: TokenBucket, call: Dict):
+        """messages.create under the rate limits, retrying per retry_policy; raises RequestFailed
+
+        call collects the measurements for the CallLog: total queue wait (concurrency
+        slot and rate buckets), latency of the final attempt, retries and token usage.
+        """
+        reserved = request_tokens(params)
+        attempt = 0
+        call.update(queue_wait=0.0, retries=0)
+        while True:
+            queued = time.perf_counter()
+            async with slots:
+                await requests.acquire()
+                await tokens.acquire(reserved)
+                sent = time.perf_counter()
+                call['queue_wait'] += sent - queued
+                try:
+                    response = await self._create(client, params)
+                    break
+                except Exception as e:
+                    error, failure = error_class(e), e
+                    self._follow_limits(getattr(getattr(e, 'response', None), 'headers', None))
+                finally:
+                    call['latency'] = time.perf_counter() - sent
+
+            if not self.retry_policy.should_retry(error, attempt):
+                print(f"⚠️ Giving up after {attempt + 1} attempt(s) ({error}): {str(failure)[:100]}")
+                raise RequestFailed(error, str(failure))
+            delay = self.retry_policy.delay(attempt, failure)
+            if error == 'rate_limit':
+                requests.pause(delay)
+            self.retries[error] += 1
+            self.retry_seconds += delay
+            call['retries'] += 1
+            await asyncio.sleep(delay)
+            attempt += 1
+
+        counts = usage_counts(getattr(response, 'usage', None))
+        self.usage.update(counts)
+        call.update(counts)
+        # Cache reads do not count against the input-token limit, so they were not reserved
+        used = sum(counts.values()) - counts.get('cache_read_input_tokens', 0)
+        if used:
+            tokens.refund(max(0, reserved - used))
+        return response
+
+    def stats(self) -> Dict:
+        """Retry and failure counters by error class, token usage and the per-call summary"""
+        return {
+            'retries': dict(self.retries),
+            'retry_seconds': self.retry_seconds,
+            'failures': dict(self.failures),
+            'usage': dict(self.usage),
+            'calls': self.calls.summary(self.model),
+            'api_seconds': self.elapsed,
+            'prompt_cache': prompt_cache_status(packed_request([], self.model) if self.pack_size > 1
+                                                else sentiment_request('', self.model))
+        }
+
+    async def _classify_one(self, client, comment: str, slots: asyncio.Semaphore,
+                            requests: TokenBucket, tokens: TokenBucket) -> Dict:
+        """Sentiment for one comment, or a FAILED result once retries are exhausted"""
+        params = sentiment_request(comment, self.model, self.max_tokens)
+        for attempt in range(self.retry_policy.parse_attempts):
+            call = {'comments': 1}
+            try:
+                response = await self._request(client, params, slots, requests, tokens, call)
+            except RequestFailed as e:
+                self.calls.record(dict(call, outcome=f"failed:{e.reason}"))
+                return failed_result(e.reason)
+            try:
+                result = parse_sentiment(response)
+            except Exception:
+                self.calls.record(dict(call, outcome='parse_error'))
+                if attempt + 1 < self.retry_policy.parse_attempts:
+                    self.retries['parse'] += 1
+                continue
+            self.calls.record(dict(call, parsed=1, outcome='ok'))
+            return result
+        return failed_result('parse')
+
+    async def _classify_pack(self, client, items: List[tuple], slots: asyncio.Semaphore,
+                             requests: TokenBucket, tokens: TokenBucket) -> tuple:
+        """(results by id, failure reason) for one packed request; ids absent from the results failed"""
+        call = {'comments': len(items)}
+        try:
+            response = await self._request(client, packed_request(items, self.model), slots, requests, tokens, call)
+        except RequestFailed as e:
+            self.calls.record(dict(call, outcome=f"failed:{e.reason}"))
+            return {}, e.reason
+        try:
+            found = parse_packed(response, [item_id for item_id, _ in items])
+        except Exception:
+            self.calls.record(dict(call, outcome='parse_error'))
+            return {}, 'parse'
+        self.calls.record(dict(call, parsed=len(found), outcome='ok' if len(found) == len(items) else 'partial'))
+        return found, 'parse'
+
+    async def _classify_packed(self, client, texts: List[str], slots: asyncio.Semaphore,
+                               requests: TokenBucket, tokens: TokenBucket, completed) -> List[Dict]:
+        """Packed classification, re-packing the comments an answer left out or garbled
+
+        Comments whose request failed for good (after retry_policy) are re-packed
+        once more, in smaller packs; a second request failure marks them FAILED.
+        Each retry attempt halves the pack size.
+        """
+        results = [None] * len(texts)
+        request_failed = {}
+        remaining = list(range(len(texts)))
+        size = self.pack_size
+
+        async def run(pack):
+            found, reason = await self._classify_pack(client, [(str(i), texts[i]) for i in pack],
+                                                      slots, requests, tokens)
+            for i in pack:
+                if str(i) in found:
+                    results[i] = found[str(i)]
+                    completed(i, results[i])
+                elif reason != 'parse':
+                    if i in request_failed:
+                        results[i] = failed_result(reason)
+                    request_failed[i] = reason
+
+        for attempt in range(PACK_ATTEMPTS):
+            if attempt:
+                size = max(1, size // 2)
+                print(f"\n   ↻ Re-packing {len(remaining)} comments from failed or incomplete packed responses, "
+                      f"{size} per request")
+            # Re-packs keep comments missing from an answer apart from those whose request failed,
+            # so each retried request is counted once under its cause
+            groups = {}
+            for i in remaining:
+                groups.setdefault(request_failed.get(i, 'parse') if attempt else None, []).append(i)
+            packs = [(cause, group[start:start + size])
+                     for cause, group in groups.items() for start in range(0, len(group), size)]
+            if attempt:
+                self.retries.update(cause for cause, _ in packs)
+            # With a cached system prompt, the first request writes the cache that the others then read
+            first = 1 if prompt_cached(packed_request([], self.model)) else 0
+            for pack in packs[:first]:
+                await run(pack[1])
+            await asyncio.gather(*(run(pack) for _, pack in packs[first:]))
+            remaining = [i for i in remaining if results[i] is None]
+            if not remaining:
+                break
+        for i in remaining:
+            results[i] = failed_result(request_failed.get(i, 'parse'))
+        return results
+
+    async def classify_async(self, comments: List[str],
+                             progress: Optional[Callable[[int, int], None]] = None,
+                             on_result: Optional[Callable[[int, Dict], None]] = None) -> List[Dict]:
+        """Classify every comment, returning results in the same order
+
+        on_result(position, result) is called as soon as each comment's result is
+        known (cache hits first), so callers can persist progress mid-run. Failed
+        comments get a FAILED result in the returned list but no callback. New
+        results reach the result cache in batches of CACHE_FLUSH_RESULTS and when
+        the run ends or is interrupted.
+        """
+        results = (self.cache.get_many(comments, self.model, self.prompt_version) if self.cache
+                   else [None] * len(comments))
+        pending = [i for i, result in enumerate(results) if result is None]
+        if on_result:
+            for i, result in enumerate(results):
+                if result is not None:
+                    on_result(i, result)
+        if not pending:
+            return results
+
+        client = self.client or self._open_client()
+        slots = asyncio.Semaphore(self.concurrency)
+        requests, tokens = self.request_bucket, self.token_bucket
+        done = 0
+        uncached = []
+
+        def flush_cache():
+            if uncached:
+                self.cache.put_many([comments[i] for i, _ in uncached], [result for _, result in uncached],
+                                    self.model, self.prompt_version)
+                uncached.clear()
+
+        def completed(position, result):
+            """Record one successful result for pending[position] as it arrives"""
+            nonlocal done
+            i = pending[position]
+            if self.cache:
+                uncached.append((i, result))
+                if len(uncached) >= CACHE_FLUSH_RESULTS:
+                    flush_cache()
+            if on_result:
+                on_result(i, result)
+            done += 1
+            if progress:
+                progress(done, len(pending))
+
+        async def run(position):
+            result = await self._classify_one(client, comments[pending[position]], slots, requests, tokens)
+            if result['sentiment'] != FAILED:
+                completed(position, result)
+            return result
+
+        try:
+            if self.pack_size > 1:
+                fresh = await self._classify_packed(client, [comments[i] for i in pending],
+                                                    slots, requests, tokens, completed)
+            else:
+                # With a cached system prompt, the first request writes the cache that the others then read
+                first = 1 if prompt_cached(sentiment_request('', self.model)) else 0
+                fresh = [await run(position) for position in range(first)]
+                fresh += await asyncio.gather(*(run(position) for position in range(first, len(pending))))
+        finally:
+            if self.cache:
+                flush_cache()
+            if client is not self.client:
+                await client.close()
+
+        for i, result in zip(pending, fresh):
+            results[i] = result
+        self.failures.update(result['feedback'] for result in fresh if result['sentiment'] == FAILED)
+        return results
+
+    def classify(self, comments: List[str],
+                 progress: Optional[Callable[[int, int], None]] = None,
+                 on_result: Optional[Callable[[int, Dict], None]] = None) -> List[Dict]:
+        """Blocking wrapper around classify_async for synchronous callers"""
+        start = time.perf_counter()
+        try:
+            return asyncio.run(self.classify_async(list(comments), progress, on_result))
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+
+class BatchSentimentJob:
+    """Classifies comments through Message Batches jobs that survive reruns
+
+    Each request is identified by a key hashed from the normalized comment text,
+    the model and the prompt version, so stored results follow the text rather
+    than its row: a re-exported or reordered CSV reuses them, and a prompt version
+    bump never does. Succeeded results are appended to results.jsonl under
+    state_dir (one directory per model), and every submitted batch is recorded in
+    batches.json with the keys it carries until its results have been read.
+    Rerunning therefore re-attaches to recorded batches, in flight or ended,
+    instead of resubmitting, and comments already collected are never sent again.
+    Requests a batch could not complete stay pending for the next run.
+    Comments found in cache (a SentimentCache) are not submitted at all.
+    failures counts the comments each run could not classify, by reason, and
+    usage and parsed the tokens and number of the results collected.
+
+    client only needs messages.batches.create/retrieve/results (or pass a backend
+    to create it), and build_request/parse_result can be replaced, so a local
+    stand-in can serve the whole job.
+    """
+
+    def __init__(self, client=None, model: str = SENTIMENT_MODEL, max_tokens: int = MAX_TOKENS,
+                 state_dir: str = BATCH_STATE_DIR, poll_interval: float = 30.0,
+                 build_request: Callable[[str, str, int], Dict] = sentiment_request,
+                 parse_result: Callable[[object], Dict] = parse_sentiment, prompt_version=PROMPT_VERSION,
+                 cache=None, backend=None, api_key: Optional[str] = None, base_url: Optional[str] = None):
+        if client is None:
+            client = (backend or AnthropicBackend(api_key=api_key, base_url=base_url)).client()
+        self.client = client
+        self.model = model
+        self.max_tokens = max_tokens
+        self.state_dir = os.path.join(state_dir, model)
+        self.poll_interval = poll_interval
+        self.build_request = build_request
+        self.parse_result = parse_result
+        self.prompt_version = prompt_version
+        self.cache = cache
+        self.failures = Counter()
+        self.usage = Counter()
+        self.parsed = 0
+        self.results_path = os.path.join(self.state_dir, 'results.jsonl')
+        self.batches_path = os.path.join(self.state_dir, 'batches.json')
+
+    def request_key(self, text: str) -> str:
+        """custom_id of a comment's batch request and its key in results.jsonl"""
+        return SentimentCache.key(text, self.model, self.prompt_version)[:32]
+
+    def stats(self) -> Dict:
+        """Failure counters, token usage and its estimated cost at batch prices"""
+        parsed = self.parsed
+        cost = estimate_cost(self.usage, self.model, batch=True)
+        return {
+            'retries': {},
+            'retry_seconds': 0.0,
+            'failures': dict(self.failures),
+            'usage': dict(self.usage),
+            'prompt_cache': prompt_cache_status(self.build_request('', self.model, self.max_tokens)),
+            'calls': {
+                'comments_parsed': self.parsed,
+                'tokens': dict(self.usage),
+                'tokens_per_comment': sum(self.usage.values()) / parsed if parsed else None,
+                'estimated_cost_usd': cost,
+                'cost_per_1k_comments_usd': cost / parsed * 1000 if cost is not None and parsed else None
+            }
+        }
+
+    def _load_results(self) -> Dict[str, Dict]:
+        results = {}
+        if os.path.exists(self.results_path):
+            with open(self.results_path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn last line from an interrupted run
+                    if 'key' in record:  # rows written before results were keyed by content are skipped
+                        results[record['key']] = record['result']
+        return results
+
+    def _load_batches(self) -> Dict[str, List[str]]:
+        if not os.path.exists(self.batches_path):
+            return {}
+        with open(self.batches_path) as f:
+            return json.load(f)
+
+    def _save_batches(self, batches: Dict[str, List[str]]):
+        tmp_path = self.batches_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(batches, f)
+        os.replace(tmp_path, self.batches_path)
+
+    def _submit(self, pending: Dict[str, str], batches: Dict[str, List[str]]) -> List[str]:
+        """Ids of the batches covering the pending requests, re-attaching to recorded ones before creating new ones"""
+        attached = [batch_id for batch_id, keys in batches.items() if not pending.keys().isdisjoint(keys)]
+        if attached:
+            print(f"   ♻️ Re-attaching to {len(attached)} submitted batch(es) for this job")
+        covered = {key for batch_id in attached for key in batches[batch_id]}
+        keys = [key for key in pending if key not in covered]
+
+        for start in range(0, len(keys), MAX_BATCH_REQUESTS):
+            chunk = keys[start:start + MAX_BATCH_REQUESTS]
+            batch = self.client.messages.batches.create(requests=[
+                {"custom_id": key, "params": self.build_request(pending[key], self.model, self.max_tokens)}
+                for key in chunk
+            ])
+            batches[batch.id] = chunk
+            self._save_batches(batches)
+            attached.append(batch.id)
+            print(f"   📤 Submitted batch {batch.id} with {len(chunk):,} requests")
+        return attached
+
+    def _wait(self, batch_ids: List[str]):
+        while True:
+            batches = [self.client.messages.batches.retrieve(batch_id) for batch_id in batch_ids]
+            if all(batch.processing_status == 'ended' for batch in batches):
+                print()
+                return
+            remaining = sum(batch.request_counts.processing for batch in batches)
+            print(f"   ⏳ Waiting on batch results: {remaining:,} requests processing...", end='\r')
+            time.sleep(self.poll_interval)
+
+    def _collect(self, batch_ids: List[str], batches: Dict[str, List[str]], collected: Dict[str, Dict]) -> tuple:
+        """Stream finished results into results.jsonl as they are read; returns (results, failure reasons)
+
+        A batch leaves the record only once all of its results have been read, so
+        a run interrupted here re-reads it on the next run instead of resubmitting.
+        """
+        fresh, reasons = {}, {}
+        with open(self.results_path, 'a') as f:
+            for batch_id in batch_ids:
+                for entry in self.client.messages.batches.results(batch_id):
+                    key = entry.custom_id
+                    if key in collected or key in fresh:
+                        continue
+                    if entry.result.type != 'succeeded':
+                        reasons[key] = f"batch_{entry.result.type}"
+                        continue
+                    self.usage.update(usage_counts(getattr(entry.result.message, 'usage', None)))
+                    try:
+                        result = self.parse_result(entry.result.message)
+                    except Exception:
+                        reasons[key] = 'parse'
+                        continue
+                    fresh[key] = result
+                    self.parsed += 1
+                    f.write(json.dumps({'key': key, 'result': result}) + '\n')
+                f.flush()
+                del batches[batch_id]
+                self._save_batches(batches)
+        if reasons:
+            print(f"⚠️ {len(reasons):,} batch requests did not succeed; they will be resubmitted on the next run")
+        return fresh, reasons
+
+    def run(self, comments: Dict[object, str],
+            on_result: Optional[Callable[[object, Dict], None]] = None) -> Dict[object, Dict]:
+        """Result for every id in comments (any hashable id to comment text), submitting only those not yet collected
+
+        Comments with the same normalized text share one request. on_result(id,
+        result) is called for every comment that has a real result once the job
+        finishes; the rest get a FAILED result.
+        """
+        os.makedirs(self.state_dir, exist_ok=True)
+        keys = {comment_id: self.request_key(text) for comment_id, text in comments.items()}
+        texts = {key: comments[comment_id] for comment_id, key in keys.items()}
+        collected = self._load_results()
+        uncollected = [key for key in texts if key not in collected]
+        if self.cache and uncollected:
+            cached = self.cache.get_many([texts[key] for key in uncollected], self.model, self.prompt_version)
+            collected.update((key, result) for key, result in zip(uncollected, cached) if result is not None)
+        pending = {key: texts[key] for key in uncollected if key not in collected}
+        print(f"   {len(texts) - len(pending):,} distinct comments already classified, {len(pending):,} pending")
+
+        reasons = {}
+        if pending:
+            batches = self._load_batches()
+            batch_ids = self._submit(pending, batches)
+            self._wait(batch_ids)
+            fresh, reasons = self._collect(batch_ids, batches, collected)
+            fresh = {key: result for key, result in fresh.items() if key in pending}
+            if self.cache and fresh:
+                self.cache.put_many([pending[key] for key in fresh], list(fresh.values()),
+                                    self.model, self.prompt_version)
+            collected.update(fresh)
+
+        if on_result:
+            for comment_id, key in keys.items():
+                if key in collected:
+                    on_result(comment_id, collected[key])
+        results = {comment_id: collected[key] if key in collected
+                   else failed_result(reasons.get(key, 'batch_missing')) for comment_id, key in keys.items()}
+        self.failures.update(result['feedback'] for result in results.values() if result['sentiment'] == FAILED)
+        return results
@@ -0,0 +1,102 @@
+"""
+@treehut sentiment run metrics
+Per-call latency, queue wait, token and outcome records for Claude requests, and the
+run summary (latency percentiles, throughput, tokens per comment, estimated cost)
+"""
+
+import json
+from array import array
+from collections import Counter
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Token counters reported by the Messages API
+USAGE_FIELDS = ('input_tokens', 'output_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens')
+
+# USD per million tokens, by usage field; prompt-cache writes cost 1.25x input, reads 0.1x
+MODEL_PRICING = {
+    'claude-3-5-sonnet-20241022': {'input_tokens': 3.00, 'output_tokens': 15.00,
+                                   'cache_creation_input_tokens': 3.75, 'cache_read_input_tokens': 0.30},
+    'claude-3-5-haiku-20241022': {'input_tokens': 0.80, 'output_tokens': 4.00,
+                                  'cache_creation_input_tokens': 1.00, 'cache_read_input_tokens': 0.08}
+}
+# Message Batches are billed at half the real-time price
+BATCH_DISCOUNT = 0.5
+
+DEFAULT_METRICS_PATH = 'sentiment_analysis/run_metrics.json'
+
+
+def estimate_cost(usage: Dict, model: str, batch: bool = False) -> Optional[float]:
+    """Estimated USD cost of the usage totals, or None for a model without known pricing"""
+    pricing = MODEL_PRICING.get(model)
+    if pricing is None:
+        return None
+    cost = sum(usage.get(field, 0) * price for field, price in pricing.items()) / 1e6
+    return cost * BATCH_DISCOUNT if batch else cost
+
+
+def percentiles(values: np.ndarray) -> Dict:
+    """p50/p95/p99 and mean of values, None when there are none"""
+    if not len(values):
+        return {'p50': None, 'p95': None, 'p99': None, 'mean': None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99), 'mean': float(values.mean())}
+
+
+class CallLog:
+    """One record per API call, kept as compact numeric columns so full-corpus runs stay small
+
+    record() takes a dict with any of FIELDS (missing ones count as 0) and an
+    outcome: 'ok', 'partial' (a pack answered only in part), 'parse_error' or
+    'failed:<error class>'.
+    """
+
+    FIELDS = ('queue_wait', 'latency', 'retries', 'comments', 'parsed') + USAGE_FIELDS
+
+    def __init__(self):
+        self.columns = {field: array('d') for field in self.FIELDS}
+        self.outcomes = []
+
+    def __len__(self):
+        return len(self.outcomes)
+
+    def record(self, call: Dict):
+        for field, column in self.columns.items():
+            column.append(call.get(field, 0))
+        self.outcomes.append(call.get('outcome', 'ok'))
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """numpy copies of the numeric columns (views would block further appends)"""
+        return {field: np.array(column, dtype=np.float64) for field, column in self.columns.items()}
+
+    def frame(self) -> pd.DataFrame:
+        """Every call as a row"""
+        return pd.DataFrame(self.arrays()).assign(outcome=self.outcomes)
+
+    def summary(self, model: str, batch: bool = False) -> Dict:
+        """Latency and queue-wait percentiles, outcomes, tokens per comment and estimated cost"""
+        columns = self.arrays()
+        usage = {field: int(columns[field].sum()) for field in USAGE_FIELDS}
+        parsed = int(columns['parsed'].sum())
+        cost = estimate_cost(usage, model, batch=batch)
+        return {
+            'calls': len(self),
+            'outcomes': dict(Counter(self.outcomes)),
+            'comments_sent': int(columns['comments'].sum()),
+            'comments_parsed': parsed,
+            'retries': int(columns['retries'].sum()),
+            'latency_seconds': percentiles(columns['latency']),
+            'queue_wait_seconds': percentiles(columns['queue_wait']),
+            'tokens': usage,
+            'tokens_per_comment': sum(usage.values()) / parsed if parsed else None,
+            'estimated_cost_usd': cost,
+            'cost_per_1k_comments_usd': cost / parsed * 1000 if cost is not None and parsed else None
+        }
+
+
+def write_metrics(metrics: Dict, path: str = DEFAULT_METRICS_PATH):
+    """Save a run summary as JSON"""
+    with open(path, 'w') as f:
+        json.dump(metrics, f, indent=2, default=float)
@@ -0,0 +1,166 @@
+"""
+@treehut sentiment themes
+Canonical theme names, an interned theme vocabulary and the long-form (comment, theme)
+table that overall, per-sentiment and per-post theme counts are all computed from
+"""
+
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+# The theme vocabulary the sentiment prompt asks for, in the order it lists them
+THEME_VOCABULARY = [
+    'product_quality', 'scent', 'texture', 'skin_results', 'price', 'availability', 'packaging', 'shipping',
+    'customer_service', 'new_launch', 'discontinued', 'giveaway', 'pr_program', 'brand_love', 'routine',
+    'ingredients', 'sensitivity', 'comparison', 'request', 'question', 'tag_friend', 'off_topic'
+]
+
+# Free-text variants the model produces, keyed by their snake_case form
+THEME_SYNONYMS = {
+    'quality': 'product_quality', 'product': 'product_quality', 'effectiveness': 'product_quality',
+    'smell': 'scent', 'smells': 'scent', 'scents': 'scent', 'fragrance': 'scent', 'aroma': 'scent',
+    'consistency': 'texture', 'feel': 'texture',
+    'results': 'skin_results', 'skin': 'skin_results', 'skincare': 'skin_results', 'skin_health': 'skin_results',
+    'cost': 'price', 'pricing': 'price', 'prices': 'price', 'value': 'price', 'price_increase': 'price',
+    'stock': 'availability', 'in_stock': 'availability', 'out_of_stock': 'availability',
+    'restock': 'availability', 'where_to_buy': 'availability',
+    'package': 'packaging', 'container': 'packaging', 'jar': 'packaging',
+    'delivery': 'shipping', 'shipment': 'shipping',
+    'service': 'customer_service', 'customer_support': 'customer_service', 'support': 'customer_service',
+    'launch': 'new_launch', 'new_product': 'new_launch', 'new_products': 'new_launch', 'new_scent': 'new_launch',
+    'discontinuation': 'discontinued', 'bring_back': 'discontinued',
+    'giveaways': 'giveaway', 'contest': 'giveaway', 'contests': 'giveaway', 'giveaway_entry': 'giveaway',
+    'pr': 'pr_program', 'pr_application': 'pr_program', 'influencer': 'pr_program',
+    'influencer_program': 'pr_program', 'collaboration': 'pr_program',
+    'brand_loyalty': 'brand_love', 'loyalty': 'brand_love', 'brand': 'brand_love', 'enthusiasm': 'brand_love',
+    'skincare_routine': 'routine', 'usage': 'routine', 'how_to_use': 'routine',
+    'ingredient': 'ingredients', 'formula': 'ingredients',
+    'sensitive_skin': 'sensitivity', 'allergy': 'sensitivity', 'skin_reaction': 'sensitivity',
+    'comparisons': 'comparison', 'competitor': 'comparison',
+    'requests': 'request', 'product_request': 'request', 'suggestion': 'request',
+    'questions': 'question', 'inquiry': 'question', 'product_question': 'question',
+    'tagging': 'tag_friend', 'tag_friends': 'tag_friend', 'tagging_friends': 'tag_friend',
+    'friend_tag': 'tag_friend', 'mention': 'tag_friend', 'mentions': 'tag_friend',
+    'unrelated': 'off_topic', 'spam': 'off_topic', 'other': 'off_topic'
+}
+
+NON_WORD = re.compile(r'[^a-z0-9]+')
+
+
+def canonical_theme(theme) -> str:
+    """snake_case theme name with case, spacing and punctuation folded and synonyms mapped ('' if empty)"""
+    key = NON_WORD.sub('_', unicodedata.normalize('NFKC', str(theme)).casefold()).strip('_')
+    return THEME_SYNONYMS.get(key, key)
+
+
+def canonical_themes(themes: Iterable) -> List[str]:
+    """Canonical names of a comment's themes, deduplicated in first-seen order"""
+    return list(dict.fromkeys(name for name in map(canonical_theme, themes) if name))
+
+
+class ThemeVocabulary:
+    """Interned canonical theme names; a name keeps its id for the life of the vocabulary"""
+
+    def __init__(self, names: Sequence[str] = THEME_VOCABULARY):
+        self.names = []
+        self.ids = {}
+        self.intern(names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _id(self, name: str) -> int:
+        if name not in self.ids:
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+        return self.ids[name]
+
+    def intern(self, themes: Sequence) -> np.ndarray:
+        """Id of each theme after canonicalization (-1 for an empty name), adding unseen names
+
+        Only the distinct raw strings are canonicalized, so the cost is one hash pass
+        over the themes however many times each one repeats.
+        """
+        codes, raw = pd.factorize(np.asarray(themes, dtype=object))
+        lookup = np.array([self._id(name) if name else -1 for name in map(canonical_theme, raw)] + [-1],
+                          dtype=np.int64)
+        return lookup[codes]
+
+    def lookup(self, theme_ids: np.ndarray) -> np.ndarray:
+        """Names of theme ids"""
+        return np.array(self.names, dtype=object)[theme_ids]
+
+
+class ThemeTable:
+    """Long-form themes of a result frame: one (comment_id, theme_id) row per theme mention
+
+    row is the comment's position in the source frame, so per-comment columns
+    (post, sentiment) are joined with a take instead of a merge. A theme repeated
+    within one comment is counted once.
+    """
+
+    def __init__(self, rows: np.ndarray, comment_ids: np.ndarray, theme_ids: np.ndarray,
+                 vocabulary: ThemeVocabulary):
+        self.rows = rows
+        self.comment_ids = comment_ids
+        self.theme_ids = theme_ids
+        self.vocabulary = vocabulary
+
+    def __len__(self):
+        return len(self.theme_ids)
+
+    @classmethod
+    def from_results(cls, sentiment_df: pd.DataFrame, vocabulary: ThemeVocabulary = None) -> 'ThemeTable':
+        """Table of sentiment_df's theme lists, interned into vocabulary (a fresh one by default)"""
+        vocabulary = vocabulary if vocabulary is not None else ThemeVocabulary()
+        theme_lists = [themes if isinstance(themes, list) else [] for themes in sentiment_df['themes']]
+        lengths = np.fromiter(map(len, theme_lists), dtype=np.int64, count=len(theme_lists))
+        rows = np.repeat(np.arange(len(theme_lists)), lengths)
+        theme_ids = vocabulary.intern([theme for themes in theme_lists for theme in themes])
+
+        key = rows * (len(vocabulary) + 1) + theme_ids
+        keep = (theme_ids >= 0) & ~pd.Index(key).duplicated()
+        comment_ids = (sentiment_df['comment_id'] if 'comment_id' in sentiment_df else sentiment_df.index).to_numpy()
+        return cls(rows[keep], comment_ids[rows[keep]], theme_ids[keep], vocabulary)
+
+    def frame(self) -> pd.DataFrame:
+        """The (comment_id, theme_id) rows with theme names"""
+        return pd.DataFrame({'comment_id': self.comment_ids, 'theme_id': self.theme_ids,
+                             'theme': self.vocabulary.lookup(self.theme_ids)})
+
+    def counts(self, keys: Dict[str, np.ndarray]) -> pd.DataFrame:
+        """Mentions and first-seen position of each theme per combination of per-comment keys
+
+        keys maps a column name to one value per source row (e.g. media_id and
+        sentiment). This is the single grouped pass over the table; coarser counts
+        are re-aggregated from its result with rank().
+        """
+        frame = pd.DataFrame({name: np.asarray(values)[self.rows] for name, values in keys.items()})
+        frame['theme_id'] = self.theme_ids
+        frame['position'] = np.arange(len(self))
+        counted = frame.groupby(list(keys) + ['theme_id'], sort=False)['position'].agg(['size', 'min'])
+        return counted.rename(columns={'size': 'mentions', 'min': 'first_seen'}).reset_index()
+
+    def rank(self, counts: pd.DataFrame, by: Sequence[str] = (), n: int = None) -> pd.DataFrame:
+        """Themes of counts() summed within each `by` group, most mentioned first and first-seen first on ties"""
+        by = list(by)
+        ranked = (counts.groupby(by + ['theme_id'], sort=False)
+                  .agg(mentions=('mentions', 'sum'), first_seen=('first_seen', 'min')).reset_index()
+                  .sort_values(by + ['mentions', 'first_seen'], ascending=[True] * len(by) + [False, True]))
+        if n is not None:
+            ranked = ranked.groupby(by, sort=False).head(n) if by else ranked.head(n)
+        return ranked.assign(theme=self.vocabulary.lookup(ranked['theme_id'].to_numpy()))
+
+    @staticmethod
+    def lists(ranked: pd.DataFrame, by: str) -> pd.Series:
+        """Theme names of rank() output as one list per `by` value, in rank order"""
+        # Rows are sorted by group, so split at group boundaries rather than a per-group agg(list)
+        values = ranked[by].to_numpy()
+        if not len(values):
+            return pd.Series([], dtype=object)
+        starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+        chunks = np.split(ranked['theme'].to_numpy(dtype=object), starts[1:])
+        return pd.Series([chunk.tolist() for chunk in chunks], index=values[starts], dtype=object)
@@ -6,44 +6,187 @@ Comprehensive analysis of March 2025 engagement data for strategic insights
 
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime, timedelta
 import re
 from collections import Counter
 import os
+import functools
 import warnings
 warnings.filterwarnings('ignore')
 
-# Set up plotting style
-plt.style.use('seaborn-v0_8')
-sns.set_palette("husl")
+from chart_rendering import ChartTask, render_charts
+from comment_text import KeywordScanner, LexiconScorer
+from engagement_data import GIVEAWAY_PATTERN, CaptionTagger, aggregate_stream, load_engagements, post_values
+
+# Caption keyword taxonomy used by the content analysis
+PRODUCT_KEYWORDS = {
+    'scrub': ['scrub', 'exfoliat'],
+    'lotion': ['lotion', 'moisturiz'],
+    'hand_wash': ['hand wash', 'handwash'],
+    'shave': ['shave', 'pre-shave'],
+    'serum': ['serum'],
+    'oil': ['oil']
+}
+
+SCENT_KEYWORDS = {
+    'vanilla': ['vanilla'],
+    'tangerine': ['tangerine', 'orange'],
+    'coconut': ['coconut'],
+    'shea': ['shea'],
+    'tropical': ['tropical', 'mango', 'pineapple'],
+    'berry': ['berry', 'strawberry', 'raspberry'],
+    'citrus': ['citrus', 'lemon', 'lime']
+}
+
+# The whole caption taxonomy, compiled once and evaluated once per unique caption
+CAPTION_TAGGER = CaptionTagger({
+    'product': PRODUCT_KEYWORDS,
+    'scent': SCENT_KEYWORDS,
+    'giveaway': {'giveaway': GIVEAWAY_PATTERN.split('|')}
+})
+
+# Location keywords scanned in comments for geographic demand signals
+LOCATION_KEYWORDS = {
+    'Canada': ['canada', 'canadian'],
+    'UK': ['uk', 'britain', 'england', 'scotland', 'wales'],
+    'Australia': ['australia', 'aussie', 'oz'],
+    'Europe': ['europe', 'european'],
+    'Mexico': ['mexico', 'mexican'],
+    'International': ['international', 'worldwide', 'global']
+}
+
+LOCATION_SCANNER = KeywordScanner(LOCATION_KEYWORDS)
+
+# Word-list sentiment used as a free baseline over every comment
+LEXICON_SCORER = LexiconScorer()
+
+def memoized_result(method):
+    """Compute a TreeHutAnalyzer metric once per dataset version and serve it from the results cache"""
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        key = (self._data_version, method.__name__, args)
+        if key not in self._results:
+            self._results[key] = method(self, *args)
+        return self._results[key]
+    return wrapper
 
 class TreeHutAnalyzer:
-    def __init__(self, csv_path='engagements.csv'):
+    def __init__(self, csv_path='engagements.csv', use_cache=True, stream=False, chunksize=250_000):
         """Initialize the analyzer with engagement data"""
+        # Metrics shared by the console report and the charts, keyed by dataset version
+        self._data_version = 0
+        self._results = {}
+        self.stream_stats = None
+        if stream:
+            # Streaming mode keeps only running aggregates, never the full frame
+            print(f"Streaming engagement data in chunks of {chunksize:,} rows...")
+            self.df = None
+            self.stream_stats = aggregate_stream(csv_path, CAPTION_TAGGER, chunksize=chunksize)
+            print(f"Aggregated {self.stream_stats.total_comments:,} engagement records")
+            return
+
         print("Loading engagement data...")
-        self.df = pd.read_csv(csv_path)
+        # self.posts holds one row per post (caption and caption features);
+        # self.df holds one slim row per comment with a categorical media_id
+        self.posts, self.df = load_engagements(csv_path, use_cache=use_cache)
         self.prepare_data()
         
     def prepare_data(self):
         """Clean and prepare the data for analysis"""
         print(f"Loaded {len(self.df):,} engagement records")
         
-        # Convert timestamp to datetime with flexible format
-        self.df['timestamp'] = pd.to_datetime(self.df['timestamp'], format='mixed')
-        self.df['date'] = self.df['timestamp'].dt.date
-        self.df['hour'] = self.df['timestamp'].dt.hour
-        self.df['day_of_week'] = self.df['timestamp'].dt.day_name()
-        
-        # Clean text data
-        self.df['comment_text'] = self.df['comment_text'].fillna('')
-        self.df['media_caption'] = self.df['media_caption'].fillna('')
+        # Timestamp parsing, text cleanup, the derived date/hour/day_of_week/
+        # comment_length columns and the posts/comments split happen in
+        # load_engagements() so they can be cached
+        print(f"Normalized into {len(self.posts):,} posts")
         
-        # Calculate comment length
-        self.df['comment_length'] = self.df['comment_text'].str.len()
+        # One boolean row per post, one (group, tag) column per product/scent/giveaway tag
+        self.post_tags = CAPTION_TAGGER.tag(self.posts['media_caption'])
         
         print("Data preparation complete!")
+
+    @property
+    def df(self):
+        """Comments fact table; assigning a new frame invalidates memoized results"""
+        return self._df
+
+    @df.setter
+    def df(self, value):
+        self._df = value
+        self.invalidate_results()
+
+    def invalidate_results(self):
+        """Drop memoized metrics; call after modifying self.df in place"""
+        self._data_version += 1
+        self._results = {}
+
+    @memoized_result
+    def _engagement_counts(self):
+        """Per-post, daily and hourly comment counts from the frame or the streamed aggregates"""
+        if self.stream_stats is not None:
+            stats = self.stream_stats
+            return {
+                'total_comments': stats.total_comments,
+                'date_range': (stats.min_date, stats.max_date),
+                'post_engagement': stats.post_counts.sort_values(ascending=False, kind='stable'),
+                'daily_engagement': stats.daily_counts.sort_index(),
+                'hourly_engagement': stats.hourly_counts.sort_index()
+            }
+        return {
+            'total_comments': len(self.df),
+            'date_range': (self.df['date'].min(), self.df['date'].max()),
+            'post_engagement': self.df.groupby('media_id', observed=True).size().sort_values(ascending=False),
+            'daily_engagement': self.df.groupby('date').size(),
+            'hourly_engagement': self.df.groupby('hour').size()
+        }
+
+    def _post_caption(self, media_id):
+        """Caption of a post"""
+        if self.stream_stats is not None:
+            return self.stream_stats.first_captions[media_id]
+        return self.posts.at[media_id, 'media_caption']
+
+    def _tag_mask(self, group, name):
+        """Comment rows whose post caption carries a tag"""
+        return post_values(self.post_tags[(group, name)], self.df)
+
+    @memoized_result
+    def _comments_per_post(self):
+        """Comment count per post, aligned to self.posts.index"""
+        return self.df['media_id'].value_counts(sort=False).reindex(self.posts.index, fill_value=0)
+
+    @memoized_result
+    def _tag_totals(self):
+        """Matching comments and posts for every caption tag, from one pass over the tag matrix"""
+        comments_per_post = self._comments_per_post()
+        tags = self.post_tags[comments_per_post > 0].astype('int64')
+        return pd.DataFrame({
+            'total_comments': tags.T @ comments_per_post[comments_per_post > 0],
+            'posts': tags.sum()
+        })
+
+    @memoized_result
+    def _giveaway_split(self):
+        """Average comments per post for (regular, giveaway) posts"""
+        comments_per_post = self._comments_per_post()
+        commented = comments_per_post[comments_per_post > 0]
+        is_giveaway = self.post_tags[('giveaway', 'giveaway')][comments_per_post > 0]
+        giveaway_avg = commented[is_giveaway].mean() if is_giveaway.any() else 0
+        regular_avg = commented[~is_giveaway].mean() if (~is_giveaway).any() else 0
+        return regular_avg, giveaway_avg
+
+    @memoized_result
+    def _counts_by_tag(self, group, column):
+        """Comment counts per (tag in group, value of column), rolled up from per-post counts"""
+        per_post = self.df.groupby(['media_id', column], observed=False).size().unstack(fill_value=0)
+        return self.post_tags[group].T.astype('int64') @ per_post.reindex(self.posts.index, fill_value=0)
+
+    def _caption_tag_stats(self, group, name):
+        """(matching comments, matching posts) for a caption tag"""
+        if self.stream_stats is not None:
+            return self.stream_stats.tag_stats((group, name))
+        totals = self._tag_totals().loc[(group, name)]
+        return int(totals['total_comments']), int(totals['posts'])
         
     def data_overview(self):
         """Generate comprehensive data overview"""
@@ -51,39 +194,44 @@ class TreeHutAnalyzer:
         print("📊 DATA OVERVIEW & QUALITY ASSESSMENT")
         print("="*60)
         
+        counts = self._engagement_counts()
+        total_comments = counts['total_comments']
+        post_engagement = counts['post_engagement']
+        unique_posts = len(post_engagement)
+        date_range = counts['date_range']
+        
         # Basic statistics
         print(f"\n📈 Dataset Statistics:")
-        print(f"• Total Comments: {len(self.df):,}")
-        print(f"• Date Range: {self.df['date'].min()} to {self.df['date'].max()}")
-        print(f"• Unique Posts: {self.df['media_id'].nunique():,}")
-        print(f"• Average Comments per Post: {len(self.df) / self.df['media_id'].nunique():.1f}")
+        print(f"• Total Comments: {total_comments:,}")
+        print(f"• Date Range: {date_range[0]} to {date_range[1]}")
+        print(f"• Unique Posts: {unique_posts:,}")
+        print(f"• Average Comments per Post: {total_comments / unique_posts:.1f}")
         
         # Engagement distribution by post
-        post_engagement = self.df.groupby('media_id').size().sort_values(ascending=False)
         print(f"\n🔥 Top Performing Posts (by comment count):")
         for i, (media_id, count) in enumerate(post_engagement.head(5).items()):
-            caption = self.df[self.df['media_id'] == media_id]['media_caption'].iloc[0]
+            caption = self._post_caption(media_id)
             caption_preview = caption[:80] + "..." if len(caption) > 80 else caption
             print(f"  {i+1}. {count:,} comments - {caption_preview}")
             
         # Daily engagement patterns
-        daily_engagement = self.df.groupby('date').size()
+        daily_engagement = counts['daily_engagement']
         print(f"\n📅 Daily Engagement Patterns:")
         print(f"• Peak Day: {daily_engagement.idxmax()} ({daily_engagement.max():,} comments)")
         print(f"• Lowest Day: {daily_engagement.idxmin()} ({daily_engagement.min():,} comments)")
         print(f"• Average Daily Comments: {daily_engagement.mean():.0f}")
         
         # Hourly patterns
-        hourly_engagement = self.df.groupby('hour').size()
+        hourly_engagement = counts['hourly_engagement']
         peak_hours = hourly_engagement.nlargest(3)
         print(f"\n⏰ Peak Engagement Hours:")
         for hour, count in peak_hours.items():
             print(f"  • {hour:02d}:00 - {count:,} comments")
             
         return {
-            'total_comments': len(self.df),
-            'unique_posts': self.df['media_id'].nunique(),
-            'date_range': (self.df['date'].min(), self.df['date'].max()),
+            'total_comments': total_comments,
+            'unique_posts': unique_posts,
+            'date_range': date_range,
             'top_posts': post_engagement.head(10),
             'daily_engagement': daily_engagement,
             'hourly_engagement': hourly_engagement
@@ -95,40 +243,15 @@ class TreeHutAnalyzer:
         print("📝 CONTENT PERFORMANCE ANALYSIS")
         print("="*60)
         
-        # Analyze post captions for themes
-        all_captions = self.df['media_caption'].unique()
-        
-        # Product mentions in captions
-        product_keywords = {
-            'scrub': ['scrub', 'exfoliat'],
-            'lotion': ['lotion', 'moisturiz'],
-            'hand_wash': ['hand wash', 'handwash'],
-            'shave': ['shave', 'pre-shave'],
-            'serum': ['serum'],
-            'oil': ['oil']
-        }
-        
-        scent_keywords = {
-            'vanilla': ['vanilla'],
-            'tangerine': ['tangerine', 'orange'],
-            'coconut': ['coconut'],
-            'shea': ['shea'],
-            'tropical': ['tropical', 'mango', 'pineapple'],
-            'berry': ['berry', 'strawberry', 'raspberry'],
-            'citrus': ['citrus', 'lemon', 'lime']
-        }
-        
         # Analyze product mentions
         product_performance = {}
-        for product, keywords in product_keywords.items():
-            pattern = '|'.join(keywords)
-            matching_posts = self.df[self.df['media_caption'].str.contains(pattern, case=False, na=False)]
-            if len(matching_posts) > 0:
-                avg_engagement = len(matching_posts) / matching_posts['media_id'].nunique()
+        for product in PRODUCT_KEYWORDS:
+            total_comments, posts = self._caption_tag_stats('product', product)
+            if total_comments > 0:
                 product_performance[product] = {
-                    'posts': matching_posts['media_id'].nunique(),
-                    'total_comments': len(matching_posts),
-                    'avg_comments_per_post': avg_engagement
+                    'posts': posts,
+                    'total_comments': total_comments,
+                    'avg_comments_per_post': total_comments / posts
                 }
         
         print(f"\n🛍️ Product Performance:")
@@ -140,15 +263,13 @@ class TreeHutAnalyzer:
         
         # Analyze scent mentions
         scent_performance = {}
-        for scent, keywords in scent_keywords.items():
-            pattern = '|'.join(keywords)
-            matching_posts = self.df[self.df['media_caption'].str.contains(pattern, case=False, na=False)]
-            if len(matching_posts) > 0:
-                avg_engagement = len(matching_posts) / matching_posts['media_id'].nunique()
+        for scent in SCENT_KEYWORDS:
+            total_comments, posts = self._caption_tag_stats('scent', scent)
+            if total_comments > 0:
                 scent_performance[scent] = {
-                    'posts': matching_posts['media_id'].nunique(),
-                    'total_comments': len(matching_posts),
-                    'avg_comments_per_post': avg_engagement
+                    'posts': posts,
+                    'total_comments': total_comments,
+                    'avg_comments_per_post': total_comments / posts
                 }
         
         print(f"\n🌸 Scent Performance:")
@@ -159,21 +280,21 @@ class TreeHutAnalyzer:
                   f"{stats['avg_comments_per_post']:.1f} avg/post")
         
         # Analyze giveaway performance
-        giveaway_posts = self.df[self.df['media_caption'].str.contains('giveaway|contest|win', case=False, na=False)]
-        if len(giveaway_posts) > 0:
-            giveaway_engagement = len(giveaway_posts) / giveaway_posts['media_id'].nunique()
+        giveaway_comments, giveaway_post_count = self._caption_tag_stats('giveaway', 'giveaway')
+        if giveaway_comments > 0:
+            giveaway_engagement = giveaway_comments / giveaway_post_count
             print(f"\n🎁 Giveaway Performance:")
-            print(f"  • Giveaway Posts: {giveaway_posts['media_id'].nunique()}")
-            print(f"  • Total Comments: {len(giveaway_posts):,}")
+            print(f"  • Giveaway Posts: {giveaway_post_count}")
+            print(f"  • Total Comments: {giveaway_comments:,}")
             print(f"  • Avg Comments per Giveaway: {giveaway_engagement:.1f}")
         
         return {
             'product_performance': product_performance,
             'scent_performance': scent_performance,
-            'giveaway_stats': len(giveaway_posts) if len(giveaway_posts) > 0 else 0
+            'giveaway_stats': giveaway_comments
         }
 
-    def create_visualizations(self):
+    def create_visualizations(self, jobs=1):
         """Create key visualization plots"""
         print("\n" + "="*60)
         print("📊 CREATING VISUALIZATIONS")
@@ -189,151 +310,53 @@ class TreeHutAnalyzer:
                 os.makedirs(directory)
                 print(f"📁 Created directory: {directory}/")
 
-        # Set up the plot style
-        plt.style.use('default')
-        sns.set_palette("husl")
-
-        # 1. Daily engagement pattern
-        fig1, ax1 = plt.subplots(figsize=(12, 6))
-        daily_engagement = self.df.groupby('date').size()
-        ax1.plot(daily_engagement.index, daily_engagement.values, marker='o', linewidth=2, markersize=4, color='steelblue')
-        ax1.set_title('Daily Engagement Pattern', fontweight='bold', fontsize=14, pad=20)
-        ax1.set_xlabel('Date')
-        ax1.set_ylabel('Number of Comments')
-        ax1.tick_params(axis='x', rotation=45)
-        ax1.grid(True, alpha=0.3)
-        plt.tight_layout()
-        daily_path = os.path.join(core_dir, 'daily_engagement_pattern.png')
-        plt.savefig(daily_path, dpi=300, bbox_inches='tight')
-        print(f"📅 Daily engagement pattern saved as '{daily_path}'")
-        plt.close()
-
-        # 2. Hourly engagement distribution
-        fig2, ax2 = plt.subplots(figsize=(12, 6))
-        hourly_engagement = self.df.groupby('hour').size()
-        ax2.bar(hourly_engagement.index, hourly_engagement.values, color='skyblue', alpha=0.7)
-        ax2.set_title('Hourly Engagement Distribution', fontweight='bold', fontsize=14, pad=20)
-        ax2.set_xlabel('Hour of Day')
-        ax2.set_ylabel('Number of Comments')
-        ax2.grid(True, alpha=0.3)
-        plt.tight_layout()
-        hourly_path = os.path.join(core_dir, 'hourly_engagement_distribution.png')
-        plt.savefig(hourly_path, dpi=300, bbox_inches='tight')
-        print(f"⏰ Hourly engagement distribution saved as '{hourly_path}'")
-        plt.close()
-
-        # 3. Top posts by engagement
-        fig3, ax3 = plt.subplots(figsize=(12, 8))
-        post_engagement = self.df.groupby('media_id').size().sort_values(ascending=False).head(10)
-        post_labels = [f"Post {i+1}" for i in range(len(post_engagement))]
-        ax3.barh(post_labels, post_engagement.values, color='lightcoral', alpha=0.7)
-        ax3.set_title('Top 10 Posts by Comment Count', fontweight='bold', fontsize=14, pad=20)
-        ax3.set_xlabel('Number of Comments')
-        plt.tight_layout()
-        top_posts_path = os.path.join(core_dir, 'top_posts_by_comments.png')
-        plt.savefig(top_posts_path, dpi=300, bbox_inches='tight')
-        print(f"🔥 Top posts chart saved as '{top_posts_path}'")
-        plt.close()
-
-        # 4. Giveaway vs Regular post performance
-        fig4, ax4 = plt.subplots(figsize=(10, 6))
-        giveaway_posts = self.df[self.df['media_caption'].str.contains('giveaway|contest|win', case=False, na=False)]
-        regular_posts = self.df[~self.df['media_caption'].str.contains('giveaway|contest|win', case=False, na=False)]
-
-        giveaway_avg = len(giveaway_posts) / giveaway_posts['media_id'].nunique() if len(giveaway_posts) > 0 else 0
-        regular_avg = len(regular_posts) / regular_posts['media_id'].nunique() if len(regular_posts) > 0 else 0
+        # Plot data comes from the memoized metrics; only that data goes to the renderers
+        counts = self._engagement_counts()
 
-        post_types = ['Regular Posts', 'Giveaway Posts']
-        avg_engagement = [regular_avg, giveaway_avg]
-        colors = ['lightblue', 'gold']
-
-        bars = ax4.bar(post_types, avg_engagement, color=colors, alpha=0.7)
-        ax4.set_title('Average Engagement: Regular vs Giveaway Posts', fontweight='bold', fontsize=14, pad=20)
-        ax4.set_ylabel('Average Comments per Post')
+        product_performance = {}
+        for product in PRODUCT_KEYWORDS:
+            total_comments, posts = self._caption_tag_stats('product', product)
+            if total_comments > 0:
+                product_performance[product] = total_comments / posts
 
-        # Add value labels on bars
-        for bar, value in zip(bars, avg_engagement):
-            ax4.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 1,
-                    f'{value:.1f}', ha='center', va='bottom', fontweight='bold')
+        scent_performance = {}
+        for scent in SCENT_KEYWORDS:
+            total_comments, posts = self._caption_tag_stats('scent', scent)
+            if total_comments > 0:
+                scent_performance[scent] = total_comments / posts
 
-        plt.tight_layout()
+        daily_path = os.path.join(core_dir, 'daily_engagement_pattern.png')
+        hourly_path = os.path.join(core_dir, 'hourly_engagement_distribution.png')
+        top_posts_path = os.path.join(core_dir, 'top_posts_by_comments.png')
         giveaway_comparison_path = os.path.join(core_dir, 'giveaway_vs_regular_posts.png')
-        plt.savefig(giveaway_comparison_path, dpi=300, bbox_inches='tight')
-        print(f"🎁 Giveaway comparison chart saved as '{giveaway_comparison_path}'")
-        plt.close()
-
-        # 5. Product performance analysis
-        fig5, ax5 = plt.subplots(figsize=(12, 8))
-        product_keywords = {
-            'scrub': ['scrub', 'exfoliat'],
-            'lotion': ['lotion', 'moisturiz'],
-            'hand_wash': ['hand wash', 'handwash'],
-            'shave': ['shave', 'pre-shave'],
-            'serum': ['serum'],
-            'oil': ['oil']
-        }
-
-        product_performance = {}
-        for product, keywords in product_keywords.items():
-            pattern = '|'.join(keywords)
-            matching_posts = self.df[self.df['media_caption'].str.contains(pattern, case=False, na=False)]
-            if len(matching_posts) > 0:
-                avg_engagement = len(matching_posts) / matching_posts['media_id'].nunique()
-                product_performance[product] = avg_engagement
-
-        if product_performance:
-            products = list(product_performance.keys())
-            performance = list(product_performance.values())
-
-            ax5.barh(products, performance, color='lightgreen', alpha=0.7)
-            ax5.set_title('Average Engagement by Product Type', fontweight='bold', fontsize=14, pad=20)
-            ax5.set_xlabel('Average Comments per Post')
-            ax5.grid(True, alpha=0.3, axis='x')
-
-        plt.tight_layout()
         product_performance_path = os.path.join(product_dir, 'product_performance_analysis.png')
-        plt.savefig(product_performance_path, dpi=300, bbox_inches='tight')
-        print(f"🛍️ Product performance analysis saved as '{product_performance_path}'")
-        plt.close()
-
-        # 6. Scent performance analysis
-        fig6, ax6 = plt.subplots(figsize=(12, 8))
-        scent_keywords = {
-            'vanilla': ['vanilla'],
-            'tangerine': ['tangerine', 'orange'],
-            'coconut': ['coconut'],
-            'shea': ['shea'],
-            'tropical': ['tropical', 'mango', 'pineapple'],
-            'berry': ['berry', 'strawberry', 'raspberry'],
-            'citrus': ['citrus', 'lemon', 'lime']
-        }
-
-        scent_performance = {}
-        for scent, keywords in scent_keywords.items():
-            pattern = '|'.join(keywords)
-            matching_posts = self.df[self.df['media_caption'].str.contains(pattern, case=False, na=False)]
-            if len(matching_posts) > 0:
-                avg_engagement = len(matching_posts) / matching_posts['media_id'].nunique()
-                scent_performance[scent] = avg_engagement
-
-        if scent_performance:
-            scents = list(scent_performance.keys())
-            performance = list(scent_performance.values())
-
-            ax6.barh(scents, performance, color='lightpink', alpha=0.7)
-            ax6.set_title('Average Engagement by Scent Type', fontweight='bold', fontsize=14, pad=20)
-            ax6.set_xlabel('Average Comments per Post')
-            ax6.grid(True, alpha=0.3, axis='x')
-
-        plt.tight_layout()
         scent_performance_path = os.path.join(product_dir, 'scent_performance_analysis.png')
-        plt.savefig(scent_performance_path, dpi=300, bbox_inches='tight')
-        print(f"🌸 Scent performance analysis saved as '{scent_performance_path}'")
-        plt.close()
+
+        tasks = [
+            # 1. Daily engagement pattern
+            ChartTask(_plot_daily_engagement, counts['daily_engagement'], daily_path,
+                      f"📅 Daily engagement pattern saved as '{daily_path}'"),
+            # 2. Hourly engagement distribution
+            ChartTask(_plot_hourly_engagement, counts['hourly_engagement'], hourly_path,
+                      f"⏰ Hourly engagement distribution saved as '{hourly_path}'"),
+            # 3. Top posts by engagement
+            ChartTask(_plot_top_posts, counts['post_engagement'].head(10), top_posts_path,
+                      f"🔥 Top posts chart saved as '{top_posts_path}'"),
+            # 4. Giveaway vs Regular post performance
+            ChartTask(_plot_giveaway_comparison, self._giveaway_split(), giveaway_comparison_path,
+                      f"🎁 Giveaway comparison chart saved as '{giveaway_comparison_path}'"),
+            # 5. Product performance analysis
+            ChartTask(_plot_product_performance, product_performance, product_performance_path,
+                      f"🛍️ Product performance analysis saved as '{product_performance_path}'"),
+            # 6. Scent performance analysis
+            ChartTask(_plot_scent_performance, scent_performance, scent_performance_path,
+                      f"🌸 Scent performance analysis saved as '{scent_performance_path}'")
+        ]
+        render_charts(tasks, jobs=jobs, style='default', palette='husl')
 
         return True
 
-    def create_additional_visualizations(self):
+    def create_additional_visualizations(self, jobs=1):
         """Create additional specialized charts for customer insights"""
         print("\n" + "="*60)
         print("📊 CREATING ADDITIONAL CUSTOMER INSIGHT VISUALIZATIONS")
@@ -347,43 +370,29 @@ class TreeHutAnalyzer:
             if not os.path.exists(directory):
                 os.makedirs(directory)
 
-        # 1. Scent Performance Comparison Chart
-        self._create_scent_performance_chart(insights_dir)
-
-        # 2. Geographic Demand Analysis
-        self._create_geographic_demand_chart(insights_dir)
-
-        # 3. Product Category Trend Over Time
-        self._create_product_trend_chart(insights_dir)
-
-        # 4. Comment Sentiment by Product Type
-        self._create_sentiment_analysis_chart(insights_dir)
-
-        # 5. Engagement vs Post Frequency Scatter Plot
-        self._create_engagement_frequency_scatter(insights_dir)
+        tasks = [
+            # 1. Scent Performance Comparison Chart
+            self._scent_performance_chart(insights_dir),
+            # 2. Geographic Demand Analysis
+            self._geographic_demand_chart(insights_dir),
+            # 3. Product Category Trend Over Time
+            self._product_trend_chart(insights_dir),
+            # 4. Comment Sentiment by Product Type
+            self._sentiment_analysis_chart(insights_dir),
+            # 5. Engagement vs Post Frequency Scatter Plot
+            self._engagement_frequency_scatter(insights_dir)
+        ]
+        render_charts(tasks, jobs=jobs, style='default', palette='husl')
 
         print("✅ All additional visualizations created successfully!")
         return True
 
-    def _create_scent_performance_chart(self, viz_dir):
-        """Create scent performance comparison with sample sizes"""
-        scent_keywords = {
-            'vanilla': ['vanilla'],
-            'tangerine': ['tangerine', 'orange'],
-            'coconut': ['coconut'],
-            'shea': ['shea'],
-            'tropical': ['tropical', 'mango', 'pineapple'],
-            'berry': ['berry', 'strawberry', 'raspberry'],
-            'citrus': ['citrus', 'lemon', 'lime']
-        }
-
+    def _scent_performance_chart(self, viz_dir):
+        """Scent performance comparison with sample sizes"""
         scent_data = []
-        for scent, keywords in scent_keywords.items():
-            pattern = '|'.join(keywords)
-            matching_posts = self.df[self.df['media_caption'].str.contains(pattern, case=False, na=False)]
-            if len(matching_posts) > 0:
-                unique_posts = matching_posts['media_id'].nunique()
-                total_comments = len(matching_posts)
+        for scent in SCENT_KEYWORDS:
+            total_comments, unique_posts = self._caption_tag_stats('scent', scent)
+            if total_comments > 0:
                 avg_engagement = total_comments / unique_posts
                 scent_data.append({
                     'scent': scent.title(),
@@ -394,221 +403,90 @@ class TreeHutAnalyzer:
 
         if scent_data:
             scent_df = pd.DataFrame(scent_data).sort_values('avg_engagement', ascending=True)
-
-            fig, ax = plt.subplots(figsize=(12, 8))
-            bars = ax.barh(scent_df['scent'], scent_df['avg_engagement'],
-                          color='lightcoral', alpha=0.7)
-
-            # Add sample size annotations
-            for i, (bar, row) in enumerate(zip(bars, scent_df.itertuples())):
-                ax.text(bar.get_width() + 1, bar.get_y() + bar.get_height()/2,
-                       f'{row.post_count} posts\n{row.total_comments} comments',
-                       ha='left', va='center', fontsize=9, alpha=0.8)
-
-            ax.set_title('Scent Performance: Engagement Rate with Sample Sizes',
-                        fontsize=14, fontweight='bold', pad=20)
-            ax.set_xlabel('Average Comments per Post')
-            ax.set_ylabel('Scent Category')
-            ax.grid(True, alpha=0.3, axis='x')
-
-            plt.tight_layout()
             scent_path = os.path.join(viz_dir, 'scent_performance_comparison.png')
-            plt.savefig(scent_path, dpi=300, bbox_inches='tight')
-            print(f"📈 Scent performance chart saved as '{scent_path}'")
-            plt.close()
-
-    def _create_geographic_demand_chart(self, viz_dir):
-        """Create geographic demand analysis from comments"""
-        # Common location keywords to search for
-        locations = {
-            'Canada': ['canada', 'canadian'],
-            'UK': ['uk', 'britain', 'england', 'scotland', 'wales'],
-            'Australia': ['australia', 'aussie', 'oz'],
-            'Europe': ['europe', 'european'],
-            'Mexico': ['mexico', 'mexican'],
-            'International': ['international', 'worldwide', 'global']
-        }
-
-        location_mentions = {}
-        for location, keywords in locations.items():
-            pattern = '|'.join(keywords)
-            mentions = self.df[self.df['comment_text'].str.contains(pattern, case=False, na=False)]
-            location_mentions[location] = len(mentions)
+            return ChartTask(_plot_scent_comparison, scent_df, scent_path,
+                             f"📈 Scent performance chart saved as '{scent_path}'")
+
+    def score_lexicon_sentiment(self):
+        """Label every comment with the lexicon baseline sentiment, stored as the lexicon_sentiment column"""
+        if 'lexicon_sentiment' not in self.df.columns:
+            self.df['lexicon_sentiment'] = LEXICON_SCORER.score(self.df['comment_text'])['lexicon_sentiment']
+        return self.df['lexicon_sentiment']
+
+    @memoized_result
+    def _location_hits(self):
+        """One row per (comment, location) mention, with the comment's post and date"""
+        hits = LOCATION_SCANNER.hits(self.df['comment_text'])
+        return hits.join(self.df[['media_id', 'date']])
+
+    def _geographic_demand_chart(self, viz_dir):
+        """Geographic demand analysis from comments"""
+        # Comments mentioning each location (one comment counts once per location)
+        hits = self._location_hits()
+        location_mentions = hits['label'].value_counts(sort=False).to_dict()
 
         # Filter out locations with no mentions
         location_mentions = {k: v for k, v in location_mentions.items() if v > 0}
 
         if location_mentions:
-            locations_list = list(location_mentions.keys())
-            counts = list(location_mentions.values())
-
-            fig, ax = plt.subplots(figsize=(10, 6))
-            bars = ax.bar(locations_list, counts, color='skyblue', alpha=0.7)
-
-            # Add count labels on bars
-            for bar, count in zip(bars, counts):
-                ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.5,
-                       str(count), ha='center', va='bottom', fontweight='bold')
-
-            ax.set_title('Geographic Demand Signals in Customer Comments',
-                        fontsize=14, fontweight='bold', pad=20)
-            ax.set_xlabel('Location/Region')
-            ax.set_ylabel('Number of Mentions in Comments')
-            ax.grid(True, alpha=0.3, axis='y')
-            plt.xticks(rotation=45)
-
-            plt.tight_layout()
             geo_path = os.path.join(viz_dir, 'geographic_demand_analysis.png')
-            plt.savefig(geo_path, dpi=300, bbox_inches='tight')
-            print(f"🌍 Geographic demand chart saved as '{geo_path}'")
-            plt.close()
-
-    def _create_product_trend_chart(self, viz_dir):
-        """Create product category engagement trends over time"""
-        product_keywords = {
-            'scrub': ['scrub', 'exfoliat'],
-            'lotion': ['lotion', 'moisturiz'],
-            'hand_wash': ['hand wash', 'handwash'],
-            'shave': ['shave', 'pre-shave'],
-            'serum': ['serum'],
-            'oil': ['oil']
-        }
+            return ChartTask(_plot_geographic_demand, location_mentions, geo_path,
+                             f"🌍 Geographic demand chart saved as '{geo_path}'")
 
+    def _product_trend_chart(self, viz_dir):
+        """Product category engagement trends over time"""
         # Group by week for trend analysis
-        self.df['week'] = self.df['timestamp'].dt.to_period('W')
+        if 'week' not in self.df.columns:
+            self.df['week'] = self.df['timestamp'].dt.to_period('W')
+        weekly_by_product = self._counts_by_tag('product', 'week')
 
         trend_data = {}
-        for product, keywords in product_keywords.items():
-            pattern = '|'.join(keywords)
-            product_posts = self.df[self.df['media_caption'].str.contains(pattern, case=False, na=False)]
-            weekly_engagement = product_posts.groupby('week').size()
-            trend_data[product.title()] = weekly_engagement
+        for product in PRODUCT_KEYWORDS:
+            weekly_engagement = weekly_by_product.loc[product]
+            trend_data[product.title()] = weekly_engagement[weekly_engagement > 0]
 
         if trend_data:
-            fig, ax = plt.subplots(figsize=(12, 8))
-
-            for product, weekly_data in trend_data.items():
-                if len(weekly_data) > 1:  # Only plot if we have multiple data points
-                    ax.plot(weekly_data.index.astype(str), weekly_data.values,
-                           marker='o', linewidth=2, label=product, alpha=0.8)
-
-            ax.set_title('Product Category Engagement Trends Over Time',
-                        fontsize=14, fontweight='bold', pad=20)
-            ax.set_xlabel('Week')
-            ax.set_ylabel('Number of Comments')
-            ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-            ax.grid(True, alpha=0.3)
-            plt.xticks(rotation=45)
-
-            plt.tight_layout()
             trend_path = os.path.join(viz_dir, 'product_category_trends.png')
-            plt.savefig(trend_path, dpi=300, bbox_inches='tight')
-            print(f"📈 Product trend chart saved as '{trend_path}'")
-            plt.close()
-
-    def _create_sentiment_analysis_chart(self, viz_dir):
-        """Create basic sentiment analysis by product type"""
-        # Simple sentiment keywords (basic approach)
-        positive_words = ['love', 'amazing', 'great', 'awesome', 'perfect', 'best', 'good', 'nice', 'beautiful']
-        negative_words = ['hate', 'bad', 'terrible', 'awful', 'worst', 'disappointed', 'sucks']
-
-        product_keywords = {
-            'scrub': ['scrub', 'exfoliat'],
-            'lotion': ['lotion', 'moisturiz'],
-            'hand_wash': ['hand wash', 'handwash'],
-            'shave': ['shave', 'pre-shave'],
-            'serum': ['serum'],
-            'oil': ['oil']
-        }
-
-        sentiment_data = []
-        for product, keywords in product_keywords.items():
-            pattern = '|'.join(keywords)
-            product_comments = self.df[self.df['media_caption'].str.contains(pattern, case=False, na=False)]
+            return ChartTask(_plot_product_trends, trend_data, trend_path,
+                             f"📈 Product trend chart saved as '{trend_path}'")
 
-            if len(product_comments) > 0:
-                positive_count = 0
-                negative_count = 0
-                total_comments = len(product_comments)
+    def _sentiment_analysis_chart(self, viz_dir):
+        """Basic sentiment analysis by product type"""
+        # Lexicon baseline labels per post, then rolled up to products through the tag matrix
+        self.score_lexicon_sentiment()
+        per_product = self._counts_by_tag('product', 'lexicon_sentiment')
 
-                for comment in product_comments['comment_text']:
-                    comment_lower = str(comment).lower()
-                    if any(word in comment_lower for word in positive_words):
-                        positive_count += 1
-                    elif any(word in comment_lower for word in negative_words):
-                        negative_count += 1
-
-                neutral_count = total_comments - positive_count - negative_count
+        sentiment_data = []
+        for product in PRODUCT_KEYWORDS:
+            counts = per_product.loc[product]
+            total_comments = int(counts.sum())
 
+            if total_comments > 0:
                 sentiment_data.append({
                     'product': product.title(),
-                    'positive': positive_count,
-                    'negative': negative_count,
-                    'neutral': neutral_count,
+                    'positive': int(counts['positive']),
+                    'negative': int(counts['negative']),
+                    'neutral': int(counts['neutral']),
                     'total': total_comments
                 })
 
         if sentiment_data:
-            sentiment_df = pd.DataFrame(sentiment_data)
-
-            fig, ax = plt.subplots(figsize=(12, 8))
-
-            # Create stacked bar chart
-            products = sentiment_df['product']
-            positive_pct = (sentiment_df['positive'] / sentiment_df['total']) * 100
-            negative_pct = (sentiment_df['negative'] / sentiment_df['total']) * 100
-            neutral_pct = (sentiment_df['neutral'] / sentiment_df['total']) * 100
-
-            ax.bar(products, positive_pct, label='Positive', color='lightgreen', alpha=0.8)
-            ax.bar(products, negative_pct, bottom=positive_pct, label='Negative', color='lightcoral', alpha=0.8)
-            ax.bar(products, neutral_pct, bottom=positive_pct + negative_pct, label='Neutral', color='lightgray', alpha=0.8)
-
-            ax.set_title('Comment Sentiment Distribution by Product Type',
-                        fontsize=14, fontweight='bold', pad=20)
-            ax.set_xlabel('Product Category')
-            ax.set_ylabel('Percentage of Comments')
-            ax.legend()
-            ax.grid(True, alpha=0.3, axis='y')
-            plt.xticks(rotation=45)
-
-            plt.tight_layout()
             sentiment_path = os.path.join(viz_dir, 'sentiment_by_product.png')
-            plt.savefig(sentiment_path, dpi=300, bbox_inches='tight')
-            print(f"😊 Sentiment analysis chart saved as '{sentiment_path}'")
-            plt.close()
-
-    def _create_engagement_frequency_scatter(self, viz_dir):
-        """Create scatter plot of engagement vs post frequency"""
-        product_keywords = {
-            'scrub': ['scrub', 'exfoliat'],
-            'lotion': ['lotion', 'moisturiz'],
-            'hand_wash': ['hand wash', 'handwash'],
-            'shave': ['shave', 'pre-shave'],
-            'serum': ['serum'],
-            'oil': ['oil']
-        }
-
-        scent_keywords = {
-            'vanilla': ['vanilla'],
-            'tangerine': ['tangerine', 'orange'],
-            'coconut': ['coconut'],
-            'shea': ['shea'],
-            'tropical': ['tropical', 'mango', 'pineapple'],
-            'berry': ['berry', 'strawberry', 'raspberry'],
-            'citrus': ['citrus', 'lemon', 'lime']
-        }
+            return ChartTask(_plot_product_sentiment, pd.DataFrame(sentiment_data), sentiment_path,
+                             f"😊 Sentiment analysis chart saved as '{sentiment_path}'")
 
+    def _engagement_frequency_scatter(self, viz_dir):
+        """Scatter plot of engagement vs post frequency"""
         # Combine both product and scent data
-        all_categories = {**product_keywords, **scent_keywords}
+        all_categories = [('product', category) for category in PRODUCT_KEYWORDS] + \
+                         [('scent', category) for category in SCENT_KEYWORDS]
 
         scatter_data = []
-        for category, keywords in all_categories.items():
-            pattern = '|'.join(keywords)
-            matching_posts = self.df[self.df['media_caption'].str.contains(pattern, case=False, na=False)]
-            if len(matching_posts) > 0:
-                post_count = matching_posts['media_id'].nunique()
-                avg_engagement = len(matching_posts) / post_count
-                category_type = 'Product' if category in product_keywords else 'Scent'
+        for group, category in all_categories:
+            total_comments, post_count = self._caption_tag_stats(group, category)
+            if total_comments > 0:
+                avg_engagement = total_comments / post_count
+                category_type = group.title()
 
                 scatter_data.append({
                     'category': category.title(),
@@ -618,49 +496,259 @@ class TreeHutAnalyzer:
                 })
 
         if scatter_data:
-            scatter_df = pd.DataFrame(scatter_data)
-
-            fig, ax = plt.subplots(figsize=(12, 8))
-
-            # Different colors for products vs scents
-            for cat_type in scatter_df['type'].unique():
-                subset = scatter_df[scatter_df['type'] == cat_type]
-                ax.scatter(subset['post_count'], subset['avg_engagement'],
-                          label=cat_type, alpha=0.7, s=100)
-
-                # Add labels for each point
-                for _, row in subset.iterrows():
-                    ax.annotate(row['category'],
-                               (row['post_count'], row['avg_engagement']),
-                               xytext=(5, 5), textcoords='offset points',
-                               fontsize=9, alpha=0.8)
-
-            ax.set_title('Engagement vs Post Frequency: Identifying Over/Under-Exploited Categories',
-                        fontsize=14, fontweight='bold', pad=20)
-            ax.set_xlabel('Number of Posts')
-            ax.set_ylabel('Average Comments per Post')
-            ax.legend()
-            ax.grid(True, alpha=0.3)
-
-            plt.tight_layout()
             scatter_path = os.path.join(viz_dir, 'engagement_vs_frequency_scatter.png')
-            plt.savefig(scatter_path, dpi=300, bbox_inches='tight')
-            print(f"📊 Engagement vs frequency scatter plot saved as '{scatter_path}'")
-            plt.close()
+            return ChartTask(_plot_engagement_frequency, pd.DataFrame(scatter_data), scatter_path,
+                             f"📊 Engagement vs frequency scatter plot saved as '{scatter_path}'")
+
+# Chart renderers. They live at module level and take only precomputed plot data so
+# render_charts() can ship them to worker processes. matplotlib is imported inside
+# each one so text-only runs never pay for it.
+
+def _plot_daily_engagement(daily_engagement, path):
+    import matplotlib.pyplot as plt
+
+    fig1, ax1 = plt.subplots(figsize=(12, 6))
+    ax1.plot(daily_engagement.index, daily_engagement.values, marker='o', linewidth=2, markersize=4, color='steelblue')
+    ax1.set_title('Daily Engagement Pattern', fontweight='bold', fontsize=14, pad=20)
+    ax1.set_xlabel('Date')
+    ax1.set_ylabel('Number of Comments')
+    ax1.tick_params(axis='x', rotation=45)
+    ax1.grid(True, alpha=0.3)
+    plt.tight_layout()
+    plt.savefig(path, dpi=300, bbox_inches='tight')
+    plt.close()
+
+def _plot_hourly_engagement(hourly_engagement, path):
+    import matplotlib.pyplot as plt
+
+    fig2, ax2 = plt.subplots(figsize=(12, 6))
+    ax2.bar(hourly_engagement.index, hourly_engagement.values, color='skyblue', alpha=0.7)
+    ax2.set_title('Hourly Engagement Distribution', fontweight='bold', fontsize=14, pad=20)
+    ax2.set_xlabel('Hour of Day')
+    ax2.set_ylabel('Number of Comments')
+    ax2.grid(True, alpha=0.3)
+    plt.tight_layout()
+    plt.savefig(path, dpi=300, bbox_inches='tight')
+    plt.close()
+
+def _plot_top_posts(post_engagement, path):
+    import matplotlib.pyplot as plt
+
+    fig3, ax3 = plt.subplots(figsize=(12, 8))
+    post_labels = [f"Post {i+1}" for i in range(len(post_engagement))]
+    ax3.barh(post_labels, post_engagement.values, color='lightcoral', alpha=0.7)
+    ax3.set_title('Top 10 Posts by Comment Count', fontweight='bold', fontsize=14, pad=20)
+    ax3.set_xlabel('Number of Comments')
+    plt.tight_layout()
+    plt.savefig(path, dpi=300, bbox_inches='tight')
+    plt.close()
+
+def _plot_giveaway_comparison(averages, path):
+    import matplotlib.pyplot as plt
+
+    fig4, ax4 = plt.subplots(figsize=(10, 6))
+    regular_avg, giveaway_avg = averages
+
+    post_types = ['Regular Posts', 'Giveaway Posts']
+    avg_engagement = [regular_avg, giveaway_avg]
+    colors = ['lightblue', 'gold']
+
+    bars = ax4.bar(post_types, avg_engagement, color=colors, alpha=0.7)
+    ax4.set_title('Average Engagement: Regular vs Giveaway Posts', fontweight='bold', fontsize=14, pad=20)
+    ax4.set_ylabel('Average Comments per Post')
+
+    # Add value labels on bars
+    for bar, value in zip(bars, avg_engagement):
+        ax4.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 1,
+                f'{value:.1f}', ha='center', va='bottom', fontweight='bold')
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=300, bbox_inches='tight')
+    plt.close()
+
+def _plot_product_performance(product_performance, path):
+    import matplotlib.pyplot as plt
+
+    fig5, ax5 = plt.subplots(figsize=(12, 8))
+
+    if product_performance:
+        products = list(product_performance.keys())
+        performance = list(product_performance.values())
+
+        ax5.barh(products, performance, color='lightgreen', alpha=0.7)
+        ax5.set_title('Average Engagement by Product Type', fontweight='bold', fontsize=14, pad=20)
+        ax5.set_xlabel('Average Comments per Post')
+        ax5.grid(True, alpha=0.3, axis='x')
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=300, bbox_inches='tight')
+    plt.close()
+
+def _plot_scent_performance(scent_performance, path):
+    import matplotlib.pyplot as plt
+
+    fig6, ax6 = plt.subplots(figsize=(12, 8))
+
+    if scent_performance:
+        scents = list(scent_performance.keys())
+        performance = list(scent_performance.values())
+
+        ax6.barh(scents, performance, color='lightpink', alpha=0.7)
+        ax6.set_title('Average Engagement by Scent Type', fontweight='bold', fontsize=14, pad=20)
+        ax6.set_xlabel('Average Comments per Post')
+        ax6.grid(True, alpha=0.3, axis='x')
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=300, bbox_inches='tight')
+    plt.close()
+
+def _plot_scent_comparison(scent_df, path):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(12, 8))
+    bars = ax.barh(scent_df['scent'], scent_df['avg_engagement'],
+                  color='lightcoral', alpha=0.7)
+
+    # Add sample size annotations
+    for i, (bar, row) in enumerate(zip(bars, scent_df.itertuples())):
+        ax.text(bar.get_width() + 1, bar.get_y() + bar.get_height()/2,
+               f'{row.post_count} posts\n{row.total_comments} comments',
+               ha='left', va='center', fontsize=9, alpha=0.8)
+
+    ax.set_title('Scent Performance: Engagement Rate with Sample Sizes',
+                fontsize=14, fontweight='bold', pad=20)
+    ax.set_xlabel('Average Comments per Post')
+    ax.set_ylabel('Scent Category')
+    ax.grid(True, alpha=0.3, axis='x')
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=300, bbox_inches='tight')
+    plt.close()
+
+def _plot_geographic_demand(location_mentions, path):
+    import matplotlib.pyplot as plt
+
+    locations_list = list(location_mentions.keys())
+    counts = list(location_mentions.values())
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    bars = ax.bar(locations_list, counts, color='skyblue', alpha=0.7)
+
+    # Add count labels on bars
+    for bar, count in zip(bars, counts):
+        ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.5,
+               str(count), ha='center', va='bottom', fontweight='bold')
+
+    ax.set_title('Geographic Demand Signals in Customer Comments',
+                fontsize=14, fontweight='bold', pad=20)
+    ax.set_xlabel('Location/Region')
+    ax.set_ylabel('Number of Mentions in Comments')
+    ax.grid(True, alpha=0.3, axis='y')
+    plt.xticks(rotation=45)
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=300, bbox_inches='tight')
+    plt.close()
+
+def _plot_product_trends(trend_data, path):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(12, 8))
+
+    for product, weekly_data in trend_data.items():
+        if len(weekly_data) > 1:  # Only plot if we have multiple data points
+            ax.plot(weekly_data.index.astype(str), weekly_data.values,
+                   marker='o', linewidth=2, label=product, alpha=0.8)
+
+    ax.set_title('Product Category Engagement Trends Over Time',
+                fontsize=14, fontweight='bold', pad=20)
+    ax.set_xlabel('Week')
+    ax.set_ylabel('Number of Comments')
+    ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+    ax.grid(True, alpha=0.3)
+    plt.xticks(rotation=45)
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=300, bbox_inches='tight')
+    plt.close()
+
+def _plot_product_sentiment(sentiment_df, path):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(12, 8))
+
+    # Create stacked bar chart
+    products = sentiment_df['product']
+    positive_pct = (sentiment_df['positive'] / sentiment_df['total']) * 100
+    negative_pct = (sentiment_df['negative'] / sentiment_df['total']) * 100
+    neutral_pct = (sentiment_df['neutral'] / sentiment_df['total']) * 100
+
+    ax.bar(products, positive_pct, label='Positive', color='lightgreen', alpha=0.8)
+    ax.bar(products, negative_pct, bottom=positive_pct, label='Negative', color='lightcoral', alpha=0.8)
+    ax.bar(products, neutral_pct, bottom=positive_pct + negative_pct, label='Neutral', color='lightgray', alpha=0.8)
+
+    ax.set_title('Comment Sentiment Distribution by Product Type',
+                fontsize=14, fontweight='bold', pad=20)
+    ax.set_xlabel('Product Category')
+    ax.set_ylabel('Percentage of Comments')
+    ax.legend()
+    ax.grid(True, alpha=0.3, axis='y')
+    plt.xticks(rotation=45)
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=300, bbox_inches='tight')
+    plt.close()
+
+def _plot_engagement_frequency(scatter_df, path):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(12, 8))
+
+    # Different colors for products vs scents
+    for cat_type in scatter_df['type'].unique():
+        subset = scatter_df[scatter_df['type'] == cat_type]
+        ax.scatter(subset['post_count'], subset['avg_engagement'],
+                  label=cat_type, alpha=0.7, s=100)
+
+        # Add labels for each point
+        for _, row in subset.iterrows():
+            ax.annotate(row['category'],
+                       (row['post_count'], row['avg_engagement']),
+                       xytext=(5, 5), textcoords='offset points',
+                       fontsize=9, alpha=0.8)
+
+    ax.set_title('Engagement vs Post Frequency: Identifying Over/Under-Exploited Categories',
+                fontsize=14, fontweight='bold', pad=20)
+    ax.set_xlabel('Number of Posts')
+    ax.set_ylabel('Average Comments per Post')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=300, bbox_inches='tight')
+    plt.close()
 
 if __name__ == "__main__":
     import sys
 
-    # Initialize analyzer
-    analyzer = TreeHutAnalyzer()
+    # Initialize analyzer (--no-cache forces a fresh CSV parse,
+    # --stream aggregates the CSV chunk by chunk for files larger than RAM)
+    stream_mode = '--stream' in sys.argv
+    analyzer = TreeHutAnalyzer(use_cache='--no-cache' not in sys.argv, stream=stream_mode)
+
+    # --jobs N renders charts in N worker processes (0 = one per CPU)
+    jobs = int(sys.argv[sys.argv.index('--jobs') + 1]) if '--jobs' in sys.argv else 1
+
+    if stream_mode and '--plots' in sys.argv:
+        print("⚠️ --plots needs the full dataset in memory; running text analysis only in --stream mode")
 
     # Check if user wants visualizations
-    if len(sys.argv) > 1 and sys.argv[1] == '--plots':
+    if '--plots' in sys.argv and not stream_mode:
         # Run analysis with all visualizations
         overview_results = analyzer.data_overview()
         content_results = analyzer.content_analysis()
-        analyzer.create_visualizations()
-        analyzer.create_additional_visualizations()
+        analyzer.create_visualizations(jobs=jobs)
+        analyzer.create_additional_visualizations(jobs=jobs)
     else:
         # Run text-only analysis
         overview_results = analyzer.data_overview()
@@ -672,4 +760,7 @@ if __name__ == "__main__":
     print("💡 Usage options:")
     print("   python treehut_analysis.py          # Text analysis only")
     print("   python treehut_analysis.py --plots  # All visualizations (11 charts)")
+    print("   python treehut_analysis.py --no-cache  # Re-parse the CSV instead of using the prepared cache")
+    print("   python treehut_analysis.py --stream  # Chunked text analysis for exports larger than RAM")
+    print("   python treehut_analysis.py --plots --jobs 8  # Render charts in 8 worker processes")
     print("Next steps: Run sentiment analysis, community behavior analysis, and strategic recommendations")